@@ -1,15 +1,21 @@
 from dotenv import load_dotenv
 import os
+import time
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, Sequence
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
 from operator import add as add_messages
 from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain_core.tools import tool
+from ann_index import VECTOR_BACKEND, open_vectorstore
+from context_packing import CONTEXT_PACKING, pack_tool_messages
+from embedding_pipeline import CachedEmbeddings, make_embeddings
+from hybrid_search import LEXICAL_INDEX_NAME, HybridRetriever, LexicalIndex
+from query_cache import SEMANTIC_CACHE, SemanticCache
+from rag_index import index_version, sync_index
+from tool_runner import run_tool_calls
 
 load_dotenv()
 
@@ -17,9 +23,8 @@ llm = ChatOpenAI(
     model="gpt-4.1", temperature = 0) # I want to minimize hallucination - temperature = 0 makes the model output more deterministic
 
 # Our Embedding Model - has to also be compatible with the LLM
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small",
-)
+# Document embeddings are batched, run concurrently and cached on disk (see embedding_pipeline.py)
+embeddings = CachedEmbeddings(make_embeddings()) # EMBEDDING_MODEL=fake embeds offline
 
 
 pdf_path = "l001-basics/graph-ai-005/Stock_Market_Performance_2024.pdf"
@@ -29,56 +34,54 @@ pdf_path = "l001-basics/graph-ai-005/Stock_Market_Performance_2024.pdf"
 if not os.path.exists(pdf_path):
     raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
-pdf_loader = PyPDFLoader(pdf_path) # This loads the PDF
-
-# Checks if the PDF is there
-try:
-    pages = pdf_loader.load()
-    print(f"PDF has been loaded and has {len(pages)} pages")
-except Exception as e:
-    print(f"Error loading PDF: {e}")
-    raise
-
 # Chunking Process
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=1000,
-    chunk_overlap=200
+    chunk_overlap=200,
+    add_start_index=True # Where each chunk starts on its page, so context packing can merge overlapping chunks
 )
 
-
-pages_split = text_splitter.split_documents(pages) # We now apply this to our pages
-
 persist_directory = r"l001-basics/graph-ai-005/chroma_db" # This is the directory where we will store our vector database
 collection_name = "stock_market"
-
-# If our collection does not exist in the directory, we create using the os command
-if not os.path.exists(persist_directory):
-    os.makedirs(persist_directory)
+os.makedirs(persist_directory, exist_ok=True)
+lexical_index = LexicalIndex(os.path.join(persist_directory, LEXICAL_INDEX_NAME)) # BM25 index kept next to the collection
 
 
 try:
-    # Here, we actually create the chroma database using our embeddigns model
-    vectorstore = Chroma.from_documents(
-        documents=pages_split,
-        embedding=embeddings,
+    # Only files that changed since the last start are loaded, split and embedded;
+    # when nothing changed the existing collection is opened as is (see rag_index.py)
+    vectorstore = sync_index(
+        sources=[pdf_path],
+        load=lambda path: PyPDFLoader(path).lazy_load(), # This loads the PDF page by page
+        splitter=text_splitter,
+        embeddings=embeddings,
         persist_directory=persist_directory,
-        collection_name=collection_name
+        collection_name=collection_name,
+        batch_size=embeddings.batch_size * embeddings.concurrency,
+        lexical=lexical_index,
     )
-    print(f"Created ChromaDB vector store!")
+    print(f"ChromaDB vector store is ready!")
+
+    # VECTOR_BACKEND=ivf searches a memory-mapped IVF index instead, shared by every process through the page cache (see ann_index.py)
+    vectorstore = open_vectorstore(vectorstore, persist_directory, index_version(persist_directory))
+    print(f"Vector search backend: {VECTOR_BACKEND}")
     
 except Exception as e:
     print(f"Error setting up ChromaDB: {str(e)}")
     raise
 
 
-# Now we create our retriever 
-retriever = vectorstore.as_retriever(
-    search_type="similarity",
-    search_kwargs={"k": 5} # K is the amount of chunks to return
+# Now we create our retriever: BM25 and vector rankings fused (see hybrid_search.py)
+retriever = HybridRetriever(
+    vectorstore,
+    lexical_index,
+    k=5, # K is the amount of chunks to return
+    # Near-identical queries reuse earlier results until the index changes (see query_cache.py)
+    cache=SemanticCache(version=lambda: index_version(persist_directory)) if SEMANTIC_CACHE else None,
 )
 
-@tool
-def retriever_tool(query: str) -> str:
+@tool(response_format="content_and_artifact")
+def retriever_tool(query: str):
     """
     This tool searches and returns the information from the Stock Market Performance 2024 document.
     """
@@ -86,13 +89,14 @@ def retriever_tool(query: str) -> str:
     docs = retriever.invoke(query)
 
     if not docs:
-        return "I found no relevant information in the Stock Market Performance 2024 document."
+        return "I found no relevant information in the Stock Market Performance 2024 document.", {"documents": []}
     
     results = []
     for i, doc in enumerate(docs):
         results.append(f"Document {i+1}:\n{doc.page_content}")
     
-    return "\n\n".join(results)
+    # The documents travel with the ToolMessage, for context packing in take_action
+    return "\n\n".join(results), {"documents": docs}
 
 
 tools = [retriever_tool]
@@ -133,23 +137,25 @@ def take_action(state: AgentState) -> AgentState:
     """Execute tool calls from the LLM's response."""
 
     tool_calls = state['messages'][-1].tool_calls
-    results = []
     for t in tool_calls:
         print(f"Calling Tool: {t['name']} with query: {t['args'].get('query', 'No query provided')}")
-        
-        if not t['name'] in tools_dict: # Checks if a valid tool is present
-            print(f"\nTool: {t['name']} does not exist.")
-            result = "Incorrect Tool Name, Please Retry and Select tool from List of Available tools."
-        
-        else:
-            result = tools_dict[t['name']].invoke(t['args'].get('query', ''))
-            print(f"Result length: {len(str(result))}")
-            
 
-        # Appends the Tool Message
-        results.append(ToolMessage(tool_call_id=t['id'], name=t['name'], content=str(result)))
+    # All calls of the turn run at once; the ToolMessages keep the order of the calls (see tool_runner.py)
+    start = time.perf_counter()
+    results = run_tool_calls(tool_calls, tools_dict)
+
+    # Overlapping chunks merged, passages already in the conversation dropped, the rest fit to a budget (see context_packing.py)
+    if CONTEXT_PACKING:
+        results, tokens = pack_tool_messages(results, state['messages'])
+        print(f"Context packing: {tokens['before']} -> {tokens['after']} prompt tokens ({tokens['saved']} saved)")
+
+    for t, result in zip(tool_calls, results):
+        if result.status == "error":
+            print(f"\nTool: {t['name']} failed: {result.content}")
+        else:
+            print(f"Result length: {len(result.content)}")
 
-    print("Tools Execution Complete. Back to the model!")
+    print(f"Tools Execution Complete ({len(tool_calls)} calls in {time.perf_counter() - start:.2f}s). Back to the model!")
     return {'messages': results}
 
 
@@ -0,0 +1,284 @@
+"""
+Memory-mapped IVF vector index, as an alternative to Chroma's own index.
+
+The index is built from the vectors already stored in the Chroma
+collection (nothing is embedded again) and saved next to it as .npy files:
+
+- the vectors, float16 or float32, grouped by inverted list so every list
+  is one contiguous block of the file;
+- their squared norms, chunk ids and list offsets, and the list centroids
+  (k-means over a sample of the vectors).
+
+The files are opened with np.load(mmap_mode="r"), so every process that
+serves queries (workers of a web server, several agents on one machine)
+maps the same pages from the page cache instead of loading its own copy,
+and only the lists a query probes are read from disk.
+
+A query is compared with all centroids, then exactly with the vectors of the
+IVF_NPROBE nearest lists. More lists mean better recall and slower queries;
+nprobe = nlist is an exact search. Distances are squared L2, like Chroma's
+default, so the ranking matches the Chroma path.
+
+The index belongs to one version of the collection (rag_index.index_version)
+and is rebuilt on the first start after sync_index changed it. Processes
+starting at once build it once: open_vectorstore() takes a lock file
+(IVF_LOCK_NAME, flock) and checks again for a finished index before building.
+Scratch files carry the builder's pid, so even builds without the lock do
+not write into each other's files.
+
+    VECTOR_BACKEND=chroma     # or "ivf"
+    IVF_NLIST=0               # inverted lists; 0 is about 4 * sqrt(chunks)
+    IVF_NPROBE=8              # lists searched per query
+    IVF_DTYPE=float16         # or float32: twice the size, exact stored vectors
+"""
+import contextlib
+import glob
+import json
+import math
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+from langchain_core.documents import Document
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+IVF_DTYPE = os.getenv("IVF_DTYPE", "float16")
+
+IVF_INDEX_NAME = "ivf_index.json"
+IVF_LOCK_NAME = "ivf_index.lock"
+IVF_FORMAT = 1
+
+BLOCK = 8192  # rows per step when reading, assigning and copying vectors
+TRAIN_SAMPLE = 64  # k-means training vectors per list
+TRAIN_ITERATIONS = 10
+
+
+def default_nlist(count):
+    return max(1, min(count, round(4 * math.sqrt(count))))
+
+
+def _nearest(vectors, centroids, centroid_norms):
+    # argmin |v - c|^2 = argmin |c|^2 - 2 v.c
+    return np.argmin(centroid_norms - 2.0 * (vectors @ centroids.T), axis=1)
+
+
+def _assign(vectors, centroids):
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    return np.concatenate([
+        _nearest(np.asarray(vectors[i:i + BLOCK], dtype=np.float32), centroids, centroid_norms)
+        for i in range(0, len(vectors), BLOCK)
+    ])
+
+
+def train_centroids(sample, nlist, iterations=TRAIN_ITERATIONS, seed=0):
+    """k-means (Lloyd) centroids of `sample`; empty lists are reseeded with random vectors."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(sample, centroids)
+        counts = np.bincount(assignment, minlength=nlist)
+        filled = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.add.reduceat(sample[np.argsort(assignment, kind="stable")], starts[filled])
+        centroids[filled] = sums / counts[filled, None]
+        if not filled.all():
+            centroids[~filled] = sample[rng.choice(len(sample), int((~filled).sum()))]
+    return centroids
+
+
+def _tmp(path):
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def _save(path, array):
+    np.save(_tmp(path) + ".npy", array)
+    os.replace(_tmp(path) + ".npy", path)
+
+
+@contextlib.contextmanager
+def _build_lock(directory):
+    """Exclusive across processes while held (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, IVF_LOCK_NAME), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_ivf_meta(directory):
+    try:
+        with open(os.path.join(directory, IVF_INDEX_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def build_ivf_index(vectorstore, directory, version, nlist=IVF_NLIST, dtype=IVF_DTYPE, page_size=5000):
+    """Build the index from the collection's stored vectors and return it opened."""
+    start = time.perf_counter()
+    prefix = os.path.join(directory, f"ivf-{version}")
+    count = vectorstore._collection.count()
+    meta = {"format": IVF_FORMAT, "version": version, "dtype": dtype, "requested_nlist": nlist,
+            "count": count, "prefix": os.path.basename(prefix)}
+
+    if count:
+        # 1. The stored vectors, page by page, into a float32 scratch file.
+        ids, raw = [], None
+        for offset in range(0, count, page_size):
+            page = vectorstore.get(include=["embeddings"], limit=page_size, offset=offset)
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if raw is None:
+                raw = np.lib.format.open_memmap(_tmp(prefix + ".raw") + ".npy", mode="w+", dtype=np.float32,
+                                                shape=(count, vectors.shape[1]))
+            raw[len(ids):len(ids) + len(vectors)] = vectors
+            ids.extend(page["ids"])
+        count = meta["count"] = len(ids)
+
+        # 2. Centroids from a sample, then every vector's list.
+        lists = min(count, nlist or default_nlist(count))
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(count, min(count, lists * TRAIN_SAMPLE), replace=False))
+        centroids = train_centroids(np.asarray(raw[sample]), lists)
+        assignment = _assign(raw, centroids)
+
+        # 3. Vectors, norms and ids in list order; list i is rows offsets[i]:offsets[i + 1].
+        order = np.argsort(assignment, kind="stable")
+        vectors = np.lib.format.open_memmap(_tmp(prefix + ".vectors") + ".npy", mode="w+", dtype=dtype,
+                                            shape=raw.shape)
+        norms = np.empty(count, dtype=np.float32)
+        for i in range(0, count, BLOCK):
+            vectors[i:i + BLOCK] = raw[order[i:i + BLOCK]]
+            stored = np.asarray(vectors[i:i + BLOCK], dtype=np.float32)  # norms of the rounded vectors
+            norms[i:i + BLOCK] = np.einsum("ij,ij->i", stored, stored)
+        vectors.flush()
+        del vectors, raw
+        os.replace(_tmp(prefix + ".vectors") + ".npy", prefix + ".vectors.npy")
+        os.remove(_tmp(prefix + ".raw") + ".npy")
+        _save(prefix + ".norms.npy", norms)
+        _save(prefix + ".ids.npy", np.array(ids, dtype="S")[order])
+        _save(prefix + ".centroids.npy", centroids)
+        _save(prefix + ".offsets.npy", np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=lists))]))
+        meta.update(nlist=lists, dim=centroids.shape[1])
+
+    path = os.path.join(directory, IVF_INDEX_NAME)
+    with open(_tmp(path), "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(_tmp(path), path)
+    # Processes still using an older index keep their mappings; the files only go once unmapped.
+    for old in glob.glob(os.path.join(directory, "ivf-*.npy")):
+        if not os.path.basename(old).startswith(meta["prefix"] + "."):
+            os.remove(old)
+    print(f"IVF index built: {count} vectors, {meta.get('nlist', 0)} lists, {dtype} "
+          f"({time.perf_counter() - start:.2f}s)")
+    return IVFIndex(directory, meta)
+
+
+class IVFIndex:
+    """A built index, memory-mapped read-only; search() is safe to call from several threads."""
+
+    def __init__(self, directory, meta, nprobe=IVF_NPROBE):
+        self.meta = meta
+        self.nprobe = nprobe
+        self.count = meta["count"]
+        if self.count:
+            prefix = os.path.join(directory, meta["prefix"])
+            self.vectors = np.load(prefix + ".vectors.npy", mmap_mode="r")
+            self.norms = np.load(prefix + ".norms.npy", mmap_mode="r")
+            self.ids = np.load(prefix + ".ids.npy", mmap_mode="r")
+            self.offsets = np.load(prefix + ".offsets.npy")
+            self.centroids = np.load(prefix + ".centroids.npy")
+            self.centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    @classmethod
+    def open(cls, directory, version, nlist=IVF_NLIST, dtype=IVF_DTYPE, nprobe=IVF_NPROBE):
+        """The saved index if it was built for this collection version and settings, else None."""
+        meta = load_ivf_meta(directory)
+        if (meta is None or meta.get("format") != IVF_FORMAT or meta.get("version") != version
+                or meta.get("dtype") != dtype or meta.get("requested_nlist") != nlist):
+            return None
+        return cls(directory, meta, nprobe)
+
+    def search(self, vector, k, nprobe=None):
+        """[(chunk id, squared L2 distance), ...] of the k nearest stored vectors found in the probed lists."""
+        if not self.count or k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        nlist = len(self.centroids)
+        nprobe = max(1, min(nlist, nprobe or self.nprobe))
+        coarse = self.centroid_norms - 2.0 * (self.centroids @ query)
+        probed = np.argpartition(coarse, nprobe - 1)[:nprobe] if nprobe < nlist else range(nlist)
+        rows, distances = [], []
+        for i in probed:
+            start, end = self.offsets[i], self.offsets[i + 1]
+            if end > start:
+                block = np.asarray(self.vectors[start:end], dtype=np.float32)
+                rows.append(np.arange(start, end))
+                distances.append(self.norms[start:end] - 2.0 * (block @ query))
+        if not rows:
+            return []
+        rows, distances = np.concatenate(rows), np.concatenate(distances)
+        if len(rows) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            rows, distances = rows[top], distances[top]
+        best = np.argsort(distances, kind="stable")
+        query_norm = float(query @ query)
+        return [(self.ids[row].decode(), max(0.0, float(distance) + query_norm))
+                for row, distance in zip(rows[best], distances[best])]
+
+
+class IVFVectorStore:
+    """
+    What HybridRetriever uses of a Chroma vector store, with vector search
+    on an IVFIndex; documents are still read from the Chroma collection.
+    """
+
+    def __init__(self, vectorstore, index):
+        self.vectorstore = vectorstore
+        self.index = index
+
+    @property
+    def embeddings(self):
+        return self.vectorstore.embeddings
+
+    def get(self, *args, **kwargs):
+        return self.vectorstore.get(*args, **kwargs)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, nprobe=None):
+        hits = self.index.search(embedding, k, nprobe)
+        if not hits:
+            return []
+        found = self.vectorstore.get(ids=[cid for cid, _ in hits], include=["documents", "metadatas"])
+        docs = {cid: Document(id=cid, page_content=text, metadata=metadata or {})
+                for cid, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])}
+        return [(docs[cid], distance) for cid, distance in hits if cid in docs]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, kwargs.get("nprobe"))]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k, **kwargs)
+
+
+def open_vectorstore(vectorstore, persist_directory, version, backend=VECTOR_BACKEND):
+    """The Chroma vector store as it is, or wrapped for IVF search (built first if needed)."""
+    if backend == "chroma":
+        return vectorstore
+    if backend != "ivf":
+        raise ValueError(f"Unsupported VECTOR_BACKEND: {backend!r}")
+    index = IVFIndex.open(persist_directory, version)
+    if index is None:
+        with _build_lock(persist_directory):
+            # Another process may have built it while this one waited for the lock.
+            index = IVFIndex.open(persist_directory, version) or build_ivf_index(vectorstore, persist_directory, version)
+    return IVFVectorStore(vectorstore, index)
@@ -0,0 +1,159 @@
+"""
+Offline benchmark of the IVF vector backend (ann_index.py) against Chroma.
+
+Builds a Chroma collection of `--chunks` synthetic embeddings (clustered
+unit vectors, like the embeddings of a large corpus on a few hundred
+topics) and an IVF index from it, then reports for each:
+
+- recall@k against an exact search and query latency, for several nprobe
+  values of the IVF index;
+- memory of `--workers` processes that all open the index and serve the
+  same queries at once: resident (RSS) and proportional (PSS, shared pages
+  split between the processes) set size above a process that only imports
+  the same modules. Pages of a memory-mapped index are counted once across
+  the processes; a per-process in-memory index is counted in each.
+
+    python l001-basics/graph-ai-005/bench_ann.py --chunks 200000 --nprobe 4 8 16 32
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from ann_index import IVFIndex, build_ivf_index
+
+COLLECTION = "bench_ann"
+VERSION = 1
+
+
+def make_corpus(chunks, dim, topics, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+
+    def sample(n):
+        points = centers[rng.integers(topics, size=n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    return sample(chunks), sample
+
+
+def exact_top_k(corpus, queries, k):
+    norms = np.einsum("ij,ij->i", corpus, corpus)
+    return [set(np.argsort(norms - 2.0 * (corpus @ query))[:k]) for query in queries]
+
+
+def percentile_ms(seconds, q):
+    return float(np.percentile(seconds, q)) * 1000
+
+
+def run_queries(search, queries):
+    """Result rows per query, and the seconds each query took."""
+    results, seconds = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        seconds.append(time.perf_counter() - start)
+    return results, seconds
+
+
+def memory_mb():
+    """(RSS, PSS) of this process in MB, from /proc (Linux)."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def worker(backend, directory, queries, k, nprobe, ready, done, results):
+    if backend == "chroma":
+        collection = Chroma(collection_name=COLLECTION, persist_directory=directory)._collection
+        for query in queries:
+            collection.query(query_embeddings=[query], n_results=k, include=[])
+    elif backend == "ivf":
+        index = IVFIndex.open(directory, VERSION, dtype=os.environ["BENCH_DTYPE"], nlist=0, nprobe=nprobe)
+        for query in queries:
+            index.search(query, k)
+    ready.wait()  # every process has its index open at the same time
+    results.put(memory_mb())
+    done.wait()
+
+
+def measure_memory(backend, directory, queries, k, nprobe, workers):
+    context = multiprocessing.get_context("spawn")
+    ready, done, results = context.Barrier(workers), context.Barrier(workers), context.Queue()
+    processes = [context.Process(target=worker, args=(backend, directory, queries, k, nprobe, ready, done, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return np.mean([rss for rss, _ in measured]), np.mean([pss for _, pss in measured])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--dtype", default="float16", choices=["float16", "float32"])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    os.environ["BENCH_DTYPE"] = args.dtype
+
+    corpus, sample = make_corpus(args.chunks, args.dim, args.topics)
+    queries = sample(args.queries)
+    truth = exact_top_k(corpus, queries, args.k)
+    ids = [str(i) for i in range(args.chunks)]
+
+    def recall(results):
+        return np.mean([len({int(cid) for cid in found} & expected) / args.k for found, expected in zip(results, truth)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        vectorstore = Chroma(collection_name=COLLECTION, persist_directory=directory)
+        for i in range(0, args.chunks, 5000):
+            vectorstore._collection.add(ids=ids[i:i + 5000], embeddings=corpus[i:i + 5000],
+                                        documents=[f"chunk {j}" for j in range(i, min(i + 5000, args.chunks))])
+        print(f"{args.chunks} chunks, {args.dim} dimensions, {args.queries} queries, k={args.k}\n")
+        print(f"Chroma collection built in {time.perf_counter() - start:.1f}s")
+        index = build_ivf_index(vectorstore, directory, VERSION, nlist=0, dtype=args.dtype)
+        files = sum(os.path.getsize(os.path.join(directory, name))
+                    for name in os.listdir(directory) if name.startswith(f"ivf-{VERSION}."))
+        print(f"IVF index files: {files / 2**20:.0f} MB\n")
+
+        print(f"{'backend':<22} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8}")
+        collection = vectorstore._collection
+        results, seconds = run_queries(
+            lambda query: collection.query(query_embeddings=[query], n_results=args.k, include=[])["ids"][0], queries)
+        print(f"{'chroma (hnsw)':<22} {recall(results):>10.3f} {percentile_ms(seconds, 50):>8.2f} "
+              f"{percentile_ms(seconds, 95):>8.2f}")
+        for nprobe in args.nprobe:
+            results, seconds = run_queries(
+                lambda query: [cid for cid, _ in index.search(query, args.k, nprobe)], queries)
+            label = f"ivf nprobe={nprobe}/{index.meta['nlist']}"
+            print(f"{label:<22} {recall(results):>10.3f} {percentile_ms(seconds, 50):>8.2f} "
+                  f"{percentile_ms(seconds, 95):>8.2f}")
+
+        print(f"\n{args.workers} processes serving queries at once (ivf nprobe={max(args.nprobe)}), "
+              "MB per process above an idle one:")
+        print(f"{'backend':<22} {'RSS':>8} {'PSS':>8}")
+        base_rss, base_pss = measure_memory("none", directory, queries, args.k, None, args.workers)
+        for backend in ("chroma", "ivf"):
+            rss, pss = measure_memory(backend, directory, queries, args.k, max(args.nprobe), args.workers)
+            print(f"{backend:<22} {rss - base_rss:>8.0f} {pss - base_pss:>8.0f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
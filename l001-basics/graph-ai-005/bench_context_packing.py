@@ -0,0 +1,88 @@
+"""
+Offline benchmark of context packing (context_packing.py).
+
+Replays an agent session against the bundled PDF: each turn is the set of
+retrieval calls a model typically issues for one question, with
+overlapping queries inside a turn and follow-up questions that retrieve
+some of the same chunks again. The calls run through retriever_tool's
+path (hybrid retrieval, fake embeddings) and run_tool_calls(); each turn's
+ToolMessages are then measured as sent before and after
+pack_tool_messages(), with the conversation so far as history.
+
+    python l001-basics/graph-ai-005/bench_context_packing.py --budget 1500
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.tools import tool
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from context_packing import CONTEXT_MIN_FRAGMENT, CONTEXT_TOKEN_BUDGET, pack_tool_messages
+from hybrid_search import LEXICAL_INDEX_NAME, HybridRetriever, LexicalIndex
+from rag_index import sync_index
+from tool_runner import run_tool_calls
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Stock_Market_Performance_2024.pdf")
+
+SESSION = [
+    ["Apple stock performance 2024", "Apple valuation", "Apple iPhone sales"],
+    ["Amazon valuation", "Meta valuation", "Amazon Meta stock performance"],
+    ["best performing stocks 2024", "Nvidia stock performance", "Apple stock performance 2024"],
+    ["fourth quarter rally", "interest rates Federal Reserve", "S&P 500 2024"],
+]
+
+
+def make_tool(retriever):
+    # retriever_tool from RAG_Agent.py, over the benchmark's index.
+    @tool(response_format="content_and_artifact")
+    def retriever_tool(query: str):
+        """Search the document."""
+        docs = retriever.invoke(query)
+        if not docs:
+            return "I found no relevant information in the Stock Market Performance 2024 document.", {"documents": []}
+        return "\n\n".join(f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(docs)), {"documents": docs}
+
+    return retriever_tool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET, help="retrieved tokens per turn")
+    parser.add_argument("--min-fragment", type=int, default=CONTEXT_MIN_FRAGMENT)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    with tempfile.TemporaryDirectory() as directory:
+        lexical = LexicalIndex(os.path.join(directory, LEXICAL_INDEX_NAME))
+        vectorstore = sync_index([PDF_PATH], lambda path: PyPDFLoader(path).lazy_load(), splitter,
+                                 DeterministicFakeEmbedding(size=256), directory, "stock_market", lexical=lexical)
+        retriever_tool = make_tool(HybridRetriever(vectorstore, lexical, k=args.k))
+        tools = {"retriever_tool": retriever_tool}
+
+        print(f"{len(SESSION)} turns, {sum(len(turn) for turn in SESSION)} calls, k={args.k}, "
+              f"budget {args.budget} tokens\n")
+        print(f"{'turn':>4} {'calls':>5} {'before':>8} {'after':>7} {'saved':>7}")
+        history, totals = [], {"before": 0, "after": 0}
+        for n, queries in enumerate(SESSION, start=1):
+            calls = [{"id": f"call_{n}_{i}", "name": "retriever_tool", "args": {"query": query}}
+                     for i, query in enumerate(queries)]
+            results = run_tool_calls(calls, tools)
+            packed, tokens = pack_tool_messages(results, history, budget=args.budget, min_fragment=args.min_fragment)
+            for key in totals:
+                totals[key] += tokens[key]
+            print(f"{n:>4} {len(calls):>5} {tokens['before']:>8} {tokens['after']:>7} {tokens['saved']:>7}")
+            history += packed
+
+        saved = totals["before"] - totals["after"]
+        print(f"\ntotal: {totals['before']} -> {totals['after']} prompt tokens, {saved} saved "
+              f"({saved / max(1, totals['before']):.0%}), {saved / len(SESSION):.0f} per turn")
+        lexical.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
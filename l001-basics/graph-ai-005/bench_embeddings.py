@@ -0,0 +1,111 @@
+"""
+Offline benchmark of the embedding pipeline (embedding_pipeline.py).
+
+A deterministic fake model stands in for the embedding API: each request
+takes `--latency` seconds plus `--per-text` seconds per text, and every
+`--rate-limit-every`-th pipeline request fails with a 429 (the sequential
+baseline has no retries, so it is not rate limited). The corpus is the
+bundled PDF's chunks, repeated `--copies` times with a copy number so every
+chunk is distinct.
+
+    python l001-basics/graph-ai-005/bench_embeddings.py --copies 100
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_pipeline import CachedEmbeddings
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Stock_Market_Performance_2024.pdf")
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class SlowFakeEmbeddings(Embeddings):
+    def __init__(self, latency, per_text, rate_limit_every=0):
+        self.model = DeterministicFakeEmbedding(size=1536)
+        self.latency = latency
+        self.per_text = per_text
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.requests += 1
+            fail = self.rate_limit_every and self.requests % self.rate_limit_every == 0
+        time.sleep(self.latency + self.per_text * len(texts))
+        if fail:
+            raise RateLimitError("rate limit reached")
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
+def corpus(copies):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunks = [doc.page_content for doc in splitter.split_documents(PyPDFLoader(PDF_PATH).load())]
+    return [f"[copy {n}] {chunk}" for n in range(copies) for chunk in chunks]
+
+
+def run(label, model, embed, texts):
+    model.requests = 0
+    start = time.perf_counter()
+    vectors = embed(texts)
+    seconds = time.perf_counter() - start
+    print(f"{label:<34} {len(texts):>7} {seconds:>8.2f} {len(texts) / seconds:>10.0f} {model.requests:>9}")
+    return vectors
+
+
+def sequential(model, texts):
+    # What Chroma.from_documents did: one call, which OpenAIEmbeddings splits
+    # into sequential requests of 1000 texts.
+    vectors = []
+    for i in range(0, len(texts), 1000):
+        vectors += model.embed_documents(texts[i:i + 1000])
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--per-text", type=float, default=0.003, help="seconds per text in a request")
+    parser.add_argument("--rate-limit-every", type=int, default=7, help="every Nth request gets a 429 (0: never)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    model = SlowFakeEmbeddings(args.latency, args.per_text)
+    texts = corpus(args.copies)
+
+    print(f"{'':<34} {'texts':>7} {'seconds':>8} {'texts/s':>10} {'requests':>9}")
+    expected = run("sequential, 1000 per request", model, lambda texts: sequential(model, texts), texts)
+
+    model.rate_limit_every = args.rate_limit_every
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = CachedEmbeddings(model, cache_path=os.path.join(tmp, "cache.sqlite3"),
+                                    batch_size=args.batch_size, concurrency=args.concurrency,
+                                    backoff_base=args.latency)
+        cold = run("pipeline, cold cache", model, pipeline.embed_documents, texts)
+        warm = run("pipeline, warm cache", model, pipeline.embed_documents, texts)
+        overlap = texts[len(texts) // 2:] + corpus(args.copies + args.copies // 2)[len(texts):]
+        run("pipeline, 50% overlapping corpus", model, pipeline.embed_documents, overlap)
+        print(f"\nretries after a 429: {pipeline.metrics['retries']}, cache hits: {pipeline.metrics['cache_hits']}")
+        # Same vectors as the model, up to float32 rounding in the cache.
+        assert all(abs(a - b) < 1e-6 for x, y in zip(expected, warm) for a, b in zip(x, y))
+        assert all(abs(a - b) < 1e-6 for x, y in zip(expected, cold) for a, b in zip(x, y))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
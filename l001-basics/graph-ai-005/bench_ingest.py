@@ -0,0 +1,102 @@
+"""
+Offline benchmark of PDF ingestion: pages/s and peak RSS.
+
+Builds `--files` PDFs of `--pages` pages each from the bundled PDF and
+indexes them into a fresh Chroma collection with a deterministic fake
+embedding model, three ways:
+
+- materialize: load() every page, split_documents() every chunk, then
+  Chroma.from_documents(), as RAG_Agent.py used to;
+- stream: sync_index() in this process, page -> chunk -> batch -> upsert;
+- pool: sync_index() with the PDFs extracted by `--workers` processes.
+
+Each run is a separate process, so peak RSS is its own.
+
+    python l001-basics/graph-ai-005/bench_ingest.py --files 4 --pages 500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from langchain_chroma import Chroma
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader, PdfWriter
+
+from ingest import peak_rss_mb
+from rag_index import sync_index
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Stock_Market_Performance_2024.pdf")
+
+
+def build_pdfs(directory, files, pages):
+    source = PdfReader(PDF_PATH)
+    paths = []
+    for n in range(files):
+        writer = PdfWriter()
+        for i in range(pages):
+            writer.add_page(source.pages[i % len(source.pages)])
+        path = os.path.join(directory, f"corpus_{n}.pdf")
+        with open(path, "wb") as f:
+            writer.write(f)
+        paths.append(path)
+    return paths
+
+
+def run_mode(mode, paths, directory, workers):
+    embeddings = DeterministicFakeEmbedding(size=1536)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    persist_directory = os.path.join(directory, f"chroma_{mode}")
+    start = time.perf_counter()
+    if mode == "materialize":
+        pages = [page for path in paths for page in PyPDFLoader(path).load()]
+        chunks = splitter.split_documents(pages)
+        Chroma.from_documents(documents=chunks, embedding=embeddings, persist_directory=persist_directory,
+                              collection_name="stock_market")
+        page_count = len(pages)
+    else:
+        sync_index(paths, lambda path: PyPDFLoader(path).lazy_load(), splitter, embeddings,
+                   persist_directory, "stock_market", workers=1 if mode == "stream" else workers)
+        page_count = sum(len(PdfReader(path).pages) for path in paths)
+    seconds = time.perf_counter() - start
+    return {"mode": mode, "pages": page_count, "seconds": seconds, "pages_per_second": page_count / seconds,
+            "peak_rss_mb": peak_rss_mb(), "worker_peak_rss_mb": peak_rss_mb(children=True)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=500, help="pages per file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--modes", nargs="+", default=["materialize", "stream", "pool"])
+    parser.add_argument("--run", help=argparse.SUPPRESS)  # internal: one mode, in a child process
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        paths = sorted(os.path.join(args.dir, name) for name in os.listdir(args.dir) if name.endswith(".pdf"))
+        print(json.dumps(run_mode(args.run, paths, args.dir, args.workers)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_pdfs(directory, args.files, args.pages)
+        print(f"{args.files} files x {args.pages} pages, {args.workers} workers, {os.cpu_count()} CPUs\n")
+        print(f"{'mode':<12} {'pages':>7} {'seconds':>8} {'pages/s':>8} {'peak RSS':>9} {'worker RSS':>11}")
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, __file__, "--run", mode, "--dir", directory, "--workers", str(args.workers)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            worker = f"{result['worker_peak_rss_mb']:.0f} MB" if mode == "pool" else "-"
+            print(f"{mode:<12} {result['pages']:>7} {result['seconds']:>8.2f} {result['pages_per_second']:>8.0f} "
+                  f"{result['peak_rss_mb']:>6.0f} MB {worker:>11}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
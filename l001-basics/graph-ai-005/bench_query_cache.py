@@ -0,0 +1,126 @@
+"""
+Offline benchmark of the query embedding cache and the semantic cache.
+
+Replays an agent session against the bundled PDF: each question is followed
+by the retrieval queries a model typically issues for it, with exact
+repeats, case and punctuation changes and small rewordings. Query
+embeddings come from a deterministic bag-of-words model (so rewordings
+land close together) that takes `--embed-latency` seconds per call. Reports embedding calls and retrieval
+time per question with no cache, with the query embedding LRU, and with
+the LRU plus the semantic cache, then checks that a change to the index
+drops the semantic cache.
+
+    python l001-basics/graph-ai-005/bench_query_cache.py --threshold 0.85
+"""
+import argparse
+import hashlib
+import math
+import os
+import sys
+import tempfile
+import time
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_pipeline import CachedEmbeddings
+from hybrid_search import LEXICAL_INDEX_NAME, HybridRetriever, LexicalIndex, tokenize
+from query_cache import SemanticCache
+from rag_index import index_version, load_manifest, save_manifest, sync_index
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Stock_Market_Performance_2024.pdf")
+
+SESSION = [
+    ["How did Apple's stock perform in 2024 and what drove it?",
+     "Apple's stock performance in 2024 and its drivers", "Apple's stock performance in 2024 and its drivers",
+     "apple's stock performance in 2024 and its drivers", "Apple valuation P/E at the end of 2024"],
+    ["Compare the valuations of Amazon and Meta at the end of 2024.",
+     "how was Amazon valued at the end of 2024", "how was Meta valued at the end of 2024",
+     "How was Amazon valued at the end of 2024?", "how was Meta valued at the end of 2024"],
+    ["Which stocks were the best performers of 2024?",
+     "which stocks performed best in 2024", "which stocks performed the best in 2024",
+     "Which stocks performed best in 2024?", "Apple's stock performance in 2024 and its drivers"],
+    ["What drove the rally in the fourth quarter?",
+     "what drove the stock rally in the fourth quarter", "what drove the stock rally in the fourth quarter",
+     "what drove the rally in the fourth quarter of 2024", "how was Meta valued at the end of 2024"],
+]
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Hashed term counts, L2-normalised; takes `latency` seconds per call."""
+
+    def __init__(self, size=512, latency=0.1):
+        self.size = size
+        self.latency = latency
+        self.calls = 0
+
+    def _embed(self, text):
+        vector = [0.0] * self.size
+        for token in tokenize(text):
+            vector[int(hashlib.md5(token.encode()).hexdigest(), 16) % self.size] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._embed(text)
+
+
+def replay(retriever, model):
+    model.calls = 0
+    start = time.perf_counter()
+    for turn in SESSION:
+        for query in turn:
+            retriever.invoke(query)
+    return model.calls, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="seconds per query embedding call")
+    parser.add_argument("--threshold", type=float, default=0.85, help="semantic cache cosine threshold")
+    args = parser.parse_args()
+
+    model = BagOfWordsEmbeddings(latency=args.embed_latency)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    questions = len(SESSION)
+    with tempfile.TemporaryDirectory() as directory:
+        lexical = LexicalIndex(os.path.join(directory, LEXICAL_INDEX_NAME))
+        # Built on the plain model; each run below opens it with its own wrapper.
+        vectorstore = sync_index([PDF_PATH], lambda path: PyPDFLoader(path).lazy_load(), splitter, model,
+                                 directory, "stock_market", lexical=lexical)
+
+        print(f"{questions} questions, {sum(len(turn) for turn in SESSION)} retrieval queries, "
+              f"{args.embed_latency * 1000:.0f} ms per embedding call\n")
+        print(f"{'':<28} {'embeds/question':>16} {'ms/question':>12}")
+        setups = [
+            ("no cache", model, None),
+            ("query embedding LRU", CachedEmbeddings(model, cache_path="off"), None),
+            ("LRU + semantic cache", CachedEmbeddings(model, cache_path="off"),
+             SemanticCache(threshold=args.threshold, version=lambda: index_version(directory))),
+        ]
+        for label, embeddings, cache in setups:
+            vectorstore._embedding_function = embeddings
+            retriever = HybridRetriever(vectorstore, lexical, k=5, cache=cache)
+            calls, seconds = replay(retriever, model)
+            print(f"{label:<28} {calls / questions:>16.2f} {seconds * 1000 / questions:>12.1f}")
+        print(f"\nretriever paths with the semantic cache: {retriever.metrics}")
+
+        # A change to the index (here: the manifest rewritten) drops the cache.
+        time.sleep(0.01)
+        save_manifest(directory, load_manifest(directory))
+        hits = cache.metrics["exact_hits"] + cache.metrics["semantic_hits"]
+        replay(retriever, model)
+        replayed_hits = cache.metrics["exact_hits"] + cache.metrics["semantic_hits"] - hits
+        print(f"after an index change: {cache.metrics['invalidations']} invalidation; the replay refilled "
+              f"the semantic cache ({replayed_hits} hits) while query embeddings stayed cached")
+        lexical.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Recall@k and query latency of retriever_tool's retrieval modes on the
+bundled PDF.
+
+Each query comes with a phrase from the PDF that answers it; a chunk is
+relevant if it contains that phrase. The corpus is indexed into a
+temporary collection with sync_index(), so the lexical index is built the
+same way as in RAG_Agent.py. Vector rankings need real embeddings to mean
+anything; with the default fake model only the lexical side is meaningful.
+
+    python l001-basics/graph-ai-005/bench_retrieval.py
+    python l001-basics/graph-ai-005/bench_retrieval.py --embeddings text-embedding-3-small
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from embedding_pipeline import make_embeddings
+from hybrid_search import LEXICAL_INDEX_NAME, HybridRetriever, LexicalIndex
+from rag_index import sync_index
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Stock_Market_Performance_2024.pdf")
+
+QUERIES = [
+    ("Apple stock performance 2024", "climbing approximately 36%"),
+    ("AAPL price at year end", "ending the year around $252"),
+    ("How much did Palantir stock rise in 2024?", "soared by about 340%"),
+    ("PLTR", "Palantir Technologies (PLTR)"),
+    ("IonQ quantum computing gains", "up about 237%"),
+    ("What was Meta's advertising revenue in 2024?", "roughly $160 billion"),
+    ("Tesla earnings per share", "fell by over 50%"),
+    ("Which index returned about 25% in 2024?", "roughly a 25% total"),
+    ("How much of the S&P 500 return came from the Magnificent 7?", "about 54% of S&P 500"),
+    ("Arm Holdings IPO", "highly anticipated IPO"),
+    ("Nvidia AI chip demand", "approximately 170%"),
+    ("Netflix ad-supported streaming tier", "+92% in 2024"),
+    ("Amazon P/E ratio at the end of 2024", "declined to about 40"),
+    ("How did small-cap stocks like the Russell 2000 do?", "Russell 2000"),
+    ("Why was market sentiment described as frothy?", "frothy"),
+    ("Alphabet Gemini AI model", "Gemini 2.0"),
+    ("Chinese tech stocks Alibaba Tencent", "Alibaba"),
+    ("What risks did analysts see going into 2025?", "volatility could return"),
+]
+
+
+class CountingEmbeddings:
+    """Counts embed_query calls of the wrapped model."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.queries += 1
+        return self.embeddings.embed_query(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", default="fake", help='"fake" or an OpenAI embedding model')
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20, help="timed passes over the queries")
+    args = parser.parse_args()
+
+    embeddings = CountingEmbeddings(make_embeddings(args.embeddings))
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    with tempfile.TemporaryDirectory() as directory:
+        lexical = LexicalIndex(os.path.join(directory, LEXICAL_INDEX_NAME))
+        vectorstore = sync_index([PDF_PATH], lambda path: PyPDFLoader(path).lazy_load(), splitter, embeddings,
+                                 directory, "stock_market", lexical=lexical)
+        stored = vectorstore.get(include=["documents"])
+        relevant = [{cid for cid, text in zip(stored["ids"], stored["documents"]) if phrase in text}
+                    for _, phrase in QUERIES]
+        assert all(relevant), "every query needs at least one relevant chunk"
+
+        print(f"{len(QUERIES)} queries, {len(stored['ids'])} chunks, k={args.k}, embeddings={args.embeddings}\n")
+        print(f"{'mode':<8} {'recall@k':>9} {'hit@k':>7} {'mean ms':>8} {'p95 ms':>7} {'embeds/query':>13}")
+        for mode in ("vector", "lexical", "hybrid"):
+            retriever = HybridRetriever(vectorstore, lexical, k=args.k, mode=mode)
+            recall = hits = 0.0
+            for (query, _), wanted in zip(QUERIES, relevant):
+                found = {doc.id for doc in retriever.invoke(query)}
+                recall += len(found & wanted) / len(wanted)
+                hits += bool(found & wanted)
+
+            embeddings.queries = 0
+            latencies = []
+            for _ in range(args.repeat):
+                for query, _ in QUERIES:
+                    start = time.perf_counter()
+                    retriever.invoke(query)
+                    latencies.append((time.perf_counter() - start) * 1000)
+            p95 = statistics.quantiles(latencies, n=20)[-1]
+            print(f"{mode:<8} {recall / len(QUERIES):>9.2f} {hits / len(QUERIES):>7.2f} "
+                  f"{statistics.mean(latencies):>8.2f} {p95:>7.2f} {embeddings.queries / len(latencies):>13.2f}")
+        lexical.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Offline benchmark of take_action's tool execution (tool_runner.py).
+
+A turn of `--calls` retrieval calls against a stand-in tool that sleeps
+between `--min-latency` and `--max-latency` seconds per query (like an
+embedding call plus a search), run one after another as take_action used
+to, with run_tool_calls() and with arun_tool_calls() on sync and on
+async tools. Also checks that results keep the call order and that a call
+over the timeout gets an error message without holding up the others.
+
+    python l001-basics/graph-ai-005/bench_tool_calls.py --calls 4 8
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import StructuredTool
+
+from tool_runner import arun_tool_calls, run_tool_calls
+
+
+def make_tools(min_latency, max_latency, calls):
+    def latency(query):
+        # Spread evenly between the bounds; the last query is the slowest.
+        index = int(query.split()[-1])
+        return min_latency + (max_latency - min_latency) * index / max(1, calls - 1)
+
+    def search(query: str) -> str:
+        """Search the document."""
+        time.sleep(latency(query))
+        return f"results for {query}"
+
+    async def asearch(query: str) -> str:
+        """Search the document."""
+        await asyncio.sleep(latency(query))
+        return f"results for {query}"
+
+    return (StructuredTool.from_function(func=search, name="retriever_tool"),
+            StructuredTool.from_function(coroutine=asearch, name="retriever_tool"))
+
+
+def serial(tool_calls, tools_by_name):
+    # The loop take_action had before.
+    return [ToolMessage(tool_call_id=call["id"], name=call["name"],
+                        content=str(tools_by_name[call["name"]].invoke(call["args"])))
+            for call in tool_calls]
+
+
+def timed(run):
+    start = time.perf_counter()
+    messages = run()
+    return messages, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--min-latency", type=float, default=0.1)
+    parser.add_argument("--max-latency", type=float, default=0.4)
+    args = parser.parse_args()
+
+    print(f"{'calls':>5} {'slowest':>8} {'serial':>8} {'threads':>8} {'gather/sync':>12} {'gather/async':>13}")
+    for n in args.calls:
+        sync_tool, async_tool = make_tools(args.min_latency, args.max_latency, n)
+        # Slowest first, so finishing order is the reverse of call order.
+        tool_calls = [{"id": f"call_{i}", "name": "retriever_tool", "args": {"query": f"query {n - 1 - i}"}}
+                      for i in range(n)]
+        sync_tools = {"retriever_tool": sync_tool}
+        async_tools = {"retriever_tool": async_tool}
+        expected, serial_seconds = timed(lambda: serial(tool_calls, sync_tools))
+        results = [
+            timed(lambda: run_tool_calls(tool_calls, sync_tools)),
+            timed(lambda: asyncio.run(arun_tool_calls(tool_calls, sync_tools))),
+            timed(lambda: asyncio.run(arun_tool_calls(tool_calls, async_tools))),
+        ]
+        for messages, _ in results:
+            assert [(m.tool_call_id, m.content) for m in messages] == [(m.tool_call_id, m.content) for m in expected]
+        print(f"{n:>5} {args.max_latency:>8.2f} {serial_seconds:>8.2f} {results[0][1]:>8.2f} "
+              f"{results[1][1]:>12.2f} {results[2][1]:>13.2f}")
+
+    # The slowest call runs over the timeout: it alone gets an error, in its place.
+    sync_tool, _ = make_tools(args.min_latency, args.max_latency, 3)
+    tool_calls = [{"id": f"call_{i}", "name": name, "args": {"query": f"query {i}"}}
+                  for i, name in enumerate(["retriever_tool", "no_such_tool", "retriever_tool"])]
+    timeout = (args.min_latency + args.max_latency) / 2 + 0.05
+    messages, seconds = timed(lambda: run_tool_calls(tool_calls, {"retriever_tool": sync_tool}, timeout=timeout))
+    print(f"\ntimeout {timeout:.2f}s, {seconds:.2f}s for the turn:")
+    for message in messages:
+        print(f"  {message.tool_call_id}: {message.status:<7} {message.content}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
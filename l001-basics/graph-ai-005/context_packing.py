@@ -0,0 +1,181 @@
+"""
+Context packing for the retrieval results of one take_action turn.
+
+retriever_tool returns its documents as the ToolMessage artifact. Before
+the messages go back to the model, pack_tool_messages():
+
+1. ranks every retrieved chunk of the turn by relevance: reciprocal rank
+   fusion over the calls, so a chunk several queries found ranks higher;
+2. merges chunks from the same page that overlap (chunk_overlap) or touch
+   into one passage, using the splitter's start_index;
+3. cuts out text already sent earlier in the conversation (recorded as
+   spans in earlier ToolMessage artifacts) and drops what is left if it is
+   shorter than CONTEXT_MIN_FRAGMENT characters;
+4. keeps the best passages that fit in CONTEXT_TOKEN_BUDGET tokens.
+
+Each passage goes into the message of the first call that retrieved it;
+the other calls refer to it by number.
+
+    CONTEXT_PACKING=on        # "off" sends every chunk verbatim, as before
+    CONTEXT_TOKEN_BUDGET=3000 # retrieved tokens per turn
+    CONTEXT_MIN_FRAGMENT=80
+"""
+import functools
+import hashlib
+import os
+
+from langchain_core.messages import ToolMessage
+
+CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "on") == "on"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_MIN_FRAGMENT = int(os.getenv("CONTEXT_MIN_FRAGMENT", "80"))
+
+RRF_K = 60
+NOTHING_NEW = ("No new passages: what this query found was already provided earlier in the conversation "
+               "or ranked below the other results of this turn.")
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """tiktoken's count when it is available, otherwise about 4 characters per token."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _passage(doc, score, call):
+    metadata = doc.metadata or {}
+    start = metadata.get("start_index")
+    return {
+        "source": metadata.get("source"),
+        "page": metadata.get("page"),
+        "start": start,
+        "end": None if start is None else start + len(doc.page_content),
+        "text": doc.page_content,
+        "score": score,
+        "calls": {call},
+    }
+
+
+def _merge(passages):
+    """Overlapping or touching passages of the same page, as one passage each."""
+    merged = []
+    positioned = sorted((p for p in passages if p["start"] is not None),
+                        key=lambda p: (str(p["source"]), str(p["page"]), p["start"]))
+    for passage in positioned:
+        last = merged[-1] if merged else None
+        if (last is not None and (last["source"], last["page"]) == (passage["source"], passage["page"])
+                and passage["start"] <= last["end"] + 1):
+            if passage["end"] > last["end"]:
+                gap = "\n" if passage["start"] > last["end"] else ""
+                last["text"] += gap + passage["text"][max(0, last["end"] - passage["start"]):]
+                last["end"] = passage["end"]
+            last["score"] = max(last["score"], passage["score"])
+            last["calls"] |= passage["calls"]
+        else:
+            merged.append(dict(passage, calls=set(passage["calls"])))
+    # Chunks without a position (no start_index) are only deduplicated by text.
+    return merged + [p for p in passages if p["start"] is None]
+
+
+def _subtract(passage, seen, min_fragment):
+    """The parts of `passage` not sent before, as passages of at least min_fragment characters."""
+    if passage["start"] is None:
+        return [] if _text_key(passage["text"]) in seen["texts"] else [passage]
+    covered = sorted(seen["spans"].get((passage["source"], passage["page"]), []))
+    fragments, cursor = [], passage["start"]
+    for start, end in covered + [(passage["end"], passage["end"])]:
+        if start > cursor:
+            piece_end = min(start, passage["end"])
+            text = passage["text"][cursor - passage["start"]:piece_end - passage["start"]]
+            if len(text.strip()) >= min_fragment:
+                fragments.append(dict(passage, start=cursor, end=piece_end, text=text.strip()))
+        cursor = max(cursor, end)
+        if cursor >= passage["end"]:
+            break
+    return fragments
+
+
+def seen_spans(history):
+    """What earlier packed ToolMessages in `history` already sent to the model."""
+    seen = {"spans": {}, "texts": set()}
+    for message in history:
+        artifact = getattr(message, "artifact", None)
+        if isinstance(message, ToolMessage) and isinstance(artifact, dict):
+            for span in artifact.get("packed_spans", []):
+                if span.get("start") is None:
+                    seen["texts"].add(span["text_key"])
+                else:
+                    seen["spans"].setdefault((span["source"], span["page"]), []).append((span["start"], span["end"]))
+    return seen
+
+
+def pack_tool_messages(messages, history, budget=CONTEXT_TOKEN_BUDGET, min_fragment=CONTEXT_MIN_FRAGMENT):
+    """
+    The turn's ToolMessages with retrieval results packed, and the prompt
+    tokens before and after. Messages without documents are left as they are.
+    """
+    passages = {}
+    for call, message in enumerate(messages):
+        artifact = message.artifact if isinstance(message.artifact, dict) else {}
+        for rank, doc in enumerate(artifact.get("documents", []), start=1):
+            key = (doc.metadata.get("source"), doc.metadata.get("page"), doc.metadata.get("start_index"),
+                   _text_key(doc.page_content))
+            score = 1.0 / (RRF_K + rank)
+            if key in passages:
+                passages[key]["score"] += score
+                passages[key]["calls"].add(call)
+            else:
+                passages[key] = _passage(doc, score, call)
+    before = sum(count_tokens(message.content) for message in messages)
+    if not passages:
+        return messages, {"before": before, "after": before, "saved": 0}
+
+    seen = seen_spans(history)
+    fragments = [f for p in _merge(list(passages.values())) for f in _subtract(p, seen, min_fragment)]
+    fragments.sort(key=lambda f: f["score"], reverse=True)
+    kept, used = [], 0
+    for fragment in fragments:
+        tokens = count_tokens(fragment["text"])
+        if used + tokens <= budget:
+            kept.append(fragment)
+            used += tokens
+
+    numbers = {id(f): n for n, f in enumerate(kept, start=1)}
+    packed = []
+    for call, message in enumerate(messages):
+        if not isinstance(message.artifact, dict) or "documents" not in message.artifact:
+            packed.append(message)
+            continue
+        own = [f for f in kept if min(f["calls"]) == call]
+        elsewhere = [numbers[id(f)] for f in kept if call in f["calls"] and min(f["calls"]) != call]
+        blocks = [f"Document {numbers[id(f)]} (page {f['page'] + 1 if isinstance(f['page'], int) else '?'}):\n{f['text']}"
+                  for f in own]
+        if elsewhere:
+            label = "Document" if len(elsewhere) == 1 else "Documents"
+            blocks.append(f"Also relevant to this query: {label} {', '.join(map(str, elsewhere))} "
+                          "in the results of another search in this turn.")
+        if not message.artifact["documents"]:
+            content = message.content
+        else:
+            content = "\n\n".join(blocks) or NOTHING_NEW
+        spans = [{"source": f["source"], "page": f["page"], "start": f["start"], "end": f["end"],
+                  "text_key": _text_key(f["text"])} for f in own]
+        packed.append(message.model_copy(update={"content": content,
+                                                 "artifact": dict(message.artifact, packed_spans=spans)}))
+    after = sum(count_tokens(message.content) for message in packed)
+    return packed, {"before": before, "after": after, "saved": before - after}
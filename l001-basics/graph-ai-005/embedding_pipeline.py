@@ -0,0 +1,220 @@
+"""
+Batched, concurrent, cached document embeddings for the RAG index.
+
+CachedEmbeddings wraps any LangChain embedding model. embed_documents():
+
+- looks every text up in a content-addressed SQLite cache (key: SHA-256 of
+  model id and text), so a chunk is paid for once, whichever collection or
+  run it comes from;
+- embeds the misses in batches of EMBED_BATCH_SIZE on at most
+  EMBED_CONCURRENCY threads;
+- retries rate-limited batches with exponential backoff and jitter, honouring
+  Retry-After when the error carries one. While one batch backs off the
+  others wait too, instead of hammering the API.
+
+embed_query() keeps the last QUERY_CACHE_SIZE query embeddings in memory,
+so a query the agent repeats within a session is embedded once.
+
+Settings (environment):
+
+    EMBED_BATCH_SIZE=64
+    EMBED_CONCURRENCY=4
+    EMBED_MAX_RETRIES=6
+    QUERY_CACHE_SIZE=1024                                               # 0 disables the query cache
+    EMBED_CACHE_PATH=l001-basics/graph-ai-005/.embedding_cache.sqlite3   # "off" disables the cache
+    EMBEDDING_MODEL=text-embedding-3-small                              # "fake" for offline runs
+"""
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embedding_cache.sqlite3")
+)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+
+def make_embeddings(model=EMBEDDING_MODEL):
+    """The embedding model for `model`; "fake" gives a deterministic offline one."""
+    if model == "fake":
+        return DeterministicFakeEmbedding(size=1536)
+    from langchain_openai import OpenAIEmbeddings
+
+    # Retries are done by CachedEmbeddings, across all of its batches.
+    return OpenAIEmbeddings(model=model, max_retries=0)
+
+
+def model_id(embeddings):
+    """What a stored vector depends on besides the text."""
+    if hasattr(embeddings, "model_id"):
+        return embeddings.model_id
+    detail = getattr(embeddings, "model", None) or getattr(embeddings, "size", "")
+    return f"{type(embeddings).__name__}:{detail}"
+
+
+def is_rate_limit(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError" or "rate limit" in str(error).lower()
+
+
+def retry_after(error):
+    """Seconds from the Retry-After header of a rate limit error, if it has one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingCache:
+    """model id + text -> float32 vector, in one SQLite table."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self):
+        # Opened on first use (always under self._lock), so that ingest
+        # workers forked before then do not inherit an open connection.
+        if self._connection is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+            self._connection = conn
+        return self._connection
+
+    @staticmethod
+    def key(model, text):
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            # 500 keys per query stays below SQLite's bound parameter limit.
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                )
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                ((key, array("f", vector).tobytes()) for key, vector in items),
+            )
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, cache_path=EMBED_CACHE_PATH, batch_size=EMBED_BATCH_SIZE,
+                 concurrency=EMBED_CONCURRENCY, max_retries=EMBED_MAX_RETRIES,
+                 backoff_base=1.0, backoff_max=60.0, query_cache_size=QUERY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.model_id = model_id(embeddings)
+        self.cache = EmbeddingCache(cache_path) if cache_path and cache_path != "off" else None
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.query_cache_size = query_cache_size
+        self._queries = OrderedDict()  # query text -> vector, least recently used first
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+        self.metrics = {"texts": 0, "cache_hits": 0, "embedded": 0, "batches": 0, "retries": 0,
+                        "embed_seconds": 0.0, "query_hits": 0, "query_misses": 0}
+
+    def embed_documents(self, texts):
+        keys = [EmbeddingCache.key(self.model_id, text) for text in texts]
+        found = self.cache.get_many(list(set(keys))) if self.cache else {}
+
+        # Each distinct text that is not cached is embedded once.
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        missing = list(missing.items())
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+
+        if len(batches) > 1 and self.concurrency > 1:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as pool:
+                for result in pool.map(self._embed_batch, batches):
+                    found.update(result)
+        else:
+            for batch in batches:
+                found.update(self._embed_batch(batch))
+
+        with self._lock:
+            self.metrics["texts"] += len(texts)
+            self.metrics["cache_hits"] += len(texts) - len(missing)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        with self._lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                self.metrics["query_hits"] += 1
+                return list(vector)
+            self.metrics["query_misses"] += 1
+        vector = self.embeddings.embed_query(text)
+        if self.query_cache_size > 0:
+            with self._lock:
+                self._queries[text] = vector
+                while len(self._queries) > self.query_cache_size:
+                    self._queries.popitem(last=False)
+        return list(vector)
+
+    def _embed_batch(self, batch):
+        texts = [text for _, text in batch]
+        for attempt in range(self.max_retries + 1):
+            # Wait out a backoff that another batch started.
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            start = time.perf_counter()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                break
+            except Exception as e:
+                if not is_rate_limit(e) or attempt == self.max_retries:
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"Embedding batch rate limited, retrying in {delay:.1f}s")
+                with self._lock:
+                    self.metrics["retries"] += 1
+                    self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+        result = {key: vector for (key, _), vector in zip(batch, vectors)}
+        if self.cache:
+            self.cache.put_many(result.items())
+        with self._lock:
+            self.metrics["embedded"] += len(batch)
+            self.metrics["batches"] += 1
+            self.metrics["embed_seconds"] += time.perf_counter() - start
+        return result
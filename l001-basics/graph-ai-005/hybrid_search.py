@@ -0,0 +1,219 @@
+"""
+Hybrid lexical + vector retrieval for retriever_tool.
+
+LexicalIndex is a BM25 inverted index (SQLite FTS5) over the same chunk
+ids as the Chroma collection, kept in step with it by rag_index.sync_index
+and stored next to it. HybridRetriever ranks a query both ways and fuses
+the two rankings with reciprocal rank fusion (RRF), so exact terms the
+embedding misses (tickers, figures, names) still surface.
+
+Short keyword queries whose terms all occur together in some chunk are
+answered from the lexical index alone, without an embedding call. Other
+queries can be answered from a semantic cache (query_cache.py) before the
+collection is searched.
+
+    RETRIEVAL_MODE=hybrid     # or "vector" (Chroma only) / "lexical" (BM25 only)
+    HYBRID_KEYWORD_TERMS=4    # up to this many query terms may skip the embedding; 0 never skips
+    HYBRID_FETCH_K=20         # candidates taken from each ranking before fusion
+    HYBRID_RRF_K=60
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from langchain_core.documents import Document
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_KEYWORD_TERMS = int(os.getenv("HYBRID_KEYWORD_TERMS", "4"))
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+LEXICAL_INDEX_NAME = "lexical.sqlite3"
+
+STOPWORDS = frozenset(
+    "a about after all also an and any are as at be been but by can could did do does for from had has have how "
+    "i if in into is it its me my of on or our s than that the their them then there these they this those to "
+    "was we were what when where which while who why will with would you your".split()
+)
+TOKEN = re.compile(r"\d+(?:[.,]\d+)*|[a-z]+(?:&[a-z]+)*")
+
+
+def tokenize(text):
+    """
+    Lowercased words and numbers without stopwords. "S&P" stays one token,
+    "1,000" becomes "1000", and a trailing plural "s" is dropped, so "stocks"
+    matches "stock".
+    """
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if token[0].isdigit():
+            token = token.replace(",", "")
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _match(terms, require_all=False):
+    # Every term is quoted, so nothing in it is read as FTS5 query syntax.
+    return (" AND " if require_all else " OR ").join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class LexicalIndex:
+    """BM25 over chunk ids; the text itself stays in the Chroma collection."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self):
+        # Opened on first use (always under self._lock), so that ingest
+        # workers forked before then do not inherit an open connection.
+        if self._connection is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            with conn:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS chunk_ids (rowid INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL)")
+                # Tokens are produced by tokenize(); FTS5 only has to split on spaces.
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(body, tokenize = \"unicode61 tokenchars '&.'\")"
+                )
+            self._connection = conn
+        return self._connection
+
+    def add(self, items):
+        """Index (chunk id, text) pairs, replacing chunks already indexed under those ids."""
+        items = list(items)
+        if not items:
+            return
+        with self._lock, self._conn:
+            self._delete([cid for cid, _ in items])
+            for cid, text in items:
+                rowid = self._conn.execute("INSERT INTO chunk_ids (id) VALUES (?)", (cid,)).lastrowid
+                self._conn.execute("INSERT INTO chunks (rowid, body) VALUES (?, ?)", (rowid, " ".join(tokenize(text))))
+
+    def delete(self, ids):
+        with self._lock, self._conn:
+            self._delete(ids)
+
+    def _delete(self, ids):
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            marks = ",".join("?" * len(part))
+            self._conn.execute(f"DELETE FROM chunks WHERE rowid IN (SELECT rowid FROM chunk_ids WHERE id IN ({marks}))", part)
+            self._conn.execute(f"DELETE FROM chunk_ids WHERE id IN ({marks})", part)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM chunk_ids")
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM chunk_ids").fetchone()[0]
+
+    def search(self, terms, k, require_all=False):
+        """Chunk ids ranked by BM25 for `terms` (any of them, or all with require_all)."""
+        if not terms:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_ids.id FROM chunks JOIN chunk_ids ON chunk_ids.rowid = chunks.rowid "
+                "WHERE chunks MATCH ? ORDER BY bm25(chunks) LIMIT ?",
+                (_match(terms, require_all), k),
+            ).fetchall()
+        return [cid for (cid,) in rows]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def reciprocal_rank_fusion(rankings, rrf_k=HYBRID_RRF_K):
+    """Ids from several rankings, best first, by the sum of 1 / (rrf_k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking, start=1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever:
+    """Drop-in for vectorstore.as_retriever(...): invoke(query) returns k documents."""
+
+    def __init__(self, vectorstore, lexical, k=5, mode=RETRIEVAL_MODE, keyword_terms=HYBRID_KEYWORD_TERMS,
+                 fetch_k=HYBRID_FETCH_K, rrf_k=HYBRID_RRF_K, cache=None):
+        if mode not in ("hybrid", "vector", "lexical"):
+            raise ValueError(f"Unsupported RETRIEVAL_MODE: {mode!r}")
+        self.vectorstore = vectorstore
+        self.lexical = lexical
+        self.k = k
+        self.mode = mode
+        self.keyword_terms = keyword_terms
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.metrics = {"queries": 0, "lexical_only": 0, "vector_searches": 0, "cache_hits": 0, "seconds": 0.0}
+
+    def invoke(self, query):
+        start = time.perf_counter()
+        docs, path = self._retrieve(query)
+        with self._lock:
+            self.metrics["queries"] += 1
+            self.metrics[path] += 1
+            self.metrics["seconds"] += time.perf_counter() - start
+        return docs
+
+    def _retrieve(self, query):
+        """The documents for `query` and which path produced them (a metrics key)."""
+        terms = tokenize(query)
+        if self.mode == "lexical":
+            return self._documents(self.lexical.search(terms, self.k)), "lexical_only"
+
+        if self.cache is not None:
+            docs = self.cache.get(query)
+            if docs is not None:
+                return docs, "cache_hits"
+
+        if self.mode == "hybrid" and 0 < len(set(terms)) <= self.keyword_terms:
+            exact = self.lexical.search(terms, self.k, require_all=True)
+            if exact:
+                # A keyword query that some chunks match in full: rank on BM25 alone.
+                ranked = exact + [cid for cid in self.lexical.search(terms, self.k) if cid not in exact]
+                return self._documents(ranked[:self.k]), "lexical_only"
+
+        vector = self.vectorstore.embeddings.embed_query(query)
+        if self.cache is not None:
+            docs = self.cache.get_similar(vector)
+            if docs is not None:
+                return docs, "cache_hits"
+
+        if self.mode == "vector":
+            docs = self.vectorstore.similarity_search_by_vector(vector, k=self.k)
+        else:
+            lexical_ids = self.lexical.search(terms, self.fetch_k)
+            vector_docs = self.vectorstore.similarity_search_by_vector(vector, k=self.fetch_k)
+            fused = reciprocal_rank_fusion([lexical_ids, [doc.id for doc in vector_docs]], self.rrf_k)[:self.k]
+            docs = self._documents(fused, known={doc.id: doc for doc in vector_docs})
+        if self.cache is not None:
+            self.cache.put(query, vector, docs)
+        return docs, "vector_searches"
+
+    def _documents(self, ids, known=None):
+        """Documents for chunk ids, in order; ones not already at hand are read from Chroma by id."""
+        known = dict(known or {})
+        missing = [cid for cid in ids if cid not in known]
+        if missing:
+            found = self.vectorstore.get(ids=missing, include=["documents", "metadatas"])
+            for cid, text, metadata in zip(found["ids"], found["documents"], found["metadatas"]):
+                known[cid] = Document(id=cid, page_content=text, metadata=metadata or {})
+        return [known[cid] for cid in ids if cid in known]
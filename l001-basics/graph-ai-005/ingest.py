@@ -0,0 +1,139 @@
+"""
+Streaming page -> chunk stage of the RAG index (see rag_index.sync_index).
+
+stream_chunks() yields (path, chunks) for every page of every source, as
+soon as the page is split, and (path, None) once a source is done. Nothing
+holds a whole document: pages are loaded lazily and dropped once split.
+
+With several sources, PDF text extraction and splitting (the CPU-bound
+part) run in a pool of worker processes, one source at a time per worker.
+Workers hand pages over through a queue of at most INGEST_QUEUE_PAGES
+entries and wait when it is full, so memory stays bounded however far
+ahead of embedding they get. The pool needs the fork start method (Linux,
+macOS): the agent script runs at import, so workers cannot re-import it.
+
+A forked child inherits locks held by the parent's other threads, including
+native ones such as Chroma's, and the SQLite state of its open connections.
+So stream_chunks() forks when it is called, not on the first next(), and
+sync_index calls it before it opens the Chroma client or embeds anything;
+the embedding cache and the lexical index only connect on first use.
+
+    INGEST_WORKERS=0          # 0: one per CPU, at most one per changed source; 1: no pool
+    INGEST_QUEUE_PAGES=64
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+INGEST_QUEUE_PAGES = int(os.getenv("INGEST_QUEUE_PAGES", "64"))
+
+
+class IngestError(RuntimeError):
+    """A source could not be loaded or split in a worker process."""
+
+
+def chunk_id(doc):
+    """Content hash of a chunk: its text plus the metadata stored with it."""
+    payload = json.dumps([doc.page_content, doc.metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chunk_pages(path, load, splitter):
+    """[(chunk id, chunk), ...] for each page of one source, one page at a time."""
+    for page in load(path):
+        yield [(chunk_id(doc), doc) for doc in splitter.split_documents([page])]
+
+
+def _worker(paths, out, load, splitter):
+    for path in iter(paths.get, None):
+        try:
+            for chunks in chunk_pages(path, load, splitter):
+                out.put((path, chunks))
+            out.put((path, None))
+        except Exception as e:
+            out.put((path, IngestError(f"{path}: {type(e).__name__}: {e}")))
+
+
+def _chunk_sources(paths, load, splitter):
+    for path in paths:
+        for chunks in chunk_pages(path, load, splitter):
+            yield path, chunks
+        yield path, None
+
+
+class _PoolStream:
+    """(path, chunks) from worker processes that are already running."""
+
+    def __init__(self, processes, out, sources):
+        self.processes = processes
+        self.out = out
+        self.sources = sources
+
+    def __iter__(self):
+        remaining = self.sources
+        try:
+            while remaining:
+                try:
+                    path, chunks = self.out.get(timeout=1)
+                except queue.Empty:
+                    dead = [p.exitcode for p in self.processes if p.exitcode not in (None, 0)]
+                    if dead:
+                        raise IngestError(f"ingest worker exited with code {dead[0]}") from None
+                    continue
+                if isinstance(chunks, Exception):
+                    raise chunks
+                if chunks is None:
+                    remaining -= 1
+                yield path, chunks
+        finally:
+            self.close()
+
+    def close(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def stream_chunks(paths, load, splitter, workers=INGEST_WORKERS, queue_pages=INGEST_QUEUE_PAGES):
+    """
+    Iterable of (path, chunks) as described above; close() stops the workers
+    early. With a pool the workers are forked by this call, so call it before
+    this process starts threads or opens connections (see the module
+    docstring).
+    """
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return _chunk_sources(paths, load, splitter)
+
+    context = multiprocessing.get_context("fork")
+    todo = context.Queue()
+    for path in paths:
+        todo.put(path)
+    for _ in range(workers):
+        todo.put(None)
+    out = context.Queue(maxsize=queue_pages)
+    processes = [
+        context.Process(target=_worker, args=(todo, out, load, splitter), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    return _PoolStream(processes, out, len(paths))
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process, or of its largest finished child."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return usage / (1024 * 1024 if sys.platform == "darwin" else 1024)
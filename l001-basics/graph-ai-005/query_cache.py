@@ -0,0 +1,107 @@
+"""
+Semantic retrieval cache for HybridRetriever.
+
+Retrieval results are kept per query together with the query's embedding.
+A later query whose embedding has a cosine similarity of at least
+SEMANTIC_CACHE_THRESHOLD with a cached one ("How did Apple do in 2024?"
+after "Apple performance in 2024") gets the cached documents without
+searching the collection again; the same query (up to case and spacing)
+is served without even being embedded.
+
+Entries belong to one version of the index (rag_index.index_version): once
+the collection changes, the whole cache is dropped.
+
+    SEMANTIC_CACHE=off                # "on" enables it
+    SEMANTIC_CACHE_THRESHOLD=0.95
+    SEMANTIC_CACHE_SIZE=256           # entries; least recently used are evicted first
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "off") == "on"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, maxsize=SEMANTIC_CACHE_SIZE, version=None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._version = version or (lambda: None)
+        self._current = self._version()
+        self._entries = OrderedDict()  # normalized query -> (unit vector, documents)
+        # Unit vectors of all entries and their keys, stacked for one matrix
+        # product per lookup; rebuilt after entries are added or dropped.
+        self._matrix = None
+        self._keys = []
+        self._lock = threading.Lock()
+        self.metrics = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0}
+
+    def _check_version(self):
+        # Called with the lock held.
+        version = self._version()
+        if version != self._current:
+            self._current = version
+            self._entries.clear()
+            self._matrix = None
+            self.metrics["invalidations"] += 1
+
+    def get(self, query):
+        """Documents cached for this exact query, or None."""
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["exact_hits"] += 1
+            return list(entry[1])
+
+    def get_similar(self, vector):
+        """Documents of the most similar cached query if it is within the threshold, or None."""
+        with self._lock:
+            self._check_version()
+            if not self._entries:
+                self.metrics["misses"] += 1
+                return None
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[key][0] for key in self._keys])
+            similarities = self._matrix @ _unit(vector)
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                self.metrics["misses"] += 1
+                return None
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            self.metrics["semantic_hits"] += 1
+            return list(self._entries[key][1])
+
+    def put(self, query, vector, documents):
+        with self._lock:
+            self._check_version()
+            key = normalize_query(query)
+            self._entries[key] = (_unit(vector), list(documents))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
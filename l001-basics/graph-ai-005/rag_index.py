@@ -0,0 +1,209 @@
+"""
+Incremental Chroma index for RAG_Agent.py.
+
+A manifest next to the collection records, per source file, its size, mtime
+and SHA-256 and the ids of its chunks. Chunk ids are content hashes, so on
+startup:
+
+- nothing changed: the collection is opened as is; no PDF is loaded, split or
+  embedded;
+- a file changed: it is re-split, only chunks with new ids are embedded and
+  chunks that no longer exist are deleted;
+- a file is gone: its chunks are deleted;
+- the embedding model or the chunking changed, or there is no manifest for an
+  existing collection (e.g. one built by Chroma.from_documents on every
+  start, full of duplicates): the collection is rebuilt once.
+"""
+import hashlib
+import json
+import os
+import time
+
+from langchain_chroma import Chroma
+
+from embedding_pipeline import model_id
+from ingest import INGEST_WORKERS, peak_rss_mb, stream_chunks
+
+MANIFEST_NAME = "index_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def index_settings(embeddings, splitter):
+    """What the stored vectors depend on besides the text; a change means a rebuild."""
+    return {
+        "version": MANIFEST_VERSION,
+        "embeddings": model_id(embeddings),
+        "chunk_size": getattr(splitter, "_chunk_size", None),
+        "chunk_overlap": getattr(splitter, "_chunk_overlap", None),
+        "add_start_index": getattr(splitter, "_add_start_index", False),
+    }
+
+
+def load_manifest(persist_directory):
+    try:
+        with open(os.path.join(persist_directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_manifest(persist_directory, manifest):
+    # Written only after the collection is updated, and atomically, so an
+    # interrupted sync is redone on the next start instead of trusted.
+    path = os.path.join(persist_directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def index_version(persist_directory):
+    """Changes whenever sync_index changes the collection (the manifest's mtime)."""
+    try:
+        return os.stat(os.path.join(persist_directory, MANIFEST_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _unchanged(path, entry):
+    """Size and mtime first; the hash only when they differ (e.g. after a copy)."""
+    if entry is None:
+        return False
+    stat = os.stat(path)
+    if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    return stat.st_size == entry["size"] and file_sha256(path) == entry["sha256"]
+
+
+def _upsert(vectorstore, lexical, pending):
+    if pending:
+        # Chroma upserts by id, so a batch written before an interrupted sync
+        # is simply written again on the next one.
+        vectorstore.add_documents([doc for _, doc in pending], ids=[cid for cid, _ in pending])
+        if lexical is not None:
+            lexical.add((cid, doc.page_content) for cid, doc in pending)
+    return len(pending)
+
+
+def _delete(vectorstore, lexical, ids):
+    if ids:
+        vectorstore.delete(ids=ids)
+        if lexical is not None:
+            lexical.delete(ids)
+    return len(ids)
+
+
+def _mb(value):
+    return "n/a" if value is None else f"{value:.0f} MB"
+
+
+def sync_index(sources, load, splitter, embeddings, persist_directory, collection_name, batch_size=256,
+               workers=INGEST_WORKERS, lexical=None):
+    """
+    Bring the collection in line with `sources` and return it as a Chroma
+    vector store. `load(path)` returns (or lazily yields) the pages of one
+    source file, `splitter` chunks them. New chunks are upserted
+    `batch_size` at a time. Several changed sources are loaded by up to
+    `workers` processes. A `lexical` index (hybrid_search.LexicalIndex) is
+    kept in step with the collection.
+    """
+    start = time.perf_counter()
+    os.makedirs(persist_directory, exist_ok=True)
+    settings = index_settings(embeddings, splitter)
+    manifest = load_manifest(persist_directory)
+    rebuild = manifest is None or manifest.get("settings") != settings
+    if rebuild:
+        manifest = {"settings": settings, "files": {}}
+    files = manifest["files"]
+
+    sources = [os.path.normpath(path) for path in sources]
+    changed = [path for path in sources if not _unchanged(path, files.get(path))]
+    removed = [path for path in files if path not in sources]
+    # Extraction workers are forked here, before Chroma (whose native threads a
+    # forked child must not inherit) or any SQLite connection is opened.
+    stream = stream_chunks(changed, load, splitter, workers=workers) if changed else None
+    try:
+        vectorstore = Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory,
+        )
+        if rebuild and vectorstore._collection.count():
+            print("Index settings changed or no manifest found: rebuilding the collection")
+            vectorstore.delete_collection()
+            vectorstore = Chroma(
+                collection_name=collection_name,
+                embedding_function=embeddings,
+                persist_directory=persist_directory,
+            )
+
+        if lexical is not None and lexical.count() != sum(len(entry["chunk_ids"]) for entry in files.values()):
+            # A lexical index that is new or out of step (e.g. the collection was
+            # rebuilt): refill it from the stored chunks, no embedding needed.
+            lexical.clear()
+            stored = vectorstore.get(include=["documents"])
+            lexical.add(zip(stored["ids"], stored["documents"]))
+            print(f"Lexical index rebuilt from {len(stored['ids'])} stored chunks")
+
+        if not changed and not removed:
+            print(f"Index is up to date ({len(sources)} files, "
+                  f"{sum(len(files[p]['chunk_ids']) for p in sources)} chunks, {time.perf_counter() - start:.2f}s)")
+            return vectorstore
+
+        added = deleted = 0
+        for path in removed:
+            deleted += _delete(vectorstore, lexical, files.pop(path)["chunk_ids"])
+
+        # Page -> chunk -> embed batch -> upsert, with pages from several changed
+        # sources interleaved (see ingest.py). Only chunk ids are kept per source;
+        # a batch may mix sources.
+        seen = {path: {"old_ids": set(files.get(path, {}).get("chunk_ids", [])), "chunk_ids": {}, "pages": 0}
+                for path in changed}
+        pending = []
+        pages = 0
+        extract_start = time.perf_counter()
+        for path, chunks in stream or ():
+            state = seen[path]
+            if chunks is None:
+                print(f"{path} has been loaded and has {state['pages']} pages")
+                deleted += _delete(vectorstore, lexical,
+                                   [cid for cid in state["old_ids"] if cid not in state["chunk_ids"]])
+                stat = os.stat(path)
+                files[path] = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": file_sha256(path),
+                    "chunk_ids": list(state["chunk_ids"]),
+                }
+                continue
+
+            pages += 1
+            state["pages"] += 1
+            for cid, doc in chunks:
+                if cid in state["chunk_ids"]:
+                    continue  # identical chunks are stored once
+                state["chunk_ids"][cid] = None  # ordered set
+                if cid not in state["old_ids"]:
+                    pending.append((cid, doc))
+                if len(pending) >= batch_size:
+                    added += _upsert(vectorstore, lexical, pending)
+                    pending = []
+        added += _upsert(vectorstore, lexical, pending)
+        seconds = time.perf_counter() - extract_start
+    finally:
+        if stream is not None:
+            stream.close()
+
+    save_manifest(persist_directory, manifest)
+    print(f"Index updated: {len(changed)} changed and {len(removed)} removed files, "
+          f"{added} chunks embedded, {deleted} deleted ({time.perf_counter() - start:.2f}s)")
+    print(f"Ingested {pages} pages at {pages / seconds if seconds else 0:.0f} pages/s, "
+          f"peak RSS {_mb(peak_rss_mb())} (largest worker {_mb(peak_rss_mb(children=True))})")
+    return vectorstore
@@ -0,0 +1,162 @@
+"""
+Concurrent execution of the tool calls in one model turn, for take_action.
+
+run_tool_calls() runs every call of a turn at once on a thread pool of its
+own (async-only tools get their own event loop in the worker thread);
+arun_tool_calls() does the same from async code with asyncio.gather,
+awaiting async tools directly and running sync ones in threads. Either way:
+
+- the ToolMessages come back in the order of the tool calls, whatever
+  order the calls finish in;
+- a call that runs longer than TOOL_CALL_TIMEOUT seconds (from the start
+  of the turn) gets an error ToolMessage instead of holding up the turn. A
+  sync call cannot be stopped, so it finishes in the background and its
+  result is dropped. Its thread belongs to that turn's pool, which is not
+  reused, so it never holds up a later turn;
+- while TOOL_MAX_ABANDONED such calls are still running, new calls get an
+  error ToolMessage instead of yet another thread;
+- an unknown tool or a tool that raises gets an error ToolMessage too, so
+  the model sees what went wrong and can retry.
+
+    TOOL_CALL_TIMEOUT=30
+    TOOL_MAX_WORKERS=8        # calls running at once in one turn
+    TOOL_MAX_ABANDONED=32     # timed-out calls still running, across all turns in the process
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from langchain_core.messages import ToolMessage
+
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "30"))
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+TOOL_MAX_ABANDONED = int(os.getenv("TOOL_MAX_ABANDONED", "32"))
+
+UNKNOWN_TOOL = "Incorrect Tool Name, Please Retry and Select tool from List of Available tools."
+
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def abandoned_calls():
+    """Timed-out sync calls whose threads are still running."""
+    with _abandoned_lock:
+        return _abandoned
+
+
+def _abandon(future):
+    global _abandoned
+    if future.cancel():
+        return  # had not started: no thread is left behind
+    with _abandoned_lock:
+        _abandoned += 1
+    future.add_done_callback(_release)
+
+
+def _release(_future):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+
+def _turn_executor(calls):
+    return ThreadPoolExecutor(max_workers=max(1, min(TOOL_MAX_WORKERS, calls)), thread_name_prefix="tool")
+
+
+def _is_async_only(tool):
+    return getattr(tool, "func", None) is None and getattr(tool, "coroutine", None) is not None
+
+
+def _tool_call(call):
+    # Invoked with the whole tool call, a tool returns a ToolMessage, with its
+    # artifact when it has one (response_format="content_and_artifact").
+    return {"type": "tool_call", "id": call["id"], "name": call["name"], "args": call["args"]}
+
+
+def _invoke(tool, call):
+    if _is_async_only(tool):
+        return asyncio.run(tool.ainvoke(_tool_call(call)))
+    return tool.invoke(_tool_call(call))
+
+
+def _message(call, content, status="success"):
+    if isinstance(content, ToolMessage):
+        return content
+    return ToolMessage(tool_call_id=call["id"], name=call["name"], content=str(content), status=status)
+
+
+def _timeout_message(call, timeout):
+    return _message(call, f"Tool call timed out after {timeout:g}s. Try a narrower query.", "error")
+
+
+def _error_message(call, error):
+    return _message(call, f"Tool call failed: {type(error).__name__}: {error}", "error")
+
+
+def _busy_message(call):
+    return _message(call, f"Too many earlier tool calls are still running ({abandoned_calls()}). "
+                          "Try again later.", "error")
+
+
+def run_tool_calls(tool_calls, tools_by_name, timeout=TOOL_CALL_TIMEOUT):
+    """One ToolMessage per call, in call order; the calls run concurrently."""
+    if abandoned_calls() >= TOOL_MAX_ABANDONED:
+        return [_busy_message(call) for call in tool_calls]
+    executor = _turn_executor(len(tool_calls))
+    try:
+        futures = [
+            executor.submit(_invoke, tools_by_name[call["name"]], call) if call["name"] in tools_by_name else None
+            for call in tool_calls
+        ]
+        deadline = time.monotonic() + timeout
+        messages = []
+        for call, future in zip(tool_calls, futures):
+            if future is None:
+                messages.append(_message(call, UNKNOWN_TOOL, "error"))
+                continue
+            try:
+                messages.append(_message(call, future.result(timeout=max(0.0, deadline - time.monotonic()))))
+            except FutureTimeout:
+                _abandon(future)
+                messages.append(_timeout_message(call, timeout))
+            except Exception as e:
+                messages.append(_error_message(call, e))
+        return messages
+    finally:
+        # Does not wait: timed-out calls finish in the background on this
+        # turn's threads, which exit once they are done.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def arun_tool_calls(tool_calls, tools_by_name, timeout=TOOL_CALL_TIMEOUT):
+    """Async run_tool_calls(): async tools are awaited, sync ones run on the turn's thread pool."""
+    if abandoned_calls() >= TOOL_MAX_ABANDONED:
+        return [_busy_message(call) for call in tool_calls]
+    executor = _turn_executor(len(tool_calls))
+
+    async def run(call):
+        tool = tools_by_name.get(call["name"])
+        if tool is None:
+            return _message(call, UNKNOWN_TOOL, "error")
+        future = None
+        if getattr(tool, "coroutine", None) is not None:
+            pending = tool.ainvoke(_tool_call(call))  # cancelled on timeout
+        else:
+            future = executor.submit(tool.invoke, _tool_call(call))
+            pending = asyncio.wrap_future(future)
+        try:
+            return _message(call, await asyncio.wait_for(pending, timeout))
+        except asyncio.TimeoutError:
+            if future is not None:
+                _abandon(future)
+            return _timeout_message(call, timeout)
+        except Exception as e:
+            return _error_message(call, e)
+
+    try:
+        return list(await asyncio.gather(*(run(call) for call in tool_calls)))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
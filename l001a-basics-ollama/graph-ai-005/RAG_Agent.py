@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+import sys
 from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated, Sequence
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, ToolMessage
@@ -8,8 +9,10 @@ from langchain_openai import ChatOpenAI
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain_core.tools import tool
+# rag_index.py and the ingest helpers it uses are shared with the OpenAI lesson
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "l001-basics", "graph-ai-005"))
+from rag_index import sync_index
 
 load_dotenv()
 
@@ -35,42 +38,28 @@ pdf_path = "l001a-basics-ollama/graph-ai-005/Stock_Market_Performance_2024.pdf"
 if not os.path.exists(pdf_path):
     raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
-pdf_loader = PyPDFLoader(pdf_path) # This loads the PDF
-
-# Checks if the PDF is there
-try:
-    pages = pdf_loader.load()
-    print(f"PDF has been loaded and has {len(pages)} pages")
-except Exception as e:
-    print(f"Error loading PDF: {e}")
-    raise
-
 # Chunking Process
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=1000,
     chunk_overlap=200
 )
 
-
-pages_split = text_splitter.split_documents(pages) # We now apply this to our pages
-
 persist_directory = r"l001a-basics-ollama/graph-ai-005/chroma_db" # This is the directory where we will store our vector database
 collection_name = "stock_market"
 
-# If our collection does not exist in the directory, we create using the os command
-if not os.path.exists(persist_directory):
-    os.makedirs(persist_directory)
-
 
 try:
-    # Here, we actually create the chroma database using our embeddigns model
-    vectorstore = Chroma.from_documents(
-        documents=pages_split,
-        embedding=embeddings,
+    # Only files that changed since the last start are loaded, split and embedded;
+    # when nothing changed the existing collection is opened as is (see rag_index.py)
+    vectorstore = sync_index(
+        sources=[pdf_path],
+        load=lambda path: PyPDFLoader(path).lazy_load(), # This loads the PDF page by page
+        splitter=text_splitter,
+        embeddings=embeddings,
         persist_directory=persist_directory,
-        collection_name=collection_name
+        collection_name=collection_name,
     )
-    print(f"Created ChromaDB vector store!")
+    print(f"ChromaDB vector store is ready!")
     
 except Exception as e:
     print(f"Error setting up ChromaDB: {str(e)}")
@@ -5,6 +5,7 @@ from flask import Flask, Response, request, stream_with_context, render_template
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from lesson_common.editorjs_stream import ReportBlockStream
 from .supervisor import workflow
 
 import sys
@@ -35,7 +36,7 @@ def chat_stream():
             print("SSE → user input:", user_input)
 
             sent_thoughts = set()
-            report_started = False
+            report = ReportBlockStream()
 
             stream = workflow.stream(
                 {"messages": [{"role": "user", "content": user_input}], "user_id": user_id},
@@ -111,20 +112,10 @@ def chat_stream():
                         else:
                             print(f"SSE → (ignored non-thought tool_call): {tool_call.get('name', 'unknown')}")
 
-                # --- Priority 2: Final report JSON in plain AIMessage ---
-                elif msg_type == 'ai' and not (hasattr(msg, 'tool_calls') and msg.tool_calls):
-                    if isinstance(content, str) and content.strip().startswith('{') and not report_started:
-                        try:
-                            report_data = json.loads(content)
-                            if "blocks" in report_data:
-                                print(f"SSE → Streaming {len(report_data['blocks'])} report blocks.")
-                                report_started = True
-                                for block in report_data.get("blocks", []):
-                                    yield sse("report_block", json.dumps(block))
-                            else:
-                                print(f"SSE → (ignored intermediate JSON): {content}")
-                        except json.JSONDecodeError:
-                            print(f"SSE → (ignored non-JSON or malformed content): {content[:200]}")
+                # --- Priority 2: Report blocks, emitted as each one closes ---
+                elif msg_type in ('ai', 'AIMessageChunk'):
+                    for block in report.feed(msg):
+                        yield sse("report_block", json.dumps(block))
 
                 # --- Priority 3: Fallback ToolMessage (outside AI tool_call) ---
                 elif msg_type == "tool" and getattr(msg, 'name', '') == "notify_thought_tool":
@@ -147,6 +138,9 @@ def chat_stream():
                     node = metadata.get("langgraph_node", "unknown")
                     print(f"SSE → (ignored event) Type: {msg_type}, Node: {node}, Tool: {tool_name}")
 
+            for block in report.finish():
+                yield sse("report_block", json.dumps(block))
+
         except Exception as e:
             print(f"[ERROR] Exception in event stream: {e}")
             yield sse("error", f"An error occurred: {str(e)}")
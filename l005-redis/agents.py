@@ -1,13 +1,24 @@
+from typing import Optional
+
 from langgraph.prebuilt import create_react_agent
+from langgraph.prebuilt.chat_agent_executor import AgentState
 
 from .models import gpt_41, gpt_41_mini
-from .utils import trim_history
+from lesson_common.tokens import make_trim_history
 from .tools import gather_data_tool, min_tool, max_tool, average_tool, sum_tool
 
+class DataAgentState(AgentState):
+    # Report context from MiniAgentState, passed down by the supervisor;
+    # gather_data_tool keys its cache on it.
+    company: Optional[str]
+    time_duration: Optional[str]
+    report_type: Optional[str]
+
 data_agent = create_react_agent(
     model=gpt_41_mini,
     name="data_agent",
-    pre_model_hook=trim_history,
+    state_schema=DataAgentState,
+    pre_model_hook=make_trim_history(gpt_41_mini.model_name),
     tools=[gather_data_tool],
     prompt="""
     You are a data gathering agent.
@@ -18,7 +29,7 @@ data_agent = create_react_agent(
 math_agent = create_react_agent(
     model=gpt_41_mini,
     name="math_agent",
-    pre_model_hook=trim_history,
+    pre_model_hook=make_trim_history(gpt_41_mini.model_name),
     tools=[min_tool, max_tool, average_tool, sum_tool],
     prompt="""
     You are a math agent.
@@ -38,7 +49,7 @@ math_agent = create_react_agent(
 verification_agent = create_react_agent(
     model=gpt_41_mini,
     name="verification_agent",
-    pre_model_hook=trim_history,
+    pre_model_hook=make_trim_history(gpt_41_mini.model_name),
     tools=[],
     prompt="""
     You are a verification agent.
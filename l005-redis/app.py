@@ -5,6 +5,9 @@ from flask import Flask, Response, request, stream_with_context, render_template
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from lesson_common.checkpointer import checkpointer_healthy
+from lesson_common.editorjs_stream import ReportBlockStream
+from .data_cache import data_cache
 from .workflow_graph import workflow_graph
 
 import sys
@@ -21,6 +24,16 @@ CORS(app)
 def index():
     return render_template('index.html')
 
+@app.route('/healthz')
+def healthz():
+    if checkpointer_healthy():
+        return "ok", 200
+    return "redis unavailable", 503
+
+@app.route('/metrics')
+def metrics():
+    return Response(data_cache.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/chat', methods=['POST'])
 def chat_stream():
     data = request.get_json() or {}
@@ -38,7 +51,7 @@ def chat_stream():
             yield sse("initial", "Session starting")
 
             sent_thoughts = set()
-            report_started = False
+            report = ReportBlockStream()
 
             # Kick off the graph stream; RedisSaver ensures previous messages are loaded
             stream = workflow_graph.stream(
@@ -57,18 +70,35 @@ def chat_stream():
                     "recursion_limit": 100,
                 },
                 stream_mode=["messages", "custom"],
+                # The supervisor runs as a subgraph; without this its tokens and
+                # thoughts would only surface once the whole run had finished.
+                subgraphs=True,
             )
 
             # Process each message event
-            for event, data_tuple in stream:
+            for _namespace, event, data_tuple in stream:
                 # print(f"[DEBUG] RAW EVENT → {event!r}")
                 if event == "debug":
                     continue
 
+                # Thoughts written by notify_thought_tool via get_stream_writer()
+                if event == "custom":
+                    if isinstance(data_tuple, dict):
+                        ev = data_tuple.get("event", "thought")
+                        txt = data_tuple.get("content", "")
+                        if txt and txt not in sent_thoughts:
+                            yield sse(ev, txt)
+                            sent_thoughts.add(txt)
+                    continue
+
                 if event != "messages":
                     continue
 
                 msg, _ = data_tuple
+                # Report blocks go out as soon as each one closes in the token stream
+                for blk in report.feed(msg):
+                    yield sse("report_block", json.dumps(blk))
+
                 content = getattr(msg, "content", "").strip()
                 msg_type = getattr(msg, "type", None)
 
@@ -89,17 +119,8 @@ def chat_stream():
 
                 # Handle AI assistant messages
                 if msg_type == 'ai':
-                    # JSON report blocks
-                    if content.startswith('{') and not report_started:
-                        try:
-                            lvl = json.loads(content)
-                            if "blocks" in lvl:
-                                report_started = True
-                                for blk in lvl["blocks"]:
-                                    yield sse("report_block", json.dumps(blk))
-                        except json.JSONDecodeError:
-                            pass
-                    else:
+                    # JSON content is the report, already handled above
+                    if not content.startswith(('{', '`')):
                         yield sse("chat", content)
                     continue
 
@@ -116,6 +137,9 @@ def chat_stream():
                 # Ignore other messages
                 continue
 
+            for blk in report.finish():
+                yield sse("report_block", json.dumps(blk))
+
             # Send final event (logged, no UI effect)
             yield sse("final", "Session complete")
 
@@ -0,0 +1,212 @@
+import os
+import re
+import threading
+
+from langchain_core.messages import HumanMessage
+
+FIELDS = ("company", "time_duration", "report_type")
+
+# --- Gazetteers ---
+# alias (lowercase) -> canonical company name. Extend with COMPANY_GAZETTEER,
+# a text file with one "Canonical Name" or "alias=Canonical Name" per line.
+KNOWN_COMPANIES = {
+    "apple": "Apple", "aapl": "Apple",
+    "microsoft": "Microsoft", "msft": "Microsoft",
+    "alphabet": "Alphabet", "google": "Alphabet", "googl": "Alphabet",
+    "amazon": "Amazon", "amzn": "Amazon",
+    "meta": "Meta", "facebook": "Meta",
+    "tesla": "Tesla", "tsla": "Tesla",
+    "nvidia": "Nvidia", "nvda": "Nvidia",
+    "netflix": "Netflix", "nflx": "Netflix",
+    "ibm": "IBM", "intel": "Intel", "oracle": "Oracle",
+    "salesforce": "Salesforce", "adobe": "Adobe", "samsung": "Samsung",
+}
+
+REPORT_TYPES = {
+    "financial": "financial", "finance": "financial",
+    "summary": "summary", "executive summary": "summary", "overview": "summary",
+    "comparison": "comparison", "comparative": "comparison", "compare": "comparison",
+    "sales": "sales", "revenue": "revenue", "earnings": "earnings",
+    "performance": "performance", "kpi": "performance",
+    "forecast": "forecast", "projection": "forecast",
+    "trend": "trend", "trends": "trend",
+    "market": "market", "risk": "risk", "budget": "budget", "expense": "expense",
+    "customer": "customer", "inventory": "inventory",
+}
+
+
+def _load_company_gazetteer():
+    companies = dict(KNOWN_COMPANIES)
+    path = os.getenv("COMPANY_GAZETTEER")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                alias, _, canonical = line.partition("=")
+                canonical = (canonical or alias).strip()
+                companies[alias.strip().lower()] = canonical
+                companies[canonical.lower()] = canonical
+    return companies
+
+
+COMPANIES = _load_company_gazetteer()
+
+# --- Patterns ---
+_MONTHS = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|jun(?:e)?|jul(?:y)?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_YEAR = r"(?:19|20)\d{2}"
+_NUM = r"(?:\d+|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|a)"
+
+TIME_PATTERNS = [
+    rf"\bq[1-4]\s*(?:fy\s*)?'?(?:{_YEAR}|\d{{2}})(?:\s*(?:-|to|through|and)\s*q[1-4]\s*(?:fy\s*)?'?(?:{_YEAR}|\d{{2}}))?\b",
+    rf"\b(?:first|second|third|fourth|1st|2nd|3rd|4th)\s+quarter(?:\s+of)?\s+{_YEAR}\b",
+    rf"\b(?:h[12]|first half|second half)(?:\s+of)?\s+{_YEAR}\b",
+    rf"\b(?:fy|fiscal(?:\s+year)?)\s*'?(?:{_YEAR}|\d{{2}})\b",
+    rf"\b{_MONTHS}\.?\s*(?:{_YEAR}\s*)?(?:-|to|through|until)\s*{_MONTHS}\.?\s*{_YEAR}\b",
+    rf"\b{_MONTHS}\.?\s+{_YEAR}\b",
+    rf"\b{_YEAR}\s*(?:-|to|through|and)\s*{_YEAR}\b",
+    rf"\b(?:last|past|previous|next)\s+{_NUM}\s+(?:days?|weeks?|months?|quarters?|years?)\b",
+    r"\b(?:last|past|previous|this|current|next)\s+(?:week|month|quarter|year)\b",
+    r"\b(?:year[\s-]to[\s-]date|ytd|quarter[\s-]to[\s-]date|qtd)\b",
+    rf"\b(?:in|for|during|of)\s+({_YEAR})\b",
+]
+TIME_RE = [re.compile(p, re.IGNORECASE) for p in TIME_PATTERNS]
+
+# "Acme Corp", "Globex Holdings", ... and "company called Initech"
+COMPANY_SUFFIX_RE = re.compile(
+    r"\b((?:[A-Z][\w&.-]*\s+){0,3}[A-Z][\w&.-]*)\s+(?:Inc|Corp|Corporation|Ltd|LLC|PLC|Group|Holdings|Co)\b\.?"
+)
+COMPANY_NAMED_RE = re.compile(r"\bcompany\s+(?:called|named)\s+([A-Z][\w&.-]*(?:\s+[A-Z][\w&.-]*){0,3})")
+TICKER_RE = re.compile(r"(?:\$|\b(?:NASDAQ|NYSE):\s*)([A-Z]{1,5})\b")
+
+
+def _gazetteer_pattern(entries):
+    # Longest aliases first so "executive summary" wins over "summary".
+    alternatives = sorted(entries, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(a) for a in alternatives) + r")\b", re.IGNORECASE)
+
+
+COMPANY_RE = _gazetteer_pattern(COMPANIES)
+REPORT_TYPE_RE = _gazetteer_pattern(REPORT_TYPES)
+
+
+def match_company(text):
+    m = TICKER_RE.search(text)
+    if m and m.group(1).lower() in COMPANIES:
+        return COMPANIES[m.group(1).lower()]
+    m = COMPANY_RE.search(text)
+    if m:
+        return COMPANIES[m.group(1).lower()]
+    m = COMPANY_SUFFIX_RE.search(text) or COMPANY_NAMED_RE.search(text)
+    if m:
+        return m.group(0).strip().rstrip(".") if m.re is COMPANY_SUFFIX_RE else m.group(1)
+    return None
+
+
+def match_time_duration(text):
+    for pattern in TIME_RE:
+        m = pattern.search(text)
+        if m:
+            return " ".join((m.group(1) if m.groups() and m.group(1) else m.group(0)).split())
+    return None
+
+
+def match_report_type(text):
+    m = REPORT_TYPE_RE.search(text)
+    return REPORT_TYPES[m.group(1).lower()] if m else None
+
+
+def match_companies(text):
+    """Every company match_company() can find in `text`, in order, without repeats."""
+    found = [COMPANIES[m.group(1).lower()] for m in TICKER_RE.finditer(text) if m.group(1).lower() in COMPANIES]
+    found += [COMPANIES[m.group(1).lower()] for m in COMPANY_RE.finditer(text)]
+    if not found:
+        found = [m.group(0).strip().rstrip(".") for m in COMPANY_SUFFIX_RE.finditer(text)]
+        found += [m.group(1) for m in COMPANY_NAMED_RE.finditer(text)]
+    return list(dict.fromkeys(found))
+
+
+def match_time_durations(text):
+    """Every time duration in `text`, in order, without repeats. A span matched
+    by an earlier pattern is not matched again ("first quarter of 2024" is one)."""
+    spans, found = [], []
+    for pattern in TIME_RE:
+        for m in pattern.finditer(text):
+            if any(m.start() < end and start < m.end() for start, end in spans):
+                continue
+            spans.append(m.span())
+            found.append((m.start(), " ".join((m.group(1) if m.groups() and m.group(1) else m.group(0)).split())))
+    return list(dict.fromkeys(duration for _, duration in sorted(found)))
+
+
+def match_report_types(text):
+    """Every report type in `text`, in order, without repeats."""
+    return list(dict.fromkeys(REPORT_TYPES[m.group(1).lower()] for m in REPORT_TYPE_RE.finditer(text)))
+
+
+MATCHERS = {
+    "company": match_company,
+    "time_duration": match_time_duration,
+    "report_type": match_report_type,
+}
+
+
+def extract_context_local(messages, fields=FIELDS):
+    """
+    Resolve `fields` from user messages with patterns and gazetteers only.
+    Newer messages win. Returns {field: value} for the fields it found.
+    """
+    found = {}
+    for m in reversed(list(messages)):
+        if not isinstance(m, HumanMessage):
+            continue
+        text = m.content if isinstance(m.content, str) else str(m.content)
+        for field in fields:
+            if field not in found:
+                value = MATCHERS[field](text)
+                if value:
+                    found[field] = value
+        if len(found) == len(fields):
+            break
+    return found
+
+
+def messages_since(messages, cursor_id):
+    """Messages added after the message with id `cursor_id` (all of them if it is unknown)."""
+    messages = list(messages)
+    if cursor_id is None:
+        return messages
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].id == cursor_id:
+            return messages[i + 1:]
+    return messages
+
+
+# --- Metrics ---
+_metrics_lock = threading.Lock()
+_metrics = {
+    "extractions": 0,
+    "llm_calls": 0,
+    "llm_skipped": 0,
+    "fields_local": 0,
+    "fields_llm": 0,
+    "messages_sent_to_llm": 0,
+}
+
+
+def record_extraction(local_fields, llm_called, llm_fields=0, messages_sent=0):
+    with _metrics_lock:
+        _metrics["extractions"] += 1
+        _metrics["fields_local"] += local_fields
+        _metrics["fields_llm"] += llm_fields
+        _metrics["messages_sent_to_llm"] += messages_sent
+        _metrics["llm_calls" if llm_called else "llm_skipped"] += 1
+
+
+def extraction_metrics():
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    total = snapshot["extractions"]
+    snapshot["llm_skip_ratio"] = snapshot["llm_skipped"] / total if total else 0.0
+    return snapshot
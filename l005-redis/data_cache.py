@@ -0,0 +1,196 @@
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .context_extraction import (
+    COMPANIES,
+    REPORT_TYPES,
+    match_companies,
+    match_report_types,
+    match_time_durations,
+)
+
+# Read-through cache for gather_data_tool. Entries are keyed by the report
+# context (company, time duration, report type), not by the request wording,
+# so "Apple Q1 2024 sales" and "sales numbers for AAPL, q1 2024" share one.
+DATA_CACHE = os.getenv("DATA_CACHE", "on") == "on"
+DATA_CACHE_TTL = float(os.getenv("DATA_CACHE_TTL", "300"))
+DATA_CACHE_MAXSIZE = int(os.getenv("DATA_CACHE_MAXSIZE", "1000"))
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s-]", " ", text.lower()).split())
+
+
+def data_key(request, context=None):
+    """
+    (company, time_duration, report_types) for a data request, normalized;
+    report_types is every report type named, sorted and joined by ",".
+    Fields named in the request win; the rest come from `context` (the
+    MiniAgentState fields). None if company or time duration is unknown, or
+    if the request names more than one of either ("Apple vs Microsoft",
+    "Q1 2024 vs Q2 2024"): such a request is not cached.
+    """
+    context = context or {}
+    companies = _normalized(match_companies(request), COMPANIES) or _normalized([context.get("company")], COMPANIES)
+    time_durations = _normalized(match_time_durations(request)) or _normalized([context.get("time_duration")])
+    report_types = (_normalized(match_report_types(request), REPORT_TYPES)
+                    or _normalized([context.get("report_type")], REPORT_TYPES))
+    if len(companies) != 1 or len(time_durations) != 1:
+        return None
+    return (companies[0], time_durations[0], ",".join(report_types))
+
+
+def _normalized(values, aliases=None):
+    # Canonical (when `aliases` maps it), normalized, sorted and distinct.
+    aliases = aliases or {}
+    return sorted({_normalize(aliases.get(value.lower(), value)) for value in values if value})
+
+
+def _fields_key(company, time_duration, report_type):
+    # Empty string for a field that is not known.
+    company = COMPANIES.get((company or "").lower(), company or "")
+    report_type = REPORT_TYPES.get((report_type or "").lower(), report_type or "")
+    return (_normalize(company), _normalize(time_duration or ""), _normalize(report_type))
+
+
+class _Flight:
+    """One fetch in progress; identical requests wait for it instead of fetching."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.started = time.monotonic()
+        self.value = None
+        self.error = None
+        # Set when the key is invalidated mid-fetch: the result is returned to
+        # the callers already waiting, but not stored.
+        self.stale = False
+
+
+class DataCache:
+    """
+    In-process LRU with a TTL and per-key single flight: while a key is being
+    fetched, other callers for that key wait for the same result. Values are
+    copied on the way in and out, so callers cannot change cached data.
+    """
+
+    def __init__(self, ttl=DATA_CACHE_TTL, maxsize=DATA_CACHE_MAXSIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at, fetch_seconds, value)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0,
+                         "fetch_seconds": 0.0, "saved_seconds": 0.0}
+
+    def get_or_fetch(self, key, fetch):
+        """Cached value for `key`, or the result of fetch() (stored unless it raises)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._data.move_to_end(key)
+                self._metrics["hits"] += 1
+                self._metrics["saved_seconds"] += entry[1]
+                return copy.deepcopy(entry[2])
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._metrics["misses"] += 1
+
+        if not leader:
+            waited_from = time.monotonic()
+            flight.done.wait()
+            with self._lock:
+                self._metrics["coalesced"] += 1
+                # Saved: the part of the fetch that had already run when we arrived.
+                self._metrics["saved_seconds"] += max(0.0, waited_from - flight.started)
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.value)
+
+        succeeded = False
+        try:
+            flight.value = fetch()
+            succeeded = True
+        except BaseException as e:
+            # KeyboardInterrupt, a cancelled task and the like also end the
+            # flight; waiters get an error rather than a None that never came.
+            flight.error = e if isinstance(e, Exception) else RuntimeError(f"fetch interrupted by {e!r}")
+            with self._lock:
+                self._metrics["errors"] += 1
+            raise
+        finally:
+            seconds = time.monotonic() - flight.started
+            with self._lock:
+                self._flights.pop(key, None)
+                self._metrics["fetch_seconds"] += seconds
+                if succeeded and not flight.stale:
+                    self._data[key] = (time.monotonic() + self.ttl, seconds, copy.deepcopy(flight.value))
+                    self._data.move_to_end(key)
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+            flight.done.set()
+        return copy.deepcopy(flight.value)
+
+    def invalidate(self, company=None, time_duration=None, report_type=None):
+        """
+        Drop the entries matching every field given (all entries if none is
+        given), e.g. invalidate(company="Apple") after Apple's data changed.
+        Returns the number of entries dropped.
+        """
+        pattern = _fields_key(company, time_duration, report_type)
+
+        def matches(key):
+            company_, time_duration_, report_types = key
+            return (pattern[0] in ("", company_) and pattern[1] in ("", time_duration_)
+                    and pattern[2] in ("", *report_types.split(",")))
+
+        with self._lock:
+            keys = [key for key in self._data if matches(key)]
+            for key in keys:
+                del self._data[key]
+            for key, flight in self._flights.items():
+                if matches(key):
+                    flight.stale = True
+        return len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._metrics, entries=len(self._data))
+        served = snapshot["hits"] + snapshot["coalesced"]
+        total = served + snapshot["misses"]
+        snapshot["hit_ratio"] = served / total if total else 0.0
+        return snapshot
+
+    def render_prometheus(self):
+        """stats() in the text exposition format, as served by GET /metrics."""
+        stats = self.stats()
+        metrics = [
+            ("data_cache_requests_total", "counter", "gather_data_tool requests by how the cache served them.",
+             [(f'{{result="{result}"}}', stats[key]) for result, key in
+              (("hit", "hits"), ("coalesced", "coalesced"), ("miss", "misses"))]),
+            ("data_cache_errors_total", "counter", "Fetches that raised.", [("", stats["errors"])]),
+            ("data_cache_fetch_seconds_total", "counter", "Time spent fetching on misses.",
+             [("", stats["fetch_seconds"])]),
+            ("data_cache_saved_seconds_total", "counter", "Fetch time saved by hits and coalesced waits.",
+             [("", stats["saved_seconds"])]),
+            ("data_cache_hit_ratio", "gauge", "Share of requests served without a fetch of their own.",
+             [("", stats["hit_ratio"])]),
+            ("data_cache_entries", "gauge", "Entries currently cached.", [("", stats["entries"])]),
+        ]
+        lines = []
+        for name, kind, help_text, samples in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value!r}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+data_cache = DataCache()
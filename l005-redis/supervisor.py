@@ -1,10 +1,10 @@
-from typing import Annotated, Sequence, TypedDict
+from typing import Annotated, Optional, Sequence, TypedDict
 from langchain_core.messages import AnyMessage
 from langgraph_supervisor import create_supervisor, create_handoff_tool
-from langgraph.checkpoint.memory import InMemorySaver
-from langgraph.checkpoint.redis import RedisSaver
 
-from .utils import capped_add_messages, trim_history
+from lesson_common.checkpointer import get_checkpointer
+from lesson_common.history import capped_add_messages
+from lesson_common.tokens import make_trim_history
 from .models import gpt_41
 from .agents import data_agent, math_agent, verification_agent
 from .tools import notify_thought_tool
@@ -13,6 +13,10 @@ class SupervisorState(TypedDict):
     messages: Annotated[Sequence[AnyMessage], capped_add_messages]
     remaining_steps: int
     user_id: int
+    # Shared with MiniAgentState, so the report context reaches the agents.
+    company: Optional[str]
+    time_duration: Optional[str]
+    report_type: Optional[str]
 
 supervisor = create_supervisor(
     agents=[
@@ -22,7 +26,7 @@ supervisor = create_supervisor(
     ],
     state_schema=SupervisorState,
     model=gpt_41,
-    pre_model_hook=trim_history,
+    pre_model_hook=make_trim_history(gpt_41.model_name),
     tools=[
         create_handoff_tool(agent_name="data_agent"),
         create_handoff_tool(agent_name="math_agent"),
@@ -122,6 +126,4 @@ ALWAYS produce exactly one JSON object. Nothing else.
 """
 )
 
-with RedisSaver.from_conn_string("redis://localhost:6379") as checkpointer:
-    checkpointer.setup()
-    workflow = supervisor.compile(checkpointer=checkpointer)
\ No newline at end of file
+workflow = supervisor.compile(checkpointer=get_checkpointer())
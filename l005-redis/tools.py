@@ -1,9 +1,12 @@
 from langchain_core.tools import tool
 from langgraph.config import get_stream_writer
+from langgraph.prebuilt import InjectedState
 import random
-from typing import Dict, Any, List
+from typing import Annotated, Dict, Any, List
 import json
 
+from .data_cache import DATA_CACHE, data_cache, data_key
+
 @tool
 def notify_thought_tool(thought: str, stage: str = "thought") -> str:
     """
@@ -34,7 +37,7 @@ def notify_thought_tool(thought: str, stage: str = "thought") -> str:
     return json.dumps(payload)
 
 @tool
-def gather_data_tool(request: str):
+def gather_data_tool(request: str, state: Annotated[dict, InjectedState]):
     """
     Gather data based on the user's request.
     
@@ -58,7 +61,11 @@ def gather_data_tool(request: str):
         }
     """
     # Placeholder for data gathering logic
-    return get_db_data()
+    key = data_key(request, state) if DATA_CACHE else None
+    if key is None:
+        return get_db_data()
+    # Hit ratio and saved fetch time are served on GET /metrics.
+    return data_cache.get_or_fetch(key, get_db_data)
 
 def get_db_data() -> Dict[str, Any]:
     len = random.randint(3, 10) 
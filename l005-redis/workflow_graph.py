@@ -3,39 +3,55 @@ import json
 from typing import Annotated, Sequence, TypedDict, Optional
 from langchain_core.messages import AnyMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.redis import RedisSaver
 
+from lesson_common.checkpointer import get_checkpointer
 from .supervisor import supervisor
 from .models import gpt_41_mini
+from lesson_common.history import capped_add_messages
+from .context_extraction import (
+    FIELDS,
+    extract_context_local,
+    extraction_metrics,
+    messages_since,
+    record_extraction,
+)
 
 # --- State schema ---
 class MiniAgentState(TypedDict):
-    messages: Annotated[Sequence[AnyMessage], ...]
+    messages: Annotated[Sequence[AnyMessage], capped_add_messages]
     user_id: int
     company: Optional[str]
     time_duration: Optional[str]
     report_type: Optional[str]
+    # id of the last message already run through context extraction
+    context_cursor: Optional[str]
+
+# --- LLM-based extraction (fallback for fields the local matchers miss) ---
+FIELD_DESCRIPTIONS = {
+    "company": "Company (the company for the report)",
+    "time_duration": "Time duration (the time period to cover)",
+    "report_type": "Report type (the kind of report, e.g., financial, summary, comparison, etc.)",
+}
 
-# --- LLM-based extraction ---
-EXTRACTION_SYSTEM_PROMPT = """
+def extraction_system_prompt(fields):
+    wanted = "\n".join(f"- {FIELD_DESCRIPTIONS[f]}" for f in fields)
+    shape = ",\n".join(f'  "{f}": null' for f in fields)
+    return f"""
 Extract the following information from the user conversation, if possible:
-- Company (the company for the report)
-- Time duration (the time period to cover)
-- Report type (the kind of report, e.g., financial, summary, comparison, etc.)
+{wanted}
 
 If you cannot find an answer for a field, return null for it.
 
 Reply in this exact JSON format:
 
-{
-  "company": null,
-  "time_duration": null,
-  "report_type": null
-}
+{{
+{shape}
+}}
 """
 
-def extract_context_llm(messages):
-    chat = [{"role": "system", "content": EXTRACTION_SYSTEM_PROMPT}]
+def extract_context_llm(messages, fields=FIELDS):
+    """The fields the LLM found, or None if the call or its JSON reply failed."""
+    chat = [{"role": "system", "content": extraction_system_prompt(fields)}]
     print("-> [extract_context_llm] messages:")
     for m in messages:
         if isinstance(m, dict):
@@ -54,10 +70,36 @@ def extract_context_llm(messages):
         result = gpt_41_mini.invoke(chat)
         data = json.loads(result.content)
         print(f"-> [extract_context_llm] extracted: {data!r}")
-        return data.get("company"), data.get("time_duration"), data.get("report_type")
+        return {f: data.get(f) for f in fields if data.get(f)}
     except Exception as e:
         print("-> [extract_context_llm] LLM error:", e)
-        return None, None, None
+        return None
+
+def extract_context(state: MiniAgentState):
+    """
+    Fill missing context fields from the messages added since the last
+    extraction: pattern/gazetteer matching first, the LLM only for what is left.
+    Also returns whether those messages were fully examined, i.e. the LLM pass
+    succeeded or was not needed; if not, they must be examined again next turn.
+    """
+    context = {f: state.get(f) for f in FIELDS}
+    missing = [f for f in FIELDS if not context[f]]
+    new_messages = messages_since(state["messages"], state.get("context_cursor"))
+    if not missing or not new_messages:
+        return context, True
+
+    local = extract_context_local(new_messages, missing)
+    context.update(local)
+    missing = [f for f in missing if not context[f]]
+
+    llm = {}
+    if missing:
+        llm = extract_context_llm(new_messages, missing)
+        context.update(llm or {})
+
+    record_extraction(len(local), bool(missing), len(llm or {}), len(new_messages) if missing else 0)
+    print(f"-> [extract_context] local={local!r} llm={llm!r} metrics={extraction_metrics()!r}")
+    return context, llm is not None
 
 
 
@@ -67,97 +109,94 @@ def debug_node(state: MiniAgentState) -> MiniAgentState:
     for msg in state["messages"]:
         print(f"{getattr(msg, 'role', '?')}: {getattr(msg, 'content', '')}")
     print("Current context:", state["company"], state["time_duration"], state["report_type"])
-    return state
+    return {}
 
 # --- get_context node ---
 def get_context_node(state: MiniAgentState) -> MiniAgentState:
-    msgs = state["messages"]
-    company = state.get("company")
-    time_duration = state.get("time_duration")
-    report_type = state.get("report_type")
-
-    # try LLM extraction if missing
-    if not (company and time_duration and report_type):
-        nc, nt, nr = extract_context_llm(msgs)
-        company = company or nc
-        time_duration = time_duration or nt
-        report_type = report_type or nr
+    context, examined = extract_context(state)
+    company = context["company"]
+    time_duration = context["time_duration"]
+    report_type = context["report_type"]
+    # Everything up to here has been examined; a follow-up question we add
+    # below stays after the cursor so the next extraction sees it with the answer.
+    # After a failed LLM pass the cursor stays put, so those messages are retried.
+    cursor = state["messages"][-1].id if examined and state["messages"] else state.get("context_cursor")
 
     # ask for missing field, but don't lose other fields
     if not company:
         return {
-            "messages": msgs + [AIMessage(content="Which company is this report for?")],
+            "messages": [AIMessage(content="Which company is this report for?")],
             "user_id": state["user_id"],
             "company": None,
             "time_duration": time_duration,
             "report_type": report_type,
+            "context_cursor": cursor,
         }
     if not time_duration:
         return {
-            "messages": msgs + [AIMessage(content="What time duration should I cover in the report?")],
+            "messages": [AIMessage(content="What time duration should I cover in the report?")],
             "user_id": state["user_id"],
             "company": company,
             "time_duration": None,
             "report_type": report_type,
+            "context_cursor": cursor,
         }
     if not report_type:
         return {
-            "messages": msgs + [AIMessage(content="What type of report do you need (e.g., financial, summary)?")],
+            "messages": [AIMessage(content="What type of report do you need (e.g., financial, summary)?")],
             "user_id": state["user_id"],
             "company": company,
             "time_duration": time_duration,
             "report_type": None,
+            "context_cursor": cursor,
         }
 
     # all set
     return {
-        "messages": msgs,
         "user_id": state["user_id"],
         "company": company,
         "time_duration": time_duration,
         "report_type": report_type,
+        "context_cursor": cursor,
     }
 
-# --- supervisor node ---
-def supervisor_node(state: MiniAgentState) -> MiniAgentState:
-    enriched = list(state["messages"]) + [
-        HumanMessage(
-            content=(
-                f"Company: {state['company']}, "
-                f"Time duration: {state['time_duration']}, "
-                f"Report type: {state['report_type']}"
-            ),
-            role="user"
-        )
-    ]
-    result = supervisor.invoke({
-        "messages": enriched,
-        "user_id": state["user_id"]
-    })
+# --- enrich_context node ---
+def enrich_context_node(state: MiniAgentState) -> MiniAgentState:
+    # Appends one message; the history itself is handed to the supervisor
+    # subgraph through the shared `messages` channel, not copied here.
     return {
-        "messages": result["messages"],
-        "user_id": state["user_id"],
-        "company": state["company"],
-        "time_duration": state["time_duration"],
-        "report_type": state["report_type"],
+        "messages": [
+            HumanMessage(
+                content=(
+                    f"Company: {state['company']}, "
+                    f"Time duration: {state['time_duration']}, "
+                    f"Report type: {state['report_type']}"
+                )
+            )
+        ],
     }
 
+def route_after_context(state: MiniAgentState) -> str:
+    # Missing context: end the turn so the follow-up question reaches the user.
+    if state["company"] and state["time_duration"] and state["report_type"]:
+        return "debug"
+    return END
+
 # --- Build graph ---
 graph = StateGraph(MiniAgentState)
 graph.add_node("get_context", get_context_node)
 graph.add_node("debug", debug_node)
-graph.add_node("supervisor", supervisor_node)
+graph.add_node("enrich_context", enrich_context_node)
+# Mounted as a compiled subgraph (it shares `messages` and `user_id` with this
+# state) so its tokens, thoughts and checkpoints flow through the outer stream.
+graph.add_node("supervisor", supervisor.compile(name="supervisor"))
 
 # Branching logic
-graph.add_conditional_edges("get_context", {
-    "get_context": lambda s: not (s["company"] and s["time_duration"] and s["report_type"]),
-    "debug":       lambda s:     (s["company"] and s["time_duration"] and s["report_type"])
-})
-graph.add_edge("debug", "supervisor")
+graph.add_conditional_edges("get_context", route_after_context, ["debug", END])
+graph.add_edge("debug", "enrich_context")
+graph.add_edge("enrich_context", "supervisor")
 graph.add_edge("supervisor", END)
 graph.set_entry_point("get_context")
 
-# --- RedisSaver ---
-with RedisSaver.from_conn_string("redis://localhost:6379") as checkpointer:
-    checkpointer.setup()
-    workflow_graph = graph.compile(checkpointer=checkpointer)
+# --- Shared, pooled checkpointer ---
+workflow_graph = graph.compile(checkpointer=get_checkpointer())
@@ -1,13 +1,13 @@
 from langgraph.prebuilt import create_react_agent
 
 from .models import gpt_41, gpt_41_mini
-from .utils import trim_history
-from .tools import gather_data_tool, min_tool, max_tool, average_tool, sum_tool
+from lesson_common.tokens import make_trim_history
+from .tools import gather_data_tool, describe_tool
 
 data_agent = create_react_agent(
     model=gpt_41_mini,
     name="data_agent",
-    pre_model_hook=trim_history,
+    pre_model_hook=make_trim_history(gpt_41_mini.model_name),
     tools=[gather_data_tool],
     prompt="""
     You are a data gathering agent.
@@ -18,8 +18,8 @@ data_agent = create_react_agent(
 math_agent = create_react_agent(
     model=gpt_41_mini,
     name="math_agent",
-    pre_model_hook=trim_history,
-    tools=[min_tool, max_tool, average_tool, sum_tool],
+    pre_model_hook=make_trim_history(gpt_41_mini.model_name),
+    tools=[describe_tool],
     prompt="""
     You are a math agent.
     Your task is to perform calculations based on the data provided by the data_agent.
@@ -27,10 +27,11 @@ math_agent = create_react_agent(
 
     You must use appropriate tools to perform the calculations.
     The following tools are available:
-    - min_tool: Calculate the minimum value from a list of dictionaries.
-    - max_tool: Calculate the maximum value from a list of dictionaries.
-    - average_tool: Calculate the average value from a list of dictionaries.
-    - sum_tool: Calculate the sum of values from a list of dictionaries.
+    - describe_tool: Calculate any of count, min, max, mean, sum, std and percentiles
+      of the values in a dataset or a list of dictionaries, optionally grouped by a key.
+    Request every statistic you need in a single describe_tool call.
+    When the data_agent's result has a dataset handle, pass the handle as `dataset`
+    instead of copying the items into `data`.
     You will return the result of the calculations.
     """
 )
@@ -38,7 +39,7 @@ math_agent = create_react_agent(
 verification_agent = create_react_agent(
     model=gpt_41_mini,
     name="verification_agent",
-    pre_model_hook=trim_history,
+    pre_model_hook=make_trim_history(gpt_41_mini.model_name),
     tools=[],
     prompt="""
     You are a verification agent.
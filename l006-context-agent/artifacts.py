@@ -0,0 +1,159 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Gathered datasets are kept in process as NumPy columns and referred to by a
+# handle, so the rows never have to pass through the prompt. Up to
+# ARTIFACT_INLINE_ROWS rows are also returned inline for the model to read.
+ARTIFACT_INLINE_ROWS = int(os.getenv("ARTIFACT_INLINE_ROWS", "20"))
+ARTIFACT_PREVIEW_ROWS = int(os.getenv("ARTIFACT_PREVIEW_ROWS", "5"))
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(256 * 1024 * 1024)))
+OBJECT_BYTES = 56
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def columns_from_records(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    One array per key: int64 or float64 if every value is a number, float64
+    with NaN for missing values, else an object array.
+    """
+    keys = {}
+    for record in records:
+        for key in record:
+            keys.setdefault(key, None)
+
+    return {key: _to_array([record.get(key) for record in records]) for key in keys}
+
+
+def _to_array(values: List[Any]) -> np.ndarray:
+    # NumPy infers the common type in C; only check by hand when it cannot.
+    column = np.asarray(values)
+    if column.dtype.kind in "iuf":
+        return column
+    if all(v is None or _is_number(v) for v in values):
+        return np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.asarray(values, dtype=object)
+
+
+class ColumnBuilder:
+    """
+    Collects pages of columns ({"value": [...], ...}) as they arrive, keeping
+    at most `max_rows` rows. add() returns False once the limit is reached, so
+    the caller can stop reading; finish() turns the columns into arrays.
+    """
+
+    def __init__(self, max_rows: Optional[int] = None):
+        self.max_rows = max_rows
+        self.rows = 0
+        self.truncated = False
+        self._collected = {}
+
+    def add(self, page: Dict[str, List[Any]]) -> bool:
+        size = len(next(iter(page.values()), []))
+        if self.max_rows is not None and self.rows + size > self.max_rows:
+            page = {name: values[:self.max_rows - self.rows] for name, values in page.items()}
+            size, self.truncated = self.max_rows - self.rows, True
+        for name, values in page.items():
+            self._collected.setdefault(name, []).extend(values)
+        self.rows += size
+        return not self.truncated
+
+    def finish(self):
+        """(columns, truncated)"""
+        return {name: _to_array(values) for name, values in self._collected.items()}, self.truncated
+
+
+def columns_from_pages(pages: Iterable[Dict[str, List[Any]]], max_rows: Optional[int] = None):
+    """
+    Concatenate pages of columns into one array per column, reading at most
+    `max_rows` rows. Returns (columns, truncated).
+    """
+    builder = ColumnBuilder(max_rows)
+    for page in pages:
+        if not builder.add(page):
+            break
+    return builder.finish()
+
+
+class Dataset:
+    def __init__(self, handle: str, thread_id: Optional[str], columns: Dict[str, np.ndarray]):
+        self.handle = handle
+        self.thread_id = thread_id
+        self.columns = columns
+        self.rows = len(next(iter(columns.values()))) if columns else 0
+        # Object columns hold pointers; count a small str object behind each.
+        self.nbytes = sum(
+            column.nbytes + (OBJECT_BYTES * len(column) if column.dtype == object else 0)
+            for column in columns.values()
+        )
+
+    def records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        rows = self.rows if limit is None else min(limit, self.rows)
+        names = list(self.columns)
+        values = [self.columns[name][:rows].tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def summary(self) -> Dict[str, Any]:
+        """What the model sees instead of the rows."""
+        return {
+            "handle": self.handle,
+            "rows": self.rows,
+            "columns": {name: str(column.dtype) for name, column in self.columns.items()},
+            "preview": self.records(ARTIFACT_PREVIEW_ROWS),
+        }
+
+
+class ArtifactStore:
+    """
+    Datasets by handle, visible only to the conversation thread that stored
+    them. Least recently used datasets are evicted once `max_bytes` is
+    exceeded; the newest one is always kept.
+    """
+
+    def __init__(self, max_bytes: int = ARTIFACT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, columns: Dict[str, np.ndarray], thread_id: Optional[str] = None) -> Dataset:
+        dataset = Dataset(f"ds_{uuid.uuid4().hex[:12]}", thread_id, columns)
+        with self._lock:
+            self._datasets[dataset.handle] = dataset
+            self.bytes += dataset.nbytes
+            while self.bytes > self.max_bytes and len(self._datasets) > 1:
+                _, evicted = self._datasets.popitem(last=False)
+                self.bytes -= evicted.nbytes
+        return dataset
+
+    def put_records(self, records: List[Dict[str, Any]], thread_id: Optional[str] = None) -> Dataset:
+        return self.put(columns_from_records(records), thread_id)
+
+    def get(self, handle: str, thread_id: Optional[str] = None) -> Optional[Dataset]:
+        with self._lock:
+            dataset = self._datasets.get(handle)
+            if dataset is None or dataset.thread_id != thread_id:
+                return None
+            self._datasets.move_to_end(handle)
+            return dataset
+
+    def drop_thread(self, thread_id: str) -> int:
+        with self._lock:
+            handles = [h for h, d in self._datasets.items() if d.thread_id == thread_id]
+            for handle in handles:
+                self.bytes -= self._datasets.pop(handle).nbytes
+        return len(handles)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"datasets": len(self._datasets), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+artifacts = ArtifactStore()
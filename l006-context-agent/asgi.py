@@ -0,0 +1,108 @@
+import contextlib
+import logging
+import os
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.templating import Jinja2Templates
+
+from lesson_common.checkpointer import async_checkpointer, async_checkpointer_healthy
+from .instrumentation import PROMETHEUS_CONTENT_TYPE, instrumentation
+from .supervisor import supervisor
+from .streaming import STREAM_MODES, SSEEventRouter, chat_config, chat_inputs, sse
+
+load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
+templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # The sync RedisSaver cannot serve astream(), so the graph is compiled here
+    # against the async saver, for the process lifetime. Importing the app opens
+    # no Redis connection.
+    async with async_checkpointer() as checkpointer:
+        app.state.workflow = supervisor.compile(checkpointer=instrumentation.wrap_checkpointer(checkpointer))
+        yield
+
+
+async def index(request):
+    return templates.TemplateResponse(request, "index.html")
+
+
+async def healthz(request):
+    # PING on the async saver's own client, the one /chat uses.
+    if await async_checkpointer_healthy():
+        return PlainTextResponse("ok")
+    return PlainTextResponse("redis unavailable", status_code=503)
+
+
+async def metrics(request):
+    return PlainTextResponse(instrumentation.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+async def chat_stream(request):
+    try:
+        data = await request.json() or {}
+    except ValueError:
+        data = {}
+    user_input = data.get("input")
+    user_id = data.get("user_id")
+
+    if not user_id:
+        return PlainTextResponse("Missing 'user_id'", status_code=400)
+    else:
+        print(f"Received user_id: {user_id}")
+
+    if not user_input:
+        return PlainTextResponse("Missing 'input'", status_code=400)
+
+    workflow = request.app.state.workflow
+
+    async def event_stream():
+        try:
+            print("SSE → user input:", user_input)
+
+            router = SSEEventRouter()
+            stream = workflow.astream(
+                chat_inputs(user_input, user_id),
+                config=chat_config(user_id),
+                stream_mode=STREAM_MODES,
+                subgraphs=True,
+            )
+
+            async for _namespace, event, data_tuple in stream:
+                for chunk in router.handle(event, data_tuple):
+                    yield chunk
+            for chunk in router.finish():
+                yield chunk
+
+        except Exception as e:
+            print(f"[ERROR] Exception in event stream: {e}")
+            yield sse("error", f"An error occurred: {str(e)}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-cache",
+        },
+    )
+
+
+app = Starlette(
+    routes=[
+        Route("/", index),
+        Route("/healthz", healthz),
+        Route("/metrics", metrics),
+        Route("/chat", chat_stream, methods=["POST"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,64 @@
+"""
+Prompt payload and CPU of passing a gathered dataset to math_agent inline (as
+items in the ToolMessage, copied by the model into describe_tool's `data`)
+against by handle (artifacts.py). From the repository root:
+
+    python -m l006-context-agent.benchmarks.artifact_payload --rows 100 10000 1000000
+
+Tokens are estimated at 4 characters per token. CPU covers what the process
+does per pull: serialising the tool result, parsing the tool-call arguments
+and computing the statistics; model time is not included.
+"""
+import argparse
+import importlib
+import json
+import math
+import random
+import time
+
+artifacts_module = importlib.import_module("l006-context-agent.artifacts")
+stats_module = importlib.import_module("l006-context-agent.stats")
+
+STATS = ["min", "max", "mean", "sum"]
+
+
+def make_items(rows):
+    return [{"id": i, "name": f"Item {i}", "value": random.randint(1, 100)} for i in range(rows)]
+
+
+def inline(items):
+    start = time.process_time()
+    tool_result = json.dumps({"sales": 1000, "customers": 200, "items": items})
+    tool_args = json.dumps({"data": items, "stats": STATS})
+    result = stats_module.describe_items(json.loads(tool_args)["data"], stats=STATS)
+    return len(tool_result) + len(tool_args), time.process_time() - start, result
+
+
+def by_handle(items):
+    store = artifacts_module.ArtifactStore()
+    start = time.process_time()
+    dataset = store.put_records(items, "bench")
+    tool_result = json.dumps({"sales": 1000, "customers": 200, "dataset": dataset.summary()})
+    tool_args = json.dumps({"dataset": dataset.handle, "stats": STATS})
+    stored = store.get(json.loads(tool_args)["dataset"], "bench")
+    result = stats_module.describe_columns(stored.columns["value"], stats=STATS)
+    return len(tool_result) + len(tool_args), time.process_time() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'inline tokens':>16}{'handle tokens':>16}{'inline ms':>12}{'handle ms':>12}")
+    for rows in args.rows:
+        items = make_items(rows)
+        inline_chars, inline_cpu, expected = inline(items)
+        handle_chars, handle_cpu, result = by_handle(items)
+        assert all(math.isclose(result[name], expected[name]) for name in STATS), (result, expected)
+        print(f"{rows:>10}{inline_chars // 4:>16}{handle_chars // 4:>16}"
+              f"{inline_cpu * 1000:>12.1f}{handle_cpu * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
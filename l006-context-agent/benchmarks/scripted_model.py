@@ -0,0 +1,204 @@
+"""
+Deterministic stand-in for the ChatOpenAI models in models.py, for offline
+benchmarks of the supervisor graphs.
+
+The same model object serves the supervisor and every agent: it tells them
+apart by their system prompt and replies with the next step of that role's
+script, where the step is the number of messages the role has already added
+since the user's request or since it was last handed control. Steps that
+call tools the caller did not bind are dropped, so one script covers every
+lesson (l002 and l003 have no notify_thought_tool, for example).
+"""
+import asyncio
+import itertools
+import json
+import time
+from typing import List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# First words of each system prompt -> role. Anything else is the supervisor.
+ROLE_MARKERS = {
+    "you are a data gathering agent": "data_agent",
+    "you are a math agent": "math_agent",
+    "you are a verification agent": "verification_agent",
+}
+
+_call_ids = itertools.count()
+
+FALLBACK_ITEMS = [{"id": i, "name": f"Item {i}", "value": v} for i, v in enumerate((42, 7, 93))]
+
+REPORT = {
+    "time": 1752971214073,
+    "blocks": [
+        {"type": "header", "data": {"text": "Q1 2024 Sales Report", "level": 2}},
+        {"type": "paragraph", "data": {"text": "Sales and customer figures for the first quarter."}},
+        {"type": "list", "data": {"style": "unordered", "items": [
+            "Minimum, maximum, average and total item values were computed.",
+            "The figures were verified against the gathered data.",
+        ]}},
+        {"type": "paragraph", "data": {"text": "The quarter closed in line with expectations."}},
+    ],
+}
+
+
+def thought(text, stage="thought"):
+    return [("notify_thought_tool", {"thought": text, "stage": stage})]
+
+
+def handoff(agent_name):
+    return [(f"transfer_to_{agent_name}", {})]
+
+
+def delegate(tasks):
+    return [("delegate_tasks", {"tasks": [
+        {"agent_name": agent_name, "task_description": task} for agent_name, task in tasks
+    ]})]
+
+
+def gathered(messages):
+    """The latest gather_data_tool result, so math runs on real data."""
+    for m in reversed(messages):
+        if isinstance(m, ToolMessage) and m.name == "gather_data_tool":
+            try:
+                return json.loads(m.content)
+            except (ValueError, TypeError):
+                break
+    return {}
+
+
+def gathered_items(messages):
+    return gathered(messages).get("items", FALLBACK_ITEMS)
+
+
+def _handed_to(message, role):
+    """True for the handoff message (transfer ToolMessage or delegated task)
+    that gave `role` control; with role None, for any handoff message."""
+    destination = message.response_metadata.get("__handoff_destination")
+    return destination is not None and role in (None, destination)
+
+
+def math_calls(messages):
+    """One describe_tool call where it is bound (l006), on the dataset handle if
+    there is one, else the four single-statistic tools."""
+    data = gathered_items(messages)
+    handle = gathered(messages).get("dataset", {}).get("handle")
+    source = {"dataset": handle} if handle else {"data": data}
+    return [("describe_tool", {**source, "stats": ["min", "max", "mean", "sum"]})] + [
+        (name, {"data": data}) for name in ("min_tool", "max_tool", "average_tool", "sum_tool")
+    ]
+
+
+# A step is either reply text or tool calls: a list of (tool, args) pairs or a
+# callable that builds that list from the messages the model was given.
+HANDOFF_SCRIPT = {
+    "supervisor": [
+        thought("The user wants a sales report; gather data, compute, verify, then write it.", "initial"),
+        handoff("data_agent"),
+        thought("Data gathered; the math agent computes the summary statistics next."),
+        handoff("math_agent"),
+        thought("Statistics ready; asking the verification agent to check them."),
+        handoff("verification_agent"),
+        thought("Verified. Compiling the Editor.js report.", "final"),
+        json.dumps(REPORT),
+    ],
+    "data_agent": [
+        [("gather_data_tool", {"request": "Q1 2024 sales and customers"})],
+        "Gathered sales, customer counts and item values for Q1 2024.",
+    ],
+    "math_agent": [
+        math_calls,
+        "Computed the minimum, maximum, average and sum of the item values.",
+    ],
+    "verification_agent": [
+        "Report verified",
+    ],
+}
+
+
+def fanout_script(n, parallel):
+    """HANDOFF_SCRIPT, but the supervisor first hands n independent data tasks
+    to data_agent: in one delegate_tasks call if `parallel`, otherwise one
+    transfer after another."""
+    tasks = [("data_agent", f"Gather Acme sales for Q{i % 4 + 1} {2024 - i // 4}.") for i in range(n)]
+    fanout = [delegate(tasks)] if parallel else [handoff(agent_name) for agent_name, _ in tasks]
+    supervisor = HANDOFF_SCRIPT["supervisor"]
+    return {**HANDOFF_SCRIPT, "supervisor": supervisor[:1] + fanout + supervisor[2:]}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Replays HANDOFF_SCRIPT (or `script`) with a fixed `latency` per call."""
+
+    model_name: str = "gpt-4.1-mini"
+    latency: float = 0.0
+    script: dict = HANDOFF_SCRIPT
+    tool_names: Optional[List[str]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        names = [convert_to_openai_tool(t)["function"]["name"] for t in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def _role(self, messages):
+        if messages and isinstance(messages[0], SystemMessage):
+            prompt = " ".join(str(messages[0].content).lower().split())
+            for marker, role in ROLE_MARKERS.items():
+                if marker in prompt:
+                    return role
+        return "supervisor"
+
+    def _steps(self, role):
+        steps = []
+        for step in self.script[role]:
+            if isinstance(step, str) or callable(step):
+                steps.append(step)
+            elif self.tool_names is None or all(name in self.tool_names for name, _ in step):
+                steps.append(step)
+        return steps
+
+    def _reply(self, messages) -> AIMessage:
+        role = self._role(messages)
+        start = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage) or _handed_to(m, role)),
+            default=-1,
+        )
+        done = sum(
+            1 for m in messages[start + 1:]
+            if isinstance(m, AIMessage) and m.name == role and not _handed_to(m, None)
+        )
+        steps = self._steps(role)
+        step = steps[min(done, len(steps) - 1)]
+
+        if isinstance(step, str):
+            return AIMessage(content=step)
+        calls = step(messages) if callable(step) else step
+        if self.tool_names is not None:
+            calls = [(name, args) for name, args in calls if name in self.tool_names]
+        return AIMessage(content="", tool_calls=[
+            {"name": name, "args": args, "id": f"call_{next(_call_ids)}"} for name, args in calls
+        ])
+
+    def _result(self, messages) -> ChatResult:
+        reply = self._reply(messages)
+        # Approximate usage, so token accounting downstream has something to count.
+        prompt, completion = count_tokens_approximately(messages), count_tokens_approximately([reply])
+        reply.usage_metadata = {"input_tokens": prompt, "output_tokens": completion, "total_tokens": prompt + completion}
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(messages)
+
@@ -0,0 +1,217 @@
+"""
+Events/sec and CPU per stream for the SSE pipeline, before and after dropping
+the "debug" stream mode and the per-event printing.
+
+"legacy" replays the previous router: it subscribes to messages, custom and
+debug, prints every raw event and walks the debug payloads for thoughts.
+"current" is streaming.SSEEventRouter with streaming.STREAM_MODES.
+
+Both drive the same small graph offline: a supervisor-like loop that calls
+notify_thought_tool a few times, then streams an Editor.js report from a fake
+chat model token by token. Legacy prints go to /dev/null, so its numbers are
+a lower bound for a process that writes them to a terminal or log pipe.
+From the repository root:
+
+    python -m l006-context-agent.benchmarks.sse_pipeline --streams 20
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+from typing import Annotated, Sequence, TypedDict
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AnyMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode
+
+from lesson_common.editorjs_stream import ReportBlockStream
+from ..streaming import STREAM_MODES, SSEEventRouter, sse
+from ..tools import notify_thought_tool
+
+LEGACY_STREAM_MODES = ["messages", "custom", "debug"]
+PARAGRAPH = "Revenue grew in every region while operating costs stayed flat, lifting the margin. " * 4
+
+
+class LegacySSEEventRouter:
+    """The router as it was before the debug mode was dropped."""
+
+    def __init__(self):
+        self.sent_thoughts = set()
+        self.report = ReportBlockStream()
+
+    def handle(self, event, data_tuple):
+        print("-" * 80)
+        print(f"RAW EVENT: {repr(event)}")
+        print("-" * 80)
+
+        if event == "debug":
+            yield from self._handle_debug(data_tuple)
+            return
+        if event != "messages":
+            return
+
+        msg, metadata = data_tuple
+        content = getattr(msg, "content", "")
+        msg_type = getattr(msg, "type", None)
+
+        if msg_type == 'ai' and getattr(msg, 'tool_calls', None):
+            for tool_call in msg.tool_calls:
+                if tool_call.get('name') == 'notify_thought_tool':
+                    args = tool_call.get('args', {})
+                    event_name = args.get("stage", "thought")
+                    text = args.get("thought", "")
+                    if text and text not in self.sent_thoughts:
+                        print(f"SSE (from AIMessage tool_call) → {event_name}: {text}")
+                        yield sse(event_name, text)
+                        self.sent_thoughts.add(text)
+        elif msg_type in ('ai', 'AIMessageChunk'):
+            for block in self.report.feed(msg):
+                yield sse("report_block", json.dumps(block))
+        elif msg_type == "tool" and getattr(msg, 'name', '') == "notify_thought_tool":
+            tool_data = json.loads(content or "{}")
+            text = tool_data.get("content", "")
+            if text and text not in self.sent_thoughts:
+                print(f"SSE (from ToolMessage) → {tool_data.get('event')}: {text}")
+                yield sse(tool_data.get("event", "thought"), text)
+                self.sent_thoughts.add(text)
+            else:
+                print(f"SSE → (ignored duplicate ToolMessage): {text}")
+        else:
+            node = metadata.get("langgraph_node", "unknown")
+            print(f"SSE → (ignored event) Type: {msg_type}, Node: {node}, Tool: {getattr(msg, 'name', '')}")
+
+    def finish(self):
+        for block in self.report.finish():
+            yield sse("report_block", json.dumps(block))
+
+    def _handle_debug(self, payload):
+        print("DEBUG_INSPECT type:", type(payload))
+        if isinstance(payload, dict):
+            print("DEBUG_INSPECT keys:", payload.keys())
+        result = payload.get("payload", {}).get("result", [])
+        # Newer langgraph sends task results as a dict; the old code expected pairs.
+        for key, val in (result.items() if isinstance(result, dict) else result):
+            if key != "messages":
+                continue
+            for msg in val:
+                if getattr(msg, "type", None) == "tool" and getattr(msg, "name", None) == "notify_thought_tool":
+                    tool_data = json.loads(getattr(msg, "content", "{}"))
+                    text = tool_data.get("content", "")
+                    if text and text not in self.sent_thoughts:
+                        yield sse(tool_data.get("event", "thought"), text)
+                        self.sent_thoughts.add(text)
+
+
+class BenchState(TypedDict):
+    messages: Annotated[Sequence[AnyMessage], add_messages]
+    step: int
+
+
+def report_json(blocks):
+    return json.dumps({
+        "time": 1752971214073,
+        "blocks": [{"type": "header", "data": {"text": "Quarterly Report", "level": 2}}]
+        + [{"type": "paragraph", "data": {"text": f"{i + 1}. {PARAGRAPH}"}} for i in range(blocks - 1)],
+    })
+
+
+def build_graph(thoughts, blocks):
+    report = report_json(blocks)
+
+    def supervisor(state: BenchState):
+        step = state.get("step", 0)
+        if step < thoughts:
+            call = {
+                "name": "notify_thought_tool",
+                "args": {"thought": f"Step {step}: checking the gathered figures.", "stage": "thought"},
+                "id": f"thought-{step}",
+            }
+            return {"messages": [AIMessage(content="", tool_calls=[call])], "step": step + 1}
+        # GenericFakeChatModel streams its reply one whitespace-separated token at a time.
+        model = GenericFakeChatModel(messages=iter([AIMessage(content=report)]))
+        return {"messages": [model.invoke(state["messages"])], "step": step + 1}
+
+    def route(state: BenchState):
+        return "tools" if state["step"] <= thoughts else END
+
+    graph = StateGraph(BenchState)
+    graph.add_node("supervisor", supervisor)
+    graph.add_node("tools", ToolNode([notify_thought_tool]))
+    graph.set_entry_point("supervisor")
+    graph.add_conditional_edges("supervisor", route, ["tools", END])
+    graph.add_edge("tools", "supervisor")
+    return graph.compile(checkpointer=InMemorySaver())
+
+
+def run(workflow, router_cls, stream_modes, streams, history):
+    subgraphs = router_cls is SSEEventRouter
+    events = sse_events = 0
+    wall = cpu = 0.0
+    for i in range(streams):
+        router = router_cls()
+        config = {"configurable": {"thread_id": f"bench-{router_cls.__name__}-{i}"}, "recursion_limit": 200}
+        if history:
+            # Earlier turns on the thread; debug checkpoint events carry all of them.
+            workflow.update_state(config, {"messages": [
+                ("user" if n % 2 == 0 else "ai", f"Earlier turn {n}. {PARAGRAPH}") for n in range(history)
+            ]})
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        stream = workflow.stream(
+            {"messages": [("user", "report please")], "step": 0}, config,
+            stream_mode=stream_modes, subgraphs=subgraphs,
+        )
+        for item in stream:
+            event, data = item[-2:]
+            events += 1
+            sse_events += sum(1 for _ in router.handle(event, data))
+        sse_events += sum(1 for _ in router.finish())
+        wall += time.perf_counter() - wall_start
+        cpu += time.process_time() - cpu_start
+    return {
+        "stream events/stream": events / streams,
+        "sse events/stream": sse_events / streams,
+        "events/sec": events / wall,
+        "wall ms/stream": wall / streams * 1000,
+        "cpu ms/stream": cpu / streams * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--thoughts", type=int, default=6)
+    parser.add_argument("--blocks", type=int, default=12)
+    parser.add_argument("--history", type=int, default=0, help="messages already on each thread")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    workflow = build_graph(args.thoughts, args.blocks)
+    pipelines = (
+        ("legacy", LegacySSEEventRouter, LEGACY_STREAM_MODES),
+        ("current", SSEEventRouter, STREAM_MODES),
+    )
+    results = {}
+    # Line buffered, as stdout is on a terminal: one write per printed line.
+    with open(os.devnull, "w", buffering=1) as devnull, contextlib.redirect_stdout(devnull):
+        for _, router_cls, modes in pipelines:
+            run(workflow, router_cls, modes, 1, args.history)  # warm-up
+        # Alternate the pipelines and keep each one's fastest round to damp noise.
+        for _ in range(args.rounds):
+            for name, router_cls, modes in pipelines:
+                result = run(workflow, router_cls, modes, args.streams, args.history)
+                if name not in results or result["cpu ms/stream"] < results[name]["cpu ms/stream"]:
+                    results[name] = result
+
+    print(f"{args.streams} streams, {args.thoughts} thoughts, {args.blocks} report blocks "
+          f"and {args.history} earlier messages each (best of {args.rounds} rounds)")
+    print(f"{'':<24}{'legacy':>12}{'current':>12}")
+    for metric in results["legacy"]:
+        print(f"{metric:<24}{results['legacy'][metric]:>12.1f}{results['current'][metric]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
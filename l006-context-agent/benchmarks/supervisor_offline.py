@@ -0,0 +1,193 @@
+"""
+Orchestration overhead of the supervisor graphs, measured offline.
+
+Swaps gpt_41 / gpt_41_mini in each lesson's models.py for ScriptedChatModel
+before the lesson's agents and supervisor are imported, then replays one
+report request per run: supervisor -> data_agent -> math_agent ->
+verification_agent -> report. Reports per-node latency, wall time per run,
+checkpoint bytes per run and peak Python memory, with no network access.
+From the repository root:
+
+    python -m l006-context-agent.benchmarks.supervisor_offline --runs 20
+    python -m l006-context-agent.benchmarks.supervisor_offline --lesson l002-supervisor --latency 0.05 --json
+
+With --latency 0 (the default) the numbers are framework time only.
+
+--fanout N makes the supervisor hand N independent data tasks to data_agent
+before the math step; add --parallel to hand them over in one turn through
+l006's delegate_tasks tool (SUPERVISOR_PARALLEL_HANDOFFS=on). With a model
+latency, compare the two to see the wall time saved by the fan-out:
+
+    python -m l006-context-agent.benchmarks.supervisor_offline --lesson l006-context-agent --fanout 4 --latency 0.2
+    python -m l006-context-agent.benchmarks.supervisor_offline --lesson l006-context-agent --fanout 4 --latency 0.2 --parallel
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.memory import InMemorySaver
+
+from .checkpoint_delta import CountingSerializer
+from .scripted_model import HANDOFF_SCRIPT, ScriptedChatModel, fanout_script
+
+LESSONS = ["l002-supervisor", "l003-stream", "l004-editorjs", "l005-redis", "l006-context-agent"]
+REQUEST = "Create a sales report for Acme for Q1 2024."
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time per graph node, labelled by subgraph path, e.g. data_agent/tools."""
+
+    def __init__(self):
+        self.started = {}
+        self.durations = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, tags=None, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        # Only the node task itself (tagged with its graph step), not the
+        # runnables nested inside it, which inherit the same metadata.
+        if node is None or not any(tag.startswith("graph:step:") for tag in tags or ()):
+            return
+        namespace = metadata.get("langgraph_checkpoint_ns", "")
+        label = "/".join(part.split(":")[0] for part in namespace.split("|") if part)
+        self.started[run_id] = (label or node, time.perf_counter())
+
+    def _stop(self, run_id):
+        entry = self.started.pop(run_id, None)
+        if entry is not None:
+            label, start = entry
+            self.durations[label].append(time.perf_counter() - start)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._stop(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # Handoffs leave a node by raising ParentCommand.
+        self._stop(run_id)
+
+
+def load_supervisor(lesson, latency, script=HANDOFF_SCRIPT, parallel=False):
+    """Patch the lesson's models, then import its (uncompiled) supervisor graph."""
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+    os.environ["SUPERVISOR_PARALLEL_HANDOFFS"] = "on" if parallel else "off"
+    models = importlib.import_module(f"{lesson}.models")
+    models.gpt_41 = ScriptedChatModel(model_name="gpt-4.1", latency=latency, script=script)
+    models.gpt_41_mini = ScriptedChatModel(model_name="gpt-4.1-mini", latency=latency, script=script)
+    return importlib.import_module(f"{lesson}.supervisor").supervisor
+
+
+def run_once(workflow, callbacks=None):
+    config = {
+        "configurable": {"thread_id": f"bench-{uuid.uuid4()}"},
+        "recursion_limit": 100,
+        "max_concurrency": 8,
+        "callbacks": callbacks or [],
+    }
+    result = workflow.invoke({"messages": [{"role": "user", "content": REQUEST}], "user_id": 1}, config)
+    report = result["messages"][-1].content
+    if '"blocks"' not in report:
+        raise RuntimeError(f"run did not end with a report: {report[:200]!r}")
+    return result
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def bench_lesson(lesson, runs, latency, fanout=0, parallel=False):
+    script = fanout_script(fanout, parallel) if fanout else HANDOFF_SCRIPT
+    supervisor = load_supervisor(lesson, latency, script, parallel)
+    serde = CountingSerializer()
+    workflow = supervisor.compile(checkpointer=InMemorySaver(serde=serde))
+
+    run_once(workflow)  # warm-up: imports, schema and tool binding caches
+    serde.bytes_written = 0
+
+    timer = NodeTimer()
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run_once(workflow, [timer])
+        walls.append(time.perf_counter() - start)
+    checkpoint_bytes = serde.bytes_written / runs
+
+    # Separate pass: tracemalloc slows everything down and would skew timings.
+    tracemalloc.start()
+    run_once(workflow)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "lesson": lesson,
+        "runs": runs,
+        "latency_s": latency,
+        "fanout": fanout,
+        "parallel": parallel,
+        "messages_per_run": len(result["messages"]),
+        "wall_ms": {
+            "mean": statistics.mean(walls) * 1000,
+            "p50": percentile(walls, 0.5) * 1000,
+            "p95": percentile(walls, 0.95) * 1000,
+        },
+        "nodes": {
+            label: {
+                "calls_per_run": len(times) / runs,
+                "mean_ms": statistics.mean(times) * 1000,
+                "total_ms_per_run": sum(times) / runs * 1000,
+            }
+            for label, times in sorted(timer.durations.items())
+        },
+        "checkpoint_kb_per_run": checkpoint_bytes / 1024,
+        "peak_memory_mb": peak / 1024 / 1024,
+    }
+
+
+def print_result(r):
+    wall = r["wall_ms"]
+    fanout = f", fan-out {r['fanout']} {'parallel' if r['parallel'] else 'sequential'}" if r["fanout"] else ""
+    print(f"\n== {r['lesson']}  ({r['runs']} runs, {r['latency_s'] * 1000:.0f} ms per model call{fanout})")
+    print(f"wall ms/run: mean {wall['mean']:.1f}  p50 {wall['p50']:.1f}  p95 {wall['p95']:.1f}")
+    print(f"messages/run: {r['messages_per_run']}  checkpoint KB/run: {r['checkpoint_kb_per_run']:.1f}  "
+          f"peak memory MB: {r['peak_memory_mb']:.1f}")
+    print(f"{'node':<36}{'calls/run':>10}{'mean ms':>10}{'ms/run':>10}")
+    for label, n in r["nodes"].items():
+        print(f"{label:<36}{n['calls_per_run']:>10.1f}{n['mean_ms']:>10.2f}{n['total_ms_per_run']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lesson", nargs="+", default=LESSONS, choices=LESSONS)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per model call")
+    parser.add_argument("--fanout", type=int, default=0, help="independent data tasks per request")
+    parser.add_argument("--parallel", action="store_true", help="hand the fan-out tasks over in one turn")
+    parser.add_argument("--json", action="store_true", help="print one JSON document, e.g. for CI")
+    args = parser.parse_args()
+    if args.parallel and args.lesson != ["l006-context-agent"]:
+        parser.error("--parallel needs --lesson l006-context-agent (the only lesson with delegate_tasks)")
+
+    # The lessons print as they run; keep stdout clean for the JSON document.
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        results = [
+            bench_lesson(lesson, args.runs, args.latency, args.fanout, args.parallel) for lesson in args.lesson
+        ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print_result(r)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import asyncio
+import contextlib
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional
+
+# gather_data_tool reads from the data source named by DATA_SOURCE_URL:
+#   random                      made-up numbers (the default, no setup needed)
+#   sqlite:///path/to/data.db   the SQLite reference source below
+# Settings are read when the source is first built, like the checkpointer's.
+
+
+def data_source_settings():
+    return {
+        "url": os.getenv("DATA_SOURCE_URL", "random"),
+        "pool_size": int(os.getenv("DATA_SOURCE_POOL_SIZE", "8")),
+        "pool_timeout": float(os.getenv("DATA_SOURCE_POOL_TIMEOUT", "5")),
+        "query_timeout": float(os.getenv("DATA_SOURCE_QUERY_TIMEOUT", "10")),
+        "page_size": int(os.getenv("DATA_SOURCE_PAGE_SIZE", "5000")),
+        "max_rows": int(os.getenv("DATA_SOURCE_MAX_ROWS", "1000000")),
+    }
+
+
+class DataSourceTimeout(TimeoutError):
+    """No connection became free, or a query ran past its deadline."""
+
+
+class DataSource(ABC):
+    """
+    What gather_data_tool reads from. lookup() finds the report a request is
+    about (its scalar fields, plus whatever pages() needs to find its items);
+    pages() yields the report's items a page at a time, as columns
+    ({"id": [...], "name": [...], "value": [...]}), so that no page is ever
+    turned into one dict per row.
+
+    The async variants run each call on a worker thread, so a slow query
+    blocks neither the event loop nor other reports.
+    """
+
+    @abstractmethod
+    def lookup(self, request: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def pages(self, report: Dict[str, Any], page_size: int) -> Iterator[Dict[str, List[Any]]]:
+        ...
+
+    async def alookup(self, request: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.lookup, request)
+
+    async def apages(self, report: Dict[str, Any], page_size: int):
+        pages = self.pages(report, page_size)
+        done = object()
+        pending = None
+        try:
+            while True:
+                # Shielded: a cancelled reader does not abandon the next() that
+                # is still running on its worker thread.
+                pending = asyncio.ensure_future(asyncio.to_thread(next, pages, done))
+                page = await asyncio.shield(pending)
+                if page is done:
+                    return
+                yield page
+        finally:
+            # A reader that stops early does not leave the query's generator open.
+            # It can only be closed once that next() has returned: closing it
+            # while it runs fails ("generator already executing") and leaves
+            # whatever the page holds, such as its connection, checked out.
+            if pending is not None and not pending.done():
+                with contextlib.suppress(Exception):
+                    await pending
+            pages.close()
+
+    def close(self):
+        pass
+
+
+class RandomDataSource(DataSource):
+    """A handful of random items per request; what get_db_data() used to return."""
+
+    def lookup(self, request: str) -> Optional[Dict[str, Any]]:
+        return {
+            "sales": random.randint(100, 1000),
+            "customers": random.randint(50, 500),
+            "rows": random.randint(3, 10),
+        }
+
+    def pages(self, report: Dict[str, Any], page_size: int) -> Iterator[Dict[str, List[Any]]]:
+        for start in range(0, report["rows"], page_size):
+            ids = list(range(start, min(start + page_size, report["rows"])))
+            yield {
+                "id": ids,
+                "name": [f"Item {i}" for i in ids],
+                "value": [random.randint(1, 100) for _ in ids],
+            }
+
+
+class ConnectionPool:
+    """
+    At most `size` connections, created on first use and then reused. Callers
+    wait up to `timeout` seconds for a free one, then get DataSourceTimeout.
+    """
+
+    def __init__(self, connect, size: int, timeout: float):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            broken = True
+            raise
+        finally:
+            if broken:
+                # A connection that failed is not handed out again.
+                conn.close()
+                with self._lock:
+                    self._created -= 1
+            else:
+                self._idle.put(conn)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise DataSourceTimeout(f"no free connection after {self.timeout}s ({self.size} in use)") from None
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    company TEXT NOT NULL,
+    period TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    sales INTEGER,
+    customers INTEGER
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    report_id INTEGER NOT NULL REFERENCES reports(id),
+    name TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_report ON items (report_id, id);
+"""
+
+# The report whose company is named in the request; period and report type,
+# when they are named too, pick between that company's reports.
+SQLITE_LOOKUP = """
+SELECT id, company, period, report_type, sales, customers FROM reports
+WHERE instr(lower(:request), lower(company)) > 0
+ORDER BY (instr(lower(:request), lower(period)) > 0) + (instr(lower(:request), lower(report_type)) > 0) DESC, id DESC
+LIMIT 1
+"""
+
+# Keyset pagination: each page starts after the last id of the previous one,
+# so every page is an index range scan however deep into the report it is.
+SQLITE_PAGE = "SELECT id, name, value FROM items WHERE report_id = ? AND id > ? ORDER BY id LIMIT ?"
+
+
+class SQLiteDataSource(DataSource):
+    """Reference implementation on a local SQLite file (schema in SQLITE_SCHEMA)."""
+
+    def __init__(self, path: str, pool_size: int = 8, pool_timeout: float = 5, query_timeout: float = 10):
+        self.path = path
+        self.query_timeout = query_timeout
+        self.pool = ConnectionPool(self._connect, pool_size, pool_timeout)
+
+    def _connect(self):
+        # Connections move between worker threads, but the pool hands each to
+        # one thread at a time.
+        conn = sqlite3.connect(self.path, timeout=self.query_timeout, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _query(self, sql, params):
+        deadline = time.monotonic() + self.query_timeout
+        with self.pool.connection() as conn:
+            # Checked every 1000 VM instructions; a non-zero return aborts the query.
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+            try:
+                return conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                if time.monotonic() > deadline:
+                    raise DataSourceTimeout(f"query ran longer than {self.query_timeout}s") from e
+                raise
+            finally:
+                conn.set_progress_handler(None, 0)
+
+    def lookup(self, request: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(SQLITE_LOOKUP, {"request": request})
+        if not rows:
+            return None
+        report_id, company, period, report_type, sales, customers = rows[0]
+        return {"id": report_id, "company": company, "period": period, "report_type": report_type,
+                "sales": sales, "customers": customers}
+
+    def pages(self, report: Dict[str, Any], page_size: int) -> Iterator[Dict[str, List[Any]]]:
+        last_id = -1
+        while True:
+            # One query per page: the connection goes back to the pool in
+            # between, so a long report does not hold it from the others.
+            rows = self._query(SQLITE_PAGE, (report["id"], last_id, page_size))
+            if not rows:
+                return
+            ids, names, values = (list(column) for column in zip(*rows))
+            yield {"id": ids, "name": names, "value": values}
+            if len(rows) < page_size:
+                return
+            last_id = ids[-1]
+
+    def close(self):
+        self.pool.close()
+
+
+def create_sqlite_database(path, companies, periods, report_types=("sales",), items_per_report=10):
+    """Create (or extend) a SQLite database for SQLiteDataSource with random reports."""
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executescript(SQLITE_SCHEMA)
+        for company in companies:
+            for period in periods:
+                for report_type in report_types:
+                    report_id = conn.execute(
+                        "INSERT INTO reports (company, period, report_type, sales, customers) VALUES (?, ?, ?, ?, ?)",
+                        (company, period, report_type, random.randint(100, 1000), random.randint(50, 500)),
+                    ).lastrowid
+                    conn.executemany(
+                        "INSERT INTO items (report_id, name, value) VALUES (?, ?, ?)",
+                        ((report_id, f"Item {i}", random.randint(1, 100)) for i in range(items_per_report)),
+                    )
+    conn.close()
+
+
+def create_data_source(settings=None) -> DataSource:
+    settings = settings or data_source_settings()
+    url = settings["url"]
+    if url == "random":
+        return RandomDataSource()
+    if url.startswith("sqlite:///"):
+        return SQLiteDataSource(
+            url[len("sqlite:///"):],
+            pool_size=settings["pool_size"],
+            pool_timeout=settings["pool_timeout"],
+            query_timeout=settings["query_timeout"],
+        )
+    raise ValueError(f"Unsupported DATA_SOURCE_URL: {url!r}")
+
+
+_lock = threading.Lock()
+_data_source = None
+
+
+def get_data_source() -> DataSource:
+    """The data source shared by every gather_data_tool call in this process."""
+    global _data_source
+    with _lock:
+        if _data_source is None:
+            _data_source = create_data_source()
+        return _data_source
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Create a SQLite database for DATA_SOURCE_URL=sqlite:///<path>.")
+    parser.add_argument("path")
+    parser.add_argument("--companies", nargs="+", default=["Acme", "Apple", "Microsoft", "Globex"])
+    parser.add_argument("--periods", nargs="+", default=["Q1 2024", "Q2 2024", "Q3 2024", "Q4 2024"])
+    parser.add_argument("--report-types", nargs="+", default=["sales", "financial"])
+    parser.add_argument("--items", type=int, default=1000, help="items per report")
+    args = parser.parse_args()
+    create_sqlite_database(args.path, args.companies, args.periods, args.report_types, args.items)
+    print(f"Wrote {len(args.companies) * len(args.periods) * len(args.report_types)} reports to {args.path}")
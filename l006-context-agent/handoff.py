@@ -0,0 +1,64 @@
+from typing import Annotated, List, Literal
+
+from typing_extensions import TypedDict
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import InjectedToolCallId, tool
+from langgraph.prebuilt import InjectedState
+from langgraph.types import Command, Send
+from langgraph_supervisor.handoff import METADATA_KEY_HANDOFF_DESTINATION, _remove_non_handoff_tool_calls
+
+
+def create_parallel_handoff_tool(agent_names: List[str]):
+    """
+    Tool that hands several independent tasks to agents at once, including the
+    same agent more than once (e.g. data for two companies).
+
+    The per-agent transfer_to_* tools cannot do this: the supervisor runs each
+    tool call as its own task, and only the first handoff that reaches the
+    parent graph wins. This tool is one call that returns one parent Command
+    with a Send branch per task, so the branches run in the same superstep and
+    the supervisor runs once after all of them.
+
+    Every branch sees the history up to this call, its ToolMessage and then a
+    supervisor message with its own task. The branches' messages are merged in
+    task order, so the history stays valid for the model and deterministic.
+    """
+
+    class Task(TypedDict):
+        agent_name: Literal[tuple(agent_names)]
+        task_description: Annotated[str, "What the agent should do, including the company, period and any figures it needs."]
+
+    @tool("delegate_tasks")
+    def delegate_tasks(
+        tasks: List[Task],
+        state: Annotated[dict, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ) -> Command:
+        """
+        Hand independent, self-contained tasks to agents in parallel, one entry per task.
+        The agents work at the same time and you get all their results back together.
+        Only use this for tasks that do not depend on each other's output.
+        """
+        tool_message = ToolMessage(
+            content=f"Delegated {len(tasks)} task(s) to " + ", ".join(t["agent_name"] for t in tasks) + ".",
+            name="delegate_tasks",
+            tool_call_id=tool_call_id,
+        )
+        # Tool calls made next to this one (e.g. notify_thought_tool) never get
+        # their ToolMessage into the parent graph, so drop them from the copy.
+        last_ai_message = _remove_non_handoff_tool_calls(state["messages"][-1], tool_call_id)
+        messages = state["messages"][:-1] + [last_ai_message, tool_message]
+
+        branches = []
+        for task in tasks:
+            # Marked like a handoff ToolMessage, so it is clear which agent it starts.
+            task_message = AIMessage(
+                content=f"Task for {task['agent_name']}: {task['task_description']}",
+                name=last_ai_message.name,
+                response_metadata={METADATA_KEY_HANDOFF_DESTINATION: task["agent_name"]},
+            )
+            branches.append(Send(task["agent_name"], {**state, "messages": messages + [task_message]}))
+        return Command(graph=Command.PARENT, goto=branches)
+
+    return delegate_tasks
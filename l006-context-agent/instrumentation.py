@@ -0,0 +1,599 @@
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.errors import GraphBubbleUp
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304)
+
+METRICS = {
+    "langgraph_node_duration_seconds": ("histogram", "Wall time of graph node tasks.", DEFAULT_BUCKETS),
+    "langgraph_node_queue_seconds": ("histogram", "Time a node task waited after its step became ready.", DEFAULT_BUCKETS),
+    "langgraph_llm_duration_seconds": ("histogram", "Wall time of chat model calls.", DEFAULT_BUCKETS),
+    "langgraph_llm_tokens_total": ("counter", "Prompt and completion tokens reported by the model.", None),
+    "langgraph_tool_duration_seconds": ("histogram", "Wall time of tool calls.", DEFAULT_BUCKETS),
+    "langgraph_checkpoint_duration_seconds": ("histogram", "Wall time of checkpointer operations.", DEFAULT_BUCKETS),
+    "langgraph_checkpoint_bytes": ("histogram", "Serialized bytes written per checkpointer write.", SIZE_BUCKETS),
+    "sse_format_duration_seconds": ("histogram", "Time spent turning one stream event into SSE.", DEFAULT_BUCKETS),
+    "sse_events_total": ("counter", "SSE messages sent, by event name.", None),
+}
+
+
+# --- Prometheus-style metrics
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    # Exact decimal text: ":g" would turn 1048576 into "1.04858e+06", a bound
+    # Prometheus would then read as a different bucket.
+    value = float(value)
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by metric name and label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def inc(self, name, value=1.0, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def render_prometheus(self):
+        """Text exposition format, as served by GET /metrics."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            series = defaultdict(list)
+            for (name, labels), value in counters:
+                series[name].append(f"{name}{_label_text(labels)} {_number(value)}")
+            for (name, labels), h in histograms:
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    series[name].append(f"{name}_bucket{_label_text(labels, [('le', _number(bound))])} {cumulative}")
+                series[name].append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {h.count}")
+                series[name].append(f"{name}_sum{_label_text(labels)} {_number(h.sum)}")
+                series[name].append(f"{name}_count{_label_text(labels)} {h.count}")
+
+        lines = []
+        for name in sorted(series):
+            kind, help_text, _ = METRICS[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(series[name])
+        return "\n".join(lines) + "\n"
+
+
+# --- Spans (OpenTelemetry data model)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace_id, parent_span_id, name, attributes):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = "UNSET"
+
+    def end(self, error=None):
+        self.end_ns = time.time_ns()
+        self.status = "ERROR" if error is not None else "OK"
+        if error is not None:
+            self.attributes["exception.type"] = type(error).__name__
+
+    def to_dict(self):
+        """OTLP/JSON field names, so spans can be posted to a collector as-is."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": f"STATUS_CODE_{self.status}"},
+        }
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class InMemorySpanExporter:
+    """Keeps the last `max_spans` finished spans; for tests and local debugging."""
+
+    def __init__(self, max_spans=10_000):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self._spans.extend(spans)
+
+    def get_finished_spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def span_tree(self, trace_id):
+        """Nested {"span": ..., "children": [...]} dicts for one trace, children in start order."""
+        spans = sorted((s for s in self.get_finished_spans() if s.trace_id == trace_id), key=lambda s: s.start_ns)
+        nodes = {s.span_id: {"span": s.to_dict(), "children": []} for s in spans}
+        roots = []
+        for s in spans:
+            parent = nodes.get(s.parent_span_id)
+            (parent["children"] if parent else roots).append(nodes[s.span_id])
+        return roots
+
+
+class OpenTelemetrySpanExporter:
+    """
+    Replays finished traces through an OpenTelemetry tracer, so they reach
+    whatever exporter the SDK is configured with. Needs opentelemetry-api.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("langgraph.instrumentation")
+
+    def export(self, spans):
+        started = {}
+        for s in sorted(spans, key=lambda s: s.start_ns):
+            parent = started.get(s.parent_span_id)
+            context = self._trace.set_span_in_context(parent) if parent is not None else None
+            started[s.span_id] = self.tracer.start_span(
+                s.name, context=context, start_time=s.start_ns, attributes=s.attributes
+            )
+        for s in spans:
+            otel_span = started[s.span_id]
+            if s.status == "ERROR":
+                otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+            otel_span.end(end_time=s.end_ns)
+
+
+# --- Callback handler: node, model and tool spans
+
+def _node_path(namespace):
+    # "data_agent:<task id>|tools:<task id>" -> "data_agent/tools"
+    return "/".join(part.split(":")[0] for part in namespace.split("|") if part)
+
+
+def _parent_namespace(namespace):
+    return namespace.rpartition("|")[0] if "|" in namespace else ""
+
+
+class _Trace:
+    def __init__(self, thread_id):
+        self.trace_id = uuid.uuid4().hex
+        self.thread_id = thread_id
+        self.spans = []
+        # (parent namespace, step) -> time the step became ready, for queue time
+        self.step_ready = {}
+        self.last_end = {}
+
+
+class _Run:
+    __slots__ = ("trace", "span", "node", "start", "kind", "namespace")
+
+    def __init__(self, trace, span, node, kind=None, namespace=None):
+        self.trace = trace
+        self.span = span
+        self.node = node
+        self.kind = kind
+        self.namespace = namespace
+        self.start = time.perf_counter()
+
+
+class InstrumentationHandler(BaseCallbackHandler):
+    """
+    Builds one span tree per graph run (graph -> node -> model/tool) from the
+    LangChain callbacks and feeds node, model and tool timings and token counts
+    into the owning Instrumentation. One handler can serve concurrent runs.
+    """
+
+    raise_error = False
+
+    def __init__(self, instrumentation):
+        self.instrumentation = instrumentation
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, parent_run_id, name, metadata, kind, attributes=None):
+        metadata = metadata or {}
+        with self._lock:
+            parent = self._runs.get(parent_run_id)
+            if parent is None:
+                trace = _Trace(metadata.get("thread_id"))
+                span = Span(trace.trace_id, None, name, {"langgraph.thread_id": str(trace.thread_id)})
+                run = _Run(trace, span, None, "graph", "")
+                self._runs[run_id] = run
+                return run
+            if kind is None:
+                # Plumbing runnables get no span; children attach to the nearest one.
+                self._runs[run_id] = _Run(parent.trace, parent.span, parent.node)
+                return None
+
+            trace = parent.trace
+            namespace = metadata.get("langgraph_checkpoint_ns", "")
+            node = _node_path(namespace) if kind == "node" else parent.node
+            attrs = {"langgraph.thread_id": str(trace.thread_id), "langgraph.node": node or ""}
+            attrs.update(attributes or {})
+            span = Span(trace.trace_id, parent.span.span_id, name if kind != "node" else node, attrs)
+            run = _Run(trace, span, node, kind, namespace)
+            if kind == "node":
+                step_key = (_parent_namespace(namespace), metadata.get("langgraph_step"))
+                ready = trace.step_ready.setdefault(
+                    step_key, trace.last_end.get(step_key[0], parent.start)
+                )
+                queue = max(0.0, run.start - ready)
+                attrs["langgraph.step"] = metadata.get("langgraph_step", 0)
+                attrs["langgraph.queue_time_ms"] = round(queue * 1000, 3)
+                self.instrumentation.record_queue(trace.thread_id, node, queue)
+            self._runs[run_id] = run
+            return run
+
+    def _end(self, run_id, error=None, **extra):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+            if run is None or run.kind is None:
+                return
+            if isinstance(error, GraphBubbleUp):
+                # Handoffs (ParentCommand) and interrupts are control flow, not failures.
+                error = None
+            elapsed = time.perf_counter() - run.start
+            run.span.end(error)
+            run.trace.spans.append(run.span)
+            if run.kind == "node":
+                run.trace.last_end[_parent_namespace(run.namespace)] = time.perf_counter()
+            finished_trace = run.trace if run.kind == "graph" else None
+
+        thread_id = run.trace.thread_id
+        if run.kind == "node":
+            self.instrumentation.record_node(thread_id, run.node, elapsed)
+        elif run.kind == "llm":
+            prompt, completion = extra.get("tokens", (0, 0))
+            run.span.attributes["gen_ai.usage.input_tokens"] = prompt
+            run.span.attributes["gen_ai.usage.output_tokens"] = completion
+            self.instrumentation.record_llm(
+                thread_id, run.node, run.span.attributes.get("gen_ai.request.model", ""), elapsed, prompt, completion
+            )
+        elif run.kind == "tool":
+            self.instrumentation.record_tool(thread_id, run.node, run.span.attributes["gen_ai.tool.name"], elapsed)
+        if finished_trace is not None:
+            self.instrumentation.export(finished_trace.spans)
+
+    # chains: the graph itself and its node tasks
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        is_node = (metadata or {}).get("langgraph_node") is not None and any(
+            tag.startswith("graph:step:") for tag in tags or ()
+        )
+        self._start(run_id, parent_run_id, kwargs.get("name") or "graph", metadata, "node" if is_node else None)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # chat models
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "")
+        self._start(run_id, parent_run_id, f"chat {model}", metadata, "llm", {"gen_ai.request.model": model})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name", "")
+        self._start(run_id, parent_run_id, f"llm {model}", metadata, "llm", {"gen_ai.request.model": model})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, tokens=_token_usage(response))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error, tokens=(0, 0))
+
+    # tools
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._start(run_id, parent_run_id, f"tool {name}", metadata, "tool", {"gen_ai.tool.name": name})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+def _token_usage(response):
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not (prompt or completion):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = usage.get("prompt_tokens", 0)
+        completion = usage.get("completion_tokens", 0)
+    return prompt, completion
+
+
+# --- Checkpointer wrapper: operation latency and written bytes
+
+_bytes_written = contextvars.ContextVar("checkpoint_bytes_written", default=None)
+
+
+class _CountingSerde:
+    """Proxy for a checkpointer's serializer that adds up what it produces."""
+
+    def __init__(self, inner):
+        self._inner = inner
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+    def dumps_typed(self, obj):
+        type_, data = self._inner.dumps_typed(obj)
+        counter = _bytes_written.get()
+        if counter is not None:
+            counter[0] += len(data)
+        return type_, data
+
+
+class InstrumentedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Times every checkpointer call and records the bytes each write serializes.
+    Wraps the outermost saver; sizes are counted at the innermost serializer,
+    so with CHECKPOINT_MODE=delta they are the delta sizes actually stored.
+    """
+
+    def __init__(self, inner, instrumentation):
+        store = inner
+        while isinstance(getattr(store, "inner", None), BaseCheckpointSaver):
+            store = store.inner
+        if not isinstance(store.serde, _CountingSerde):
+            store.serde = _CountingSerde(store.serde)
+        super().__init__(serde=inner.serde)
+        self.inner = inner
+        self.instrumentation = instrumentation
+
+    @property
+    def config_specs(self):
+        return self.inner.config_specs
+
+    def get_next_version(self, current, channel):
+        return self.inner.get_next_version(current, channel)
+
+    def _record(self, op, config, start, counter):
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        self.instrumentation.record_checkpoint(thread_id, op, time.perf_counter() - start, counter[0] if counter else None)
+
+    def _call(self, op, config, fn, *args, count_bytes=False):
+        counter = [0] if count_bytes else None
+        token = _bytes_written.set(counter)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            _bytes_written.reset(token)
+            self._record(op, config, start, counter)
+
+    async def _acall(self, op, config, fn, *args, count_bytes=False):
+        counter = [0] if count_bytes else None
+        token = _bytes_written.set(counter)
+        start = time.perf_counter()
+        try:
+            return await fn(*args)
+        finally:
+            _bytes_written.reset(token)
+            self._record(op, config, start, counter)
+
+    def get_tuple(self, config):
+        return self._call("get", config, self.inner.get_tuple, config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.inner.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._call("put", config, self.inner.put, config, checkpoint, metadata, new_versions, count_bytes=True)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self._call("put_writes", config, self.inner.put_writes, config, writes, task_id, task_path, count_bytes=True)
+
+    def delete_thread(self, thread_id):
+        return self.inner.delete_thread(thread_id)
+
+    async def aget_tuple(self, config):
+        return await self._acall("get", config, self.inner.aget_tuple, config)
+
+    def alist(self, config, *, filter=None, before=None, limit=None):
+        return self.inner.alist(config, filter=filter, before=before, limit=limit)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self._acall("put", config, self.inner.aput, config, checkpoint, metadata, new_versions, count_bytes=True)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self._acall("put_writes", config, self.inner.aput_writes, config, writes, task_id, task_path, count_bytes=True)
+
+    async def adelete_thread(self, thread_id):
+        return await self.inner.adelete_thread(thread_id)
+
+
+# --- Facade
+
+class Instrumentation:
+    """
+    Collects per-node timings, token counts, checkpoint sizes and SSE costs.
+    Metrics are labelled by node (and by thread_id when `thread_label` is set;
+    off by default to keep Prometheus cardinality bounded). Per-thread totals
+    for the last `max_threads` threads are kept for thread_stats().
+    """
+
+    def __init__(self, exporter=None, thread_label=False, max_threads=1000):
+        self.metrics = MetricsRegistry()
+        self.exporter = exporter
+        self.thread_label = thread_label
+        self.max_threads = max_threads
+        self._threads = OrderedDict()
+        self._lock = threading.Lock()
+        self._handler = InstrumentationHandler(self)
+
+    def callback_handler(self):
+        """Pass as config["callbacks"] to workflow.stream / astream / invoke."""
+        return self._handler
+
+    def wrap_checkpointer(self, saver):
+        return InstrumentedCheckpointSaver(saver, self)
+
+    def _labels(self, thread_id, **labels):
+        if self.thread_label and thread_id is not None:
+            labels["thread_id"] = thread_id
+        return labels
+
+    def _thread(self, thread_id):
+        # Caller holds self._lock.
+        stats = self._threads.get(thread_id)
+        if stats is None:
+            stats = self._threads[thread_id] = {"nodes": defaultdict(lambda: defaultdict(float)), "checkpoint_bytes": 0}
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        self._threads.move_to_end(thread_id)
+        return stats
+
+    def record_node(self, thread_id, node, seconds):
+        self.metrics.observe("langgraph_node_duration_seconds", seconds, **self._labels(thread_id, node=node))
+        with self._lock:
+            stats = self._thread(thread_id)["nodes"][node]
+            stats["calls"] += 1
+            stats["wall_s"] += seconds
+
+    def record_queue(self, thread_id, node, seconds):
+        self.metrics.observe("langgraph_node_queue_seconds", seconds, **self._labels(thread_id, node=node))
+        with self._lock:
+            self._thread(thread_id)["nodes"][node]["queue_s"] += seconds
+
+    def record_llm(self, thread_id, node, model, seconds, prompt_tokens, completion_tokens):
+        labels = self._labels(thread_id, node=node or "", model=model)
+        self.metrics.observe("langgraph_llm_duration_seconds", seconds, **labels)
+        self.metrics.inc("langgraph_llm_tokens_total", prompt_tokens, kind="prompt", **labels)
+        self.metrics.inc("langgraph_llm_tokens_total", completion_tokens, kind="completion", **labels)
+        with self._lock:
+            stats = self._thread(thread_id)["nodes"][node or ""]
+            stats["llm_s"] += seconds
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+    def record_tool(self, thread_id, node, tool, seconds):
+        self.metrics.observe("langgraph_tool_duration_seconds", seconds, **self._labels(thread_id, node=node or "", tool=tool))
+        with self._lock:
+            self._thread(thread_id)["nodes"][node or ""]["tool_s"] += seconds
+
+    def record_checkpoint(self, thread_id, op, seconds, size=None):
+        self.metrics.observe("langgraph_checkpoint_duration_seconds", seconds, **self._labels(thread_id, op=op))
+        if size is not None:
+            self.metrics.observe("langgraph_checkpoint_bytes", size, **self._labels(thread_id, op=op))
+            with self._lock:
+                self._thread(thread_id)["checkpoint_bytes"] += size
+
+    def record_sse(self, event, seconds, sent):
+        self.metrics.observe("sse_format_duration_seconds", seconds, event=event)
+        for name in sent:
+            self.metrics.inc("sse_events_total", event=name)
+
+    def export(self, spans):
+        if self.exporter is not None:
+            self.exporter.export(spans)
+
+    def thread_stats(self, thread_id):
+        """Per-node totals for one thread: calls, wall_s, queue_s, llm_s, tool_s and tokens."""
+        with self._lock:
+            stats = self._threads.get(thread_id)
+            if stats is None:
+                return None
+            return {
+                "nodes": {node: dict(values) for node, values in stats["nodes"].items()},
+                "checkpoint_bytes": stats["checkpoint_bytes"],
+            }
+
+    def render_prometheus(self):
+        return self.metrics.render_prometheus()
+
+
+def get_span_exporter():
+    """TRACE_EXPORTER: memory (default), otel (needs opentelemetry-api) or off."""
+    backend = os.getenv("TRACE_EXPORTER", "memory")
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return InMemorySpanExporter(int(os.getenv("TRACE_MAX_SPANS", "10000")))
+    if backend == "otel":
+        return OpenTelemetrySpanExporter()
+    raise ValueError(f"Unknown TRACE_EXPORTER: {backend!r}")
+
+
+instrumentation = Instrumentation(
+    exporter=get_span_exporter(),
+    thread_label=os.getenv("METRICS_THREAD_LABEL", "off") == "on",
+)
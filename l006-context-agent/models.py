@@ -1,11 +1,17 @@
 from langchain_openai import ChatOpenAI
 
+from lesson_common.llm_cache import get_llm_cache
+
+# Opt-in response cache shared by both models (LLM_CACHE=memory|sqlite|redis).
+llm_cache = get_llm_cache()
+
 gpt_41 = ChatOpenAI(
     model = "gpt-4.1",
     temperature = 0,
     max_tokens = None,
     timeout = None,
     max_retries = 3,
+    cache = llm_cache,
 )
 
 gpt_41_mini = ChatOpenAI(
@@ -14,4 +20,5 @@ gpt_41_mini = ChatOpenAI(
     max_tokens = None,
     timeout = None,
     max_retries = 3,
+    cache = llm_cache,
 )
@@ -0,0 +1,190 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+STATS = ("count", "min", "max", "mean", "sum", "std")
+DEFAULT_STATS = ("count", "min", "max", "mean", "sum")
+
+# Below this many values the one-pass Python loop beats converting to NumPy.
+NUMPY_MIN_ROWS = 2_000
+
+
+def _number(x):
+    """Plain JSON number: ints stay ints, so 7 does not come back as 7.0."""
+    if x is None:
+        return None
+    x = float(x)
+    if math.isnan(x):
+        return None
+    return int(x) if x.is_integer() and abs(x) < 2**53 else x
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear interpolation between closest ranks, like numpy.percentile."""
+    position = (len(sorted_values) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def _percentile_key(q: float) -> str:
+    return f"p{q:g}"
+
+
+def _empty(stats, percentiles) -> Dict[str, Any]:
+    result = {name: None for name in stats}
+    if "count" in result:
+        result["count"] = 0
+    if "sum" in result:
+        result["sum"] = 0
+    result.update({_percentile_key(q): None for q in percentiles})
+    return result
+
+
+def _describe_python(values: List[float], stats, percentiles) -> Dict[str, Any]:
+    """Count, min, max, sum, mean and std (Welford) in one pass over the list."""
+    count, total, mean, m2 = 0, 0, 0.0, 0.0
+    low = high = None
+    for v in values:
+        count += 1
+        total += v
+        delta = v - mean
+        mean += delta / count
+        m2 += delta * (v - mean)
+        if low is None or v < low:
+            low = v
+        if high is None or v > high:
+            high = v
+    if count == 0:
+        return _empty(stats, percentiles)
+
+    computed = {"count": count, "min": low, "max": high, "sum": total, "mean": mean, "std": math.sqrt(m2 / count)}
+    result = {name: _number(computed[name]) if name != "count" else count for name in stats}
+    if percentiles:
+        ordered = sorted(values)
+        result.update({_percentile_key(q): _number(_percentile(ordered, q)) for q in percentiles})
+    return result
+
+
+def _describe_numpy(values: np.ndarray, stats, percentiles) -> Dict[str, Any]:
+    if values.size == 0:
+        return _empty(stats, percentiles)
+    result = {}
+    for name in stats:
+        if name == "count":
+            result[name] = int(values.size)
+        elif name == "min":
+            result[name] = _number(values.min())
+        elif name == "max":
+            result[name] = _number(values.max())
+        elif name == "sum":
+            result[name] = _number(values.sum())
+        elif name == "mean":
+            result[name] = _number(values.mean())
+        elif name == "std":
+            result[name] = _number(values.std())
+    if percentiles:
+        points = np.percentile(values, percentiles)
+        result.update({_percentile_key(q): _number(p) for q, p in zip(percentiles, points)})
+    return result
+
+
+def describe(values, stats: Iterable[str] = DEFAULT_STATS, percentiles: Iterable[float] = ()) -> Dict[str, Any]:
+    """
+    Summary statistics of a sequence of numbers. `stats` picks from STATS,
+    `percentiles` are in [0, 100]; std is the population standard deviation.
+    Large inputs and NumPy arrays are summarised with NumPy.
+    """
+    stats, percentiles = list(stats), [float(q) for q in percentiles]
+    if isinstance(values, np.ndarray):
+        return _describe_numpy(values, stats, percentiles)
+    if len(values) >= NUMPY_MIN_ROWS:
+        return _describe_numpy(np.asarray(values, dtype=np.float64), stats, percentiles)
+    return _describe_python(values, stats, percentiles)
+
+
+def _column(items: List[Dict[str, Any]], field: str) -> List[float]:
+    """Numeric values of `field`; items without one (or with None) are skipped."""
+    return [v for v in (item.get(field) for item in items) if isinstance(v, (int, float)) and not isinstance(v, bool)]
+
+
+def _check(stats, percentiles) -> Optional[Dict[str, Any]]:
+    unknown = [name for name in stats if name not in STATS]
+    if unknown:
+        return {"error": f"Unknown statistics {unknown}; choose from {list(STATS)}."}
+    if any(not 0 <= q <= 100 for q in percentiles):
+        return {"error": "Percentiles must be between 0 and 100."}
+    return None
+
+
+def describe_items(
+    items: List[Dict[str, Any]],
+    field: str = "value",
+    stats: Iterable[str] = DEFAULT_STATS,
+    percentiles: Iterable[float] = (),
+    group_by: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    describe() over `field` of a list of records, optionally per distinct value
+    of `group_by` as well. Groups are keyed by the string form of that value,
+    in order of first appearance.
+    """
+    stats, percentiles = list(stats), list(percentiles)
+    error = _check(stats, percentiles)
+    if error:
+        return error
+
+    if group_by is None or len(items) < NUMPY_MIN_ROWS:
+        result = {"field": field, **describe(_column(items, field), stats, percentiles)}
+        if group_by is not None:
+            groups = {}
+            for item in items:
+                groups.setdefault(str(item.get(group_by)), []).append(item)
+            result["groups"] = {
+                key: describe(_column(rows, field), stats, percentiles) for key, rows in groups.items()
+            }
+        return result
+
+    # One pass to build the key and value columns (NaN where an item has no value).
+    keys = np.asarray([str(item.get(group_by)) for item in items], dtype=object)
+    values = np.fromiter(
+        (v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+         for v in (item.get(field) for item in items)),
+        dtype=np.float64,
+        count=len(items),
+    )
+    return {"field": field, **describe_columns(values, keys, stats, percentiles)}
+
+
+def describe_columns(
+    values: np.ndarray,
+    keys: Optional[np.ndarray] = None,
+    stats: Iterable[str] = DEFAULT_STATS,
+    percentiles: Iterable[float] = (),
+) -> Dict[str, Any]:
+    """
+    describe() over a float column, NaN meaning missing, optionally grouped by a
+    key column of the same length. Works on the arrays as given, without copying
+    them into Python objects. Groups are in order of first appearance.
+    """
+    stats, percentiles = list(stats), [float(q) for q in percentiles]
+    error = _check(stats, percentiles)
+    if error:
+        return error
+
+    present = ~np.isnan(values)
+    result = _describe_numpy(values if present.all() else values[present], stats, percentiles)
+    if keys is None:
+        return result
+
+    # A stable sort by group makes each group a contiguous slice of the values.
+    names, first, inverse = np.unique(keys.astype(str), return_index=True, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(names)))
+    slices = np.split(values[order], bounds[:-1])
+    result["groups"] = {
+        str(names[i]): _describe_numpy(slices[i][~np.isnan(slices[i])], stats, percentiles)
+        for i in np.argsort(first, kind="stable")
+    }
+    return result
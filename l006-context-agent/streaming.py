@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import random
+import time
+
+from lesson_common.editorjs_stream import ReportBlockStream
+from .instrumentation import instrumentation
+
+# "debug" is deliberately not subscribed: it re-sends every task payload, and
+# everything the client needs already arrives through these two modes. Stream
+# with subgraphs=True: the supervisor runs its tools inside a nested agent, and
+# their custom writes are only forwarded from subgraphs when it is set.
+STREAM_MODES = ["messages", "custom"]
+
+# Per-event tracing is off by default. SSE_TRACE_SAMPLE_RATE=0.01 logs about one
+# event in a hundred at DEBUG level, as JSON, on the "sse" logger.
+SSE_TRACE_SAMPLE_RATE = float(os.getenv("SSE_TRACE_SAMPLE_RATE", "0"))
+logger = logging.getLogger("sse")
+
+
+def trace(kind, **fields):
+    if SSE_TRACE_SAMPLE_RATE and random.random() < SSE_TRACE_SAMPLE_RATE and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({"kind": kind, **fields}, default=str))
+
+
+def chat_inputs(user_input, user_id):
+    return {"messages": [{"role": "user", "content": user_input}], "user_id": user_id}
+
+
+# Upper bound on tasks (parallel handoffs, tool calls) running at once per request.
+MAX_CONCURRENCY = int(os.getenv("SUPERVISOR_MAX_CONCURRENCY", "4"))
+
+
+def chat_config(user_id):
+    return {
+        "configurable": {
+            "thread_id": f"user-{user_id}",
+            "checkpoint_ns": ""
+        },
+        "recursion_limit": 100,
+        "max_concurrency": MAX_CONCURRENCY,
+        "callbacks": [instrumentation.callback_handler()],
+    }
+
+
+def sse(event, data):
+    """Format a string into a valid SSE message."""
+    lines = str(data).split('\n')
+    formatted_data = "\n".join(f"data: {line}" for line in lines)
+    return f"event: {event}\n{formatted_data}\n\n"
+
+
+class SSEEventRouter:
+    """
+    Turns (stream_mode, payload) pairs from workflow.stream / workflow.astream
+    into SSE strings. Holds the per-connection dedup state so the same router
+    can be driven by the sync Flask generator or the async ASGI generator.
+
+    Thoughts arrive once, as `custom` payloads written by notify_thought_tool;
+    `messages` is only needed for the report tokens.
+    """
+
+    def __init__(self):
+        self.sent_thoughts = set()
+        self.report = ReportBlockStream()
+
+    def handle(self, event, data_tuple):
+        """SSE strings for one (stream_mode, payload) pair."""
+        trace("event", mode=event)
+        start = time.perf_counter()
+        if event == "custom":
+            messages = list(self._handle_custom(data_tuple))
+        elif event == "messages":
+            messages = list(self._handle_message(data_tuple))
+        else:
+            messages = []
+        chunks = [sse(name, data) for name, data in messages]
+        instrumentation.record_sse(event, time.perf_counter() - start, [name for name, _ in messages])
+        return chunks
+
+    def finish(self):
+        """Blocks of a report whose final chunk never arrived; call after the stream ends."""
+        return [sse("report_block", json.dumps(block)) for block in self.report.finish()]
+
+    def _handle_custom(self, payload):
+        if not isinstance(payload, dict):
+            return
+        event_name = payload.get("event", "thought")
+        text = payload.get("content", "")
+        if text and text not in self.sent_thoughts:
+            trace("thought", event=event_name, chars=len(text))
+            self.sent_thoughts.add(text)
+            yield event_name, text
+
+    def _handle_message(self, data_tuple):
+        msg, metadata = data_tuple
+        msg_type = msg.type
+        if msg_type == "AIMessageChunk" or msg_type == "ai":
+            for block in self.report.feed(msg):
+                trace("report_block", type=block.get("type"), node=metadata.get("langgraph_node"))
+                yield "report_block", json.dumps(block)
@@ -1,10 +1,11 @@
+import os
 from typing import Annotated, Sequence, TypedDict
 from langchain_core.messages import AnyMessage
 from langgraph_supervisor import create_supervisor, create_handoff_tool
-from langgraph.checkpoint.memory import InMemorySaver
-from langgraph.checkpoint.redis import RedisSaver
 
-from .utils import capped_add_messages, trim_history
+from .handoff import create_parallel_handoff_tool
+from lesson_common.history import capped_add_messages
+from lesson_common.tokens import make_trim_history
 from .models import gpt_41
 from .agents import data_agent, math_agent, verification_agent
 from .tools import notify_thought_tool
@@ -14,6 +15,26 @@ class SupervisorState(TypedDict):
     remaining_steps: int
     user_id: int
 
+# Opt-in: give the supervisor a delegate_tasks tool that hands independent tasks
+# to several agents in one turn. They run as parallel branches, at most
+# max_concurrency at a time (see chat_config).
+PARALLEL_HANDOFFS = os.getenv("SUPERVISOR_PARALLEL_HANDOFFS", "off") == "on"
+AGENT_NAMES = ["data_agent", "math_agent", "verification_agent"]
+
+PARALLEL_HANDOFF_PROMPT = """
+
+---
+
+PARALLEL HANDOFFS
+
+When a request needs independent pieces of work (for example data for several
+companies or periods), call delegate_tasks once with one task per piece, each
+with a complete task_description, instead of transferring to the agents one by
+one. The tasks run in parallel and you get all results back together. Keep
+using the transfer tools when one step needs the output of another (e.g.
+math_agent needs the data first).
+"""
+
 supervisor = create_supervisor(
     agents=[
         data_agent,
@@ -22,13 +43,13 @@ supervisor = create_supervisor(
     ],
     state_schema=SupervisorState,
     model=gpt_41,
-    pre_model_hook=trim_history,
+    pre_model_hook=make_trim_history(gpt_41.model_name),
     tools=[
-        create_handoff_tool(agent_name="data_agent"),
-        create_handoff_tool(agent_name="math_agent"),
-        create_handoff_tool(agent_name="verification_agent"),
+        *[create_handoff_tool(agent_name=name) for name in AGENT_NAMES],
+        *([create_parallel_handoff_tool(AGENT_NAMES)] if PARALLEL_HANDOFFS else []),
         notify_thought_tool,
     ],
+    parallel_tool_calls=PARALLEL_HANDOFFS,
     output_mode="full_history",
     prompt="""
 You are a report generation supervisor.
@@ -73,7 +94,7 @@ SUPERVISOR RESPONSIBILITIES
 2. Call data_agent to gather required data.
 3. Call math_agent if computations are needed.
 4. Use verification_agent for validation if necessary.
-5. Use gather_data_tool or min_tool directly if appropriate.
+5. Use gather_data_tool or describe_tool directly if appropriate.
 6. Share your thoughts clearly at every key stage using notify_thought_tool.
 7. Compile a final structured report in strict Editor.js JSON format.
 8. Send the final thought by calling notify_thought_tool with your final summary and stage "final".
@@ -119,9 +140,5 @@ EXAMPLE OUTPUT
 }
 
 ALWAYS produce exactly one JSON object. Nothing else.
-"""
+""" + (PARALLEL_HANDOFF_PROMPT if PARALLEL_HANDOFFS else "")
 )
-
-with RedisSaver.from_conn_string("redis://localhost:6379") as checkpointer:
-    checkpointer.setup()
-    workflow = supervisor.compile(checkpointer=checkpointer)
\ No newline at end of file
@@ -1,9 +1,14 @@
-from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool, tool
 from langgraph.config import get_stream_writer
-import random
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Literal, Optional
+import asyncio
 import json
 
+from .artifacts import ARTIFACT_INLINE_ROWS, ColumnBuilder, artifacts, columns_from_pages
+from .datasources import DataSourceTimeout, data_source_settings, get_data_source
+from .stats import describe_columns, describe_items
+
 @tool
 def notify_thought_tool(thought: str, stage: str = "thought") -> str:
     """
@@ -33,116 +38,121 @@ def notify_thought_tool(thought: str, stage: str = "thought") -> str:
 
     return json.dumps(payload)
 
-@tool
-def gather_data_tool(request: str):
+def _thread_id(config: RunnableConfig) -> Optional[str]:
+    return (config or {}).get("configurable", {}).get("thread_id")
+
+def _gathered(report, columns, truncated, config):
+    data = {k: v for k, v in report.items() if k not in ("id", "rows")}
+    dataset = artifacts.put(columns, _thread_id(config))
+    data["dataset"] = dataset.summary()
+    if truncated:
+        data["dataset"]["truncated"] = True
+    if dataset.rows <= ARTIFACT_INLINE_ROWS:
+        data["items"] = dataset.records()
+    return data
+
+def _not_found(request):
+    return {"error": f"No data found for {request!r}. Name the company (and period) in the request."}
+
+def gather_data(request: str, config: RunnableConfig):
     """
     Gather data based on the user's request.
     
     Args:
-        request (str): The user's request for data.
+        request (str): The user's request for data, naming the company and period.
     
     Returns:
         The response will be a JSON data structure containing the gathered data.
+        The items are stored as a dataset: pass its handle to describe_tool
+        instead of copying the items. Small datasets also include the items.
         Example:
         {
-            "data": {
-                "sales": 1000,
-                "customers": 200,
-                "items": [
-                    {"id": 1, "name": "Item 1", "value": 10},
-                    {"id": 2, "name": "Item 2", "value": 20},
-                    {"id": 3, "name": "Item 3", "value": 30}
-                ]
+            "sales": 1000,
+            "customers": 200,
+            "dataset": {
+                "handle": "ds_1a2b3c4d5e6f",
+                "rows": 3,
+                "columns": {"id": "int64", "name": "object", "value": "int64"},
+                "preview": [{"id": 1, "name": "Item 1", "value": 10}, ...]
             },
-            "status": "success"
+            "items": [
+                {"id": 1, "name": "Item 1", "value": 10},
+                {"id": 2, "name": "Item 2", "value": 20},
+                {"id": 3, "name": "Item 3", "value": 30}
+            ]
         }
     """
-    # Placeholder for data gathering logic
-    return get_db_data()
-
-def get_db_data() -> Dict[str, Any]:
-    len = random.randint(3, 10) 
-
-    data = []
-    for i in range(len):
-        data.append({
-            "id": i,
-            "name": f"Item {i}",
-            "value": random.randint(1, 100)
-        })
-
-    return {
-        "sales": random.randint(100, 1000),
-        "customers": random.randint(50, 500),
-        "items": data
-    }
+    source, settings = get_data_source(), data_source_settings()
+    try:
+        report = source.lookup(request)
+        if report is None:
+            return _not_found(request)
+        columns, truncated = columns_from_pages(source.pages(report, settings["page_size"]), settings["max_rows"])
+    except DataSourceTimeout as e:
+        return {"error": f"The data source timed out ({e}). Try again shortly."}
+    return _gathered(report, columns, truncated, config)
 
-@tool
-def min_tool(data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Calculate the minimum value from a list of dictionaries.
-    
-    Args:
-        data (List[Dict[str, Any]]): A list of dictionaries containing numerical values.
-    
-    Returns:
-        The minimum value found in the list of dictionaries.
-    """
-    if not data:
-        return {"min_value": None}
-    
-    min_value = min(item.get("value", float('inf')) for item in data)
-    return {"min_value": min_value}
+async def agather_data(request: str, config: RunnableConfig):
+    source, settings = get_data_source(), data_source_settings()
+    try:
+        report = await source.alookup(request)
+        if report is None:
+            return _not_found(request)
+        # Each page is added as it arrives, as the sync path does, so at most
+        # one page of rows is held besides the columns.
+        builder = ColumnBuilder(settings["max_rows"])
+        pages = source.apages(report, settings["page_size"])
+        try:
+            async for page in pages:
+                if not builder.add(page):
+                    break
+        finally:
+            await pages.aclose()
+        # Converting the columns to arrays is CPU work; keep it off the event loop too.
+        columns, truncated = await asyncio.to_thread(builder.finish)
+    except DataSourceTimeout as e:
+        return {"error": f"The data source timed out ({e}). Try again shortly."}
+    return _gathered(report, columns, truncated, config)
 
-@tool
-def max_tool(data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Calculate the maximum value from a list of dictionaries.
-    
-    Args:
-        data (List[Dict[str, Any]]): A list of dictionaries containing numerical values.
-    
-    Returns:
-        The maximum value found in the list of dictionaries.
-    """
-    if not data:
-        return {"max_value": None}
-    
-    max_value = max(item.get("value", float('-inf')) for item in data)
-    return {"max_value": max_value}
+# Sync for the Flask app, async for the ASGI app; neither blocks the event loop.
+gather_data_tool = StructuredTool.from_function(func=gather_data, coroutine=agather_data, name="gather_data_tool")
 
 @tool
-def average_tool(data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Calculate the average value from a list of dictionaries.
-    
-    Args:
-        data (List[Dict[str, Any]]): A list of dictionaries containing numerical values.
-    
-    Returns:
-        The average value found in the list of dictionaries.
+def describe_tool(
+    config: RunnableConfig,
+    dataset: Optional[str] = None,
+    data: Optional[List[Dict[str, Any]]] = None,
+    stats: List[Literal["count", "min", "max", "mean", "sum", "std"]] = ["count", "min", "max", "mean", "sum"],
+    percentiles: List[float] = [],
+    field: str = "value",
+    group_by: Optional[str] = None,
+) -> Dict[str, Any]:
     """
-    if not data:
-        return {"average_value": None}
-    
-    total = sum(item.get("value", 0) for item in data)
-    count = len(data)
-    average_value = total / count if count > 0 else 0
-    return {"average_value": average_value}
+    Calculate summary statistics of the values in a dataset or a list of dictionaries, all in one call.
 
-@tool
-def sum_tool(data: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """
-    Calculate the sum of values from a list of dictionaries.
-    
     Args:
-        data (List[Dict[str, Any]]): A list of dictionaries containing numerical values.
-    
+        dataset (str): Handle of a dataset returned by gather_data_tool, e.g. "ds_1a2b3c4d5e6f". Preferred over data.
+        data (List[Dict[str, Any]]): A list of dictionaries containing numerical values, if there is no handle.
+        stats (List[str]): Which statistics to compute: count, min, max, mean, sum, std.
+        percentiles (List[float]): Percentiles to compute, between 0 and 100 (e.g. [50, 95]).
+        field (str): The key holding the numerical value, "value" by default.
+        group_by (str): Optional key to also compute the statistics per distinct value of.
+
     Returns:
-        The sum of all values found in the list of dictionaries.
+        A dictionary with one entry per statistic (percentiles as "p50", "p95", ...),
+        and with group_by a "groups" dictionary of the same statistics per group.
     """
-    if not data:
-        return {"sum_value": 0}
-    
-    total = sum(item.get("value", 0) for item in data)
-    return {"sum_value": total}
+    if dataset is None:
+        return describe_items(data or [], field=field, stats=stats, percentiles=percentiles, group_by=group_by)
+
+    stored = artifacts.get(dataset, _thread_id(config))
+    if stored is None:
+        return {"error": f"Unknown or expired dataset {dataset!r}. Gather the data again."}
+    values = stored.columns.get(field)
+    if values is None or values.dtype.kind not in "iuf":
+        numeric = [name for name, column in stored.columns.items() if column.dtype.kind in "iuf"]
+        return {"error": f"Dataset {dataset!r} has no numeric field {field!r}; numeric fields: {numeric}."}
+    if group_by is not None and group_by not in stored.columns:
+        return {"error": f"Dataset {dataset!r} has no field {group_by!r}; fields: {list(stored.columns)}."}
+    keys = stored.columns[group_by] if group_by is not None else None
+    return {"dataset": dataset, "field": field, **describe_columns(values, keys, stats, percentiles)}
@@ -0,0 +1,188 @@
+import contextlib
+import os
+import threading
+
+from redis import BlockingConnectionPool, Redis
+from redis.asyncio import BlockingConnectionPool as AsyncBlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.redis import RedisSaver
+from langgraph.checkpoint.redis.aio import AsyncRedisSaver
+
+from .delta_checkpointer import DeltaCheckpointSaver
+
+# Settings are read when the pool is first built (not at import) so values
+# loaded later by load_dotenv() still apply.
+DEFAULT_REDIS_URL = "redis://localhost:6379"
+
+_lock = threading.Lock()
+_redis_client = None
+_checkpointer = None
+_async_redis_client = None
+
+
+def redis_settings():
+    return {
+        "url": os.getenv("REDIS_URL", DEFAULT_REDIS_URL),
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "32")),
+        "pool_timeout": float(os.getenv("REDIS_POOL_TIMEOUT", "5")),
+        "health_check_interval": int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")),
+        "retries": int(os.getenv("REDIS_RETRIES", "3")),
+        "backend": os.getenv("CHECKPOINT_BACKEND", "redis"),
+        "mode": os.getenv("CHECKPOINT_MODE", "full"),
+        "snapshot_every": int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "25")),
+    }
+
+
+def _wrap(checkpointer, settings):
+    # CHECKPOINT_MODE=delta persists only newly appended messages per checkpoint.
+    if settings["mode"] == "delta":
+        return DeltaCheckpointSaver(checkpointer, snapshot_every=settings["snapshot_every"])
+    return checkpointer
+
+
+def _pool_kwargs(settings):
+    # BlockingConnectionPool makes callers wait up to `timeout` for a free
+    # connection instead of opening unbounded sockets under load.
+    return {
+        "max_connections": settings["max_connections"],
+        "timeout": settings["pool_timeout"],
+        "health_check_interval": settings["health_check_interval"],
+        "socket_keepalive": True,
+        "retry_on_error": [ConnectionError, TimeoutError],
+    }
+
+
+def create_redis_client(settings=None):
+    """Build a sync Redis client backed by a bounded, health-checked pool."""
+    settings = settings or redis_settings()
+    pool = BlockingConnectionPool.from_url(settings["url"], **_pool_kwargs(settings))
+    return Redis(
+        connection_pool=pool,
+        retry=Retry(ExponentialBackoff(cap=2, base=0.05), settings["retries"]),
+    )
+
+
+def create_async_redis_client(settings=None):
+    """Build an asyncio Redis client backed by a bounded, health-checked pool."""
+    settings = settings or redis_settings()
+    pool = AsyncBlockingConnectionPool.from_url(settings["url"], **_pool_kwargs(settings))
+    return AsyncRedis(
+        connection_pool=pool,
+        retry=AsyncRetry(ExponentialBackoff(cap=2, base=0.05), settings["retries"]),
+    )
+
+
+def get_redis_client():
+    """Process-wide pooled Redis client shared by every graph and cache."""
+    global _redis_client
+    with _lock:
+        if _redis_client is None:
+            _redis_client = create_redis_client()
+        return _redis_client
+
+
+def get_checkpointer(redis_client=None):
+    """
+    Return the checkpointer shared by all graphs in this process.
+
+    The first call creates it (and runs setup() once); later calls return the
+    same instance. Pass `redis_client` to the first call to back it with a
+    specific client, e.g. one pointing at a local redis-server; the server
+    needs the RediSearch module (Redis Stack), so fakeredis does not work.
+    Passing a different client once the checkpointer exists raises
+    RuntimeError. For tests and offline runs set CHECKPOINT_BACKEND=memory to
+    use an in-process InMemorySaver instead, and CHECKPOINT_MODE=delta to
+    store the message history as deltas.
+    """
+    global _checkpointer, _redis_client
+    with _lock:
+        if _checkpointer is not None:
+            if redis_client is not None and redis_client is not _redis_client:
+                raise RuntimeError("get_checkpointer(redis_client=...) after the shared checkpointer was created; "
+                                   "call reset_checkpointer() first")
+            return _checkpointer
+
+        settings = redis_settings()
+        if settings["backend"] == "memory":
+            _checkpointer = _wrap(InMemorySaver(), settings)
+            return _checkpointer
+
+        if redis_client is not None:
+            _redis_client = redis_client
+        elif _redis_client is None:
+            _redis_client = create_redis_client(settings)
+
+        checkpointer = RedisSaver(redis_client=_redis_client)
+        checkpointer.setup()
+        # Opens the first pooled connection now so the first turn does not pay for it.
+        _redis_client.ping()
+        _checkpointer = _wrap(checkpointer, settings)
+        return _checkpointer
+
+
+def reset_checkpointer():
+    """Drop the shared checkpointer and close its pool (used by tests and reloads)."""
+    global _checkpointer, _redis_client
+    with _lock:
+        if _redis_client is not None:
+            _redis_client.close()
+            _redis_client.connection_pool.disconnect()
+        _checkpointer = None
+        _redis_client = None
+
+
+def checkpointer_healthy():
+    """Health check for readiness probes: True if the shared Redis answers PING."""
+    if redis_settings()["backend"] == "memory":
+        return True
+    try:
+        return bool(get_redis_client().ping())
+    except (ConnectionError, TimeoutError) as e:
+        print(f"[WARN] Redis health check failed: {e}")
+        return False
+
+
+@contextlib.asynccontextmanager
+async def async_checkpointer(redis_client=None):
+    """
+    Async checkpointer for astream()-based servers. Intended to be entered once
+    per process (e.g. in an ASGI lifespan); the pool is closed on exit.
+    async_checkpointer_healthy() pings its client while it is open.
+    """
+    global _async_redis_client
+    settings = redis_settings()
+    if settings["backend"] == "memory":
+        yield _wrap(InMemorySaver(), settings)
+        return
+
+    client = redis_client or create_async_redis_client(settings)
+    checkpointer = AsyncRedisSaver(redis_client=client)
+    await checkpointer.asetup()
+    await client.ping()
+    _async_redis_client = client
+    try:
+        yield _wrap(checkpointer, settings)
+    finally:
+        _async_redis_client = None
+        if redis_client is None:
+            await client.aclose()
+            await client.connection_pool.disconnect()
+
+
+async def async_checkpointer_healthy():
+    """checkpointer_healthy() for the open async_checkpointer(): PING on its own client, without blocking."""
+    if redis_settings()["backend"] == "memory":
+        return True
+    client = _async_redis_client
+    if client is None:
+        return False
+    try:
+        return bool(await client.ping())
+    except (ConnectionError, TimeoutError) as e:
+        print(f"[WARN] Redis health check failed: {e}")
+        return False
@@ -0,0 +1,240 @@
+import threading
+from collections import OrderedDict
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+
+DELTA_KEY = "__delta__"
+
+
+def is_delta(value):
+    return isinstance(value, dict) and value.get(DELTA_KEY) is True
+
+
+class DeltaCheckpointSaver(BaseCheckpointSaver):
+    """
+    Wraps another checkpointer and stores an append-only channel (the supervisor
+    `messages` list) as deltas: each checkpoint persists only the messages added
+    since its parent checkpoint. Every `snapshot_every` links, or whenever the
+    history is not a pure append (trimmed, replaced, removed), the full list is
+    written again as a compacted snapshot. Loads rebuild the list by walking back
+    to the nearest snapshot; recently seen histories are kept in a small LRU so a
+    running thread does not re-read its own chain.
+    """
+
+    def __init__(self, inner, channel="messages", snapshot_every=25, cache_size=256):
+        super().__init__(serde=inner.serde)
+        self.inner = inner
+        self.channel = channel
+        self.snapshot_every = snapshot_every
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config_specs(self):
+        return self.inner.config_specs
+
+    def get_next_version(self, current, channel):
+        return self.inner.get_next_version(current, channel)
+
+    # --- cache of reconstructed histories: (thread_id, ns, checkpoint_id) -> (messages, depth)
+
+    @staticmethod
+    def _key(config, checkpoint_id=None):
+        configurable = config["configurable"]
+        return (
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            checkpoint_id or configurable.get("checkpoint_id"),
+        )
+
+    def _remember(self, key, messages, depth):
+        with self._lock:
+            self._cache[key] = (messages, depth)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _recall(self, key):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+            return hit
+
+    # --- encoding (write path)
+
+    def _encode(self, config, checkpoint, new_versions, parent):
+        values = checkpoint.get("channel_values") or {}
+        if self.channel not in values:
+            return checkpoint
+
+        messages = list(values[self.channel])
+        key = self._key(config, checkpoint["id"])
+        parent_id = config["configurable"].get("checkpoint_id")
+
+        if parent is None or parent_id is None:
+            self._remember(key, messages, 0)
+            return checkpoint
+
+        parent_messages, parent_depth = parent
+        depth = parent_depth + 1
+        changed = self.channel in new_versions
+        n = len(parent_messages)
+        ids = [getattr(m, "id", None) for m in messages]
+        appended = (
+            None not in ids
+            and n <= len(messages)
+            and [getattr(m, "id", None) for m in parent_messages] == ids[:n]
+        )
+
+        # Unchanged steps never snapshot: savers that store channels as versioned
+        # blobs would not persist the value anyway.
+        if not appended or (changed and depth >= self.snapshot_every):
+            self._remember(key, messages, 0)
+            return checkpoint
+
+        self._remember(key, messages, depth)
+        delta = {DELTA_KEY: True, "base": parent_id, "depth": depth, "append": messages[n:]}
+        return {**checkpoint, "channel_values": {**values, self.channel: delta}}
+
+    # --- decoding (read path)
+
+    def _base_config(self, key):
+        thread_id, ns, checkpoint_id = key
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}}
+
+    def _resolve(self, key, value):
+        if not is_delta(value):
+            messages = list(value)
+            self._remember(key, messages, 0)
+            return messages, 0
+
+        hit = self._recall(key)
+        if hit is not None:
+            return hit
+
+        base_key = key[:2] + (value["base"],)
+        base = self._recall(base_key)
+        if base is None:
+            base_tuple = self.inner.get_tuple(self._base_config(base_key))
+            if base_tuple is None:
+                raise ValueError(f"Delta checkpoint {key} references missing base {value['base']}")
+            base_value = base_tuple.checkpoint["channel_values"].get(self.channel, [])
+            base = self._resolve(base_key, base_value)
+
+        messages = base[0] + list(value["append"])
+        self._remember(key, messages, value["depth"])
+        return messages, value["depth"]
+
+    async def _aresolve(self, key, value):
+        if not is_delta(value):
+            messages = list(value)
+            self._remember(key, messages, 0)
+            return messages, 0
+
+        hit = self._recall(key)
+        if hit is not None:
+            return hit
+
+        base_key = key[:2] + (value["base"],)
+        base = self._recall(base_key)
+        if base is None:
+            base_tuple = await self.inner.aget_tuple(self._base_config(base_key))
+            if base_tuple is None:
+                raise ValueError(f"Delta checkpoint {key} references missing base {value['base']}")
+            base_value = base_tuple.checkpoint["channel_values"].get(self.channel, [])
+            base = await self._aresolve(base_key, base_value)
+
+        messages = base[0] + list(value["append"])
+        self._remember(key, messages, value["depth"])
+        return messages, value["depth"]
+
+    def _with_messages(self, checkpoint_tuple, messages):
+        checkpoint = checkpoint_tuple.checkpoint
+        values = {**checkpoint["channel_values"], self.channel: list(messages)}
+        return CheckpointTuple(
+            config=checkpoint_tuple.config,
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=checkpoint_tuple.metadata,
+            parent_config=checkpoint_tuple.parent_config,
+            pending_writes=checkpoint_tuple.pending_writes,
+        )
+
+    def _decode(self, checkpoint_tuple):
+        if checkpoint_tuple is None:
+            return None
+        values = checkpoint_tuple.checkpoint.get("channel_values") or {}
+        if self.channel not in values:
+            return checkpoint_tuple
+        key = self._key(checkpoint_tuple.config, checkpoint_tuple.checkpoint["id"])
+        messages, _ = self._resolve(key, values[self.channel])
+        return self._with_messages(checkpoint_tuple, messages)
+
+    async def _adecode(self, checkpoint_tuple):
+        if checkpoint_tuple is None:
+            return None
+        values = checkpoint_tuple.checkpoint.get("channel_values") or {}
+        if self.channel not in values:
+            return checkpoint_tuple
+        key = self._key(checkpoint_tuple.config, checkpoint_tuple.checkpoint["id"])
+        messages, _ = await self._aresolve(key, values[self.channel])
+        return self._with_messages(checkpoint_tuple, messages)
+
+    def _parent(self, config):
+        if config["configurable"].get("checkpoint_id") is None:
+            return None
+        parent = self._recall(self._key(config))
+        if parent is None and self._decode(self.inner.get_tuple(config)) is not None:
+            parent = self._recall(self._key(config))
+        return parent
+
+    async def _aparent(self, config):
+        if config["configurable"].get("checkpoint_id") is None:
+            return None
+        parent = self._recall(self._key(config))
+        if parent is None and await self._adecode(await self.inner.aget_tuple(config)) is not None:
+            parent = self._recall(self._key(config))
+        return parent
+
+    # --- BaseCheckpointSaver API
+
+    def get_tuple(self, config):
+        return self._decode(self.inner.get_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in self.inner.list(config, filter=filter, before=before, limit=limit):
+            yield self._decode(checkpoint_tuple)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        encoded = self._encode(config, checkpoint, new_versions, self._parent(config))
+        return self.inner.put(config, encoded, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self.inner.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == thread_id]:
+                del self._cache[key]
+        return self.inner.delete_thread(thread_id)
+
+    async def aget_tuple(self, config):
+        return await self._adecode(await self.inner.aget_tuple(config))
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async for checkpoint_tuple in self.inner.alist(config, filter=filter, before=before, limit=limit):
+            yield await self._adecode(checkpoint_tuple)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        encoded = self._encode(config, checkpoint, new_versions, await self._aparent(config))
+        return await self.inner.aput(config, encoded, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self.inner.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        with self._lock:
+            for key in [k for k in self._cache if k[0] == thread_id]:
+                del self._cache[key]
+        return await self.inner.adelete_thread(thread_id)
@@ -0,0 +1,199 @@
+import json
+
+
+class EditorJSStreamParser:
+    """
+    Incremental parser for the Editor.js report the supervisor produces:
+
+        {"time": 1752971214073, "blocks": [{...}, {...}]}
+
+    feed() takes token chunks as they stream in and returns every block whose
+    closing brace has arrived, so each block can be sent to the client as soon
+    as it is complete instead of after the whole report. Text before the first
+    "{" (e.g. a markdown fence) is ignored. Blocks that are not valid JSON
+    objects are skipped and recorded in `errors`.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.in_blocks = False
+        self.done = False
+        self.last_key = None
+        self.key_chars = None
+        self.block_chars = None
+        self.text = []
+        self.blocks_emitted = 0
+        self.errors = []
+
+    def feed(self, chunk):
+        blocks = []
+        if not chunk or self.done:
+            return blocks
+        self.text.append(chunk)
+
+        for ch in chunk:
+            if not self.started:
+                if ch == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.block_chars is not None:
+                self.block_chars.append(ch)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.key_chars is not None:
+                        self.last_key = "".join(self.key_chars)
+                        self.key_chars = None
+                elif self.key_chars is not None:
+                    self.key_chars.append(ch)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                # Only keys of the root object matter ("time", "blocks").
+                if self.depth == 1:
+                    self.key_chars = []
+            elif ch in "{[":
+                if self.depth == 1 and ch == "[" and self.last_key == "blocks":
+                    self.in_blocks = True
+                elif self.in_blocks and self.depth == 2 and ch == "{":
+                    self.block_chars = ["{"]
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.in_blocks and self.depth == 2 and ch == "}" and self.block_chars is not None:
+                    block = self._parse_block("".join(self.block_chars))
+                    if block is not None:
+                        blocks.append(block)
+                    self.block_chars = None
+                elif self.in_blocks and self.depth == 1 and ch == "]":
+                    self.in_blocks = False
+                if self.depth == 0:
+                    self.done = True
+                    break
+
+        self.blocks_emitted += len(blocks)
+        return blocks
+
+    def close(self):
+        """
+        Call once the message is complete. If nothing was emitted incrementally
+        but the full text is a valid report, return its blocks; otherwise record
+        why the report could not be parsed.
+        """
+        if self.blocks_emitted:
+            if not self.done:
+                self.errors.append("report ended before the JSON object was closed")
+            return []
+
+        text = "".join(self.text).strip()
+        try:
+            report = json.loads(text)
+        except json.JSONDecodeError as e:
+            if self.started:
+                self.errors.append(f"malformed report JSON: {e}")
+            return []
+        if isinstance(report, dict) and isinstance(report.get("blocks"), list):
+            blocks = [b for b in report["blocks"] if isinstance(b, dict)]
+            self.blocks_emitted += len(blocks)
+            return blocks
+        return []
+
+    def _parse_block(self, raw):
+        try:
+            block = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.errors.append(f"skipped malformed block: {e}")
+            return None
+        if not isinstance(block, dict) or "type" not in block:
+            self.errors.append(f"skipped block without a type: {raw[:80]}")
+            return None
+        return block
+
+
+class ReportBlockStream:
+    """
+    Routes stream_mode="messages" payloads to one EditorJSStreamParser per
+    message id. Token chunks (AIMessageChunk) are parsed as they arrive; a
+    complete AIMessage is parsed in one go unless its chunks were already seen.
+    Only the first message that yields blocks is treated as the report.
+    """
+
+    def __init__(self):
+        self.parsers = {}
+        self.report_id = None
+
+    def feed(self, msg):
+        """Return the report blocks completed by this message or chunk."""
+        content = getattr(msg, "content", "")
+        msg_type = getattr(msg, "type", None)
+        msg_id = getattr(msg, "id", None)
+        if not isinstance(content, str) or msg_type not in ("ai", "AIMessageChunk"):
+            return []
+        if self.report_id is not None and msg_id != self.report_id:
+            return []
+
+        if msg_type == "ai":
+            if msg_id in self.parsers:
+                # Already streamed token by token; only finish it off.
+                return self._close(msg_id)
+            if getattr(msg, "tool_calls", None) or not content.lstrip().startswith(("{", "`")):
+                return []
+            self.parsers[msg_id] = EditorJSStreamParser()
+            return self._feed(msg_id, content) + self._close(msg_id)
+
+        parser = self.parsers.get(msg_id)
+        if parser is None:
+            if msg_id in self.parsers or not content.strip():
+                return []
+            # Decide on the first visible token whether this message is a report,
+            # so a "{" in the middle of a chat reply is never taken for one.
+            if not content.lstrip().startswith(("{", "`")):
+                self.parsers[msg_id] = None
+                return []
+            self.parsers[msg_id] = EditorJSStreamParser()
+
+        blocks = self._feed(msg_id, content)
+        if getattr(msg, "chunk_position", None) == "last":
+            blocks += self._close(msg_id)
+        return blocks
+
+    def finish(self):
+        """Flush parsers whose message never received a final chunk."""
+        blocks = []
+        for msg_id in list(self.parsers):
+            blocks += self._close(msg_id)
+        return blocks
+
+    @property
+    def started(self):
+        return self.report_id is not None
+
+    def _feed(self, msg_id, content):
+        blocks = self.parsers[msg_id].feed(content)
+        if blocks:
+            self.report_id = msg_id
+        return blocks
+
+    def _close(self, msg_id):
+        parser = self.parsers.get(msg_id)
+        if parser is None:
+            return []
+        blocks = parser.close()
+        if blocks:
+            self.report_id = msg_id
+        for error in parser.errors:
+            print(f"[WARN] report {msg_id}: {error}")
+        # Keep the id so a later full AIMessage for it is not parsed again.
+        self.parsers[msg_id] = None
+        return blocks
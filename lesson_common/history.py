@@ -0,0 +1,113 @@
+import os
+from typing import Sequence
+
+from langgraph.graph.message import add_messages
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from .tokens import count_message_tokens
+
+# History bounds for the supervisor `messages` channel. When either limit is
+# exceeded the oldest turns are evicted down to LOW_WATER of the limit, so the
+# next few steps append again instead of evicting one message per step.
+MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "200"))
+MAX_HISTORY_TOKENS = int(os.getenv("MAX_HISTORY_TOKENS", "60000"))
+HISTORY_LOW_WATER = float(os.getenv("HISTORY_LOW_WATER", "0.75"))
+HISTORY_SUMMARY = os.getenv("HISTORY_SUMMARY", "on") == "on"
+HISTORY_SUMMARY_MAX_CHARS = 4000
+HISTORY_SUMMARY_ID = "history-summary"
+HISTORY_SUMMARY_PREFIX = "Summary of earlier conversation:\n"
+
+
+def summarize_evicted(summary: str, evicted: Sequence[AnyMessage]) -> str:
+    """
+    Fold evicted messages into the rolling summary: one short line per user
+    request and final agent answer. Tool-call plumbing is dropped. Runs inside
+    a reducer, so it must stay cheap and deterministic (no LLM call).
+    """
+    lines = [summary] if summary else []
+    for m in evicted:
+        if isinstance(m, ToolMessage) or getattr(m, "tool_calls", None):
+            continue
+        content = m.content if isinstance(m.content, str) else str(m.content)
+        content = " ".join(content.split())
+        if not content:
+            continue
+        speaker = getattr(m, "name", None) or m.type
+        lines.append(f"- {speaker}: {content[:200]}")
+
+    text = "\n".join(lines)
+    # Keep the most recent part when the summary itself grows too large.
+    return text[-HISTORY_SUMMARY_MAX_CHARS:]
+
+
+def _safe_start(body: Sequence[AnyMessage], start: int) -> int:
+    # Prefer to resume at a user turn so the kept history reads naturally.
+    for i in range(start, len(body)):
+        if isinstance(body[i], HumanMessage):
+            return i
+    # Otherwise never keep a ToolMessage without the AIMessage that requested it.
+    while start < len(body) and isinstance(body[start], ToolMessage):
+        start += 1
+    if start == len(body):
+        # The newest group is an AIMessage plus its tool results; keep it whole.
+        start = len(body) - 1
+        while start > 0 and isinstance(body[start], ToolMessage):
+            start -= 1
+    return start
+
+
+def cap_history(
+    messages: Sequence[AnyMessage],
+    max_messages: int = MAX_HISTORY_MESSAGES,
+    max_tokens: int = MAX_HISTORY_TOKENS,
+    token_counter=count_tokens_approximately,
+    summarize=summarize_evicted,
+    low_water: float = HISTORY_LOW_WATER,
+) -> list:
+    pinned, body, summary = [], [], ""
+    for m in messages:
+        if m.id == HISTORY_SUMMARY_ID:
+            summary = m.content.removeprefix(HISTORY_SUMMARY_PREFIX)
+        elif isinstance(m, SystemMessage) and not body:
+            pinned.append(m)
+        else:
+            body.append(m)
+
+    counts = [token_counter([m]) for m in body]
+    total_tokens = sum(counts)
+    if len(body) <= max_messages and total_tokens <= max_tokens:
+        return list(messages)
+
+    # The newest user request and everything after it are always kept, even
+    # when that turn alone is over the limits: only earlier turns are evicted.
+    current = max((i for i, m in enumerate(body) if isinstance(m, HumanMessage)), default=len(body))
+    target_messages = int(max_messages * low_water)
+    target_tokens = int(max_tokens * low_water)
+    start = 0
+    while start < current and (len(body) - start > target_messages or total_tokens > target_tokens):
+        total_tokens -= counts[start]
+        start += 1
+    start = _safe_start(body, start)
+    if start == 0:
+        return list(messages)
+
+    evicted, kept = body[:start], body[start:]
+    if summarize is None:
+        return pinned + kept
+
+    summary = summarize(summary, evicted)
+    return pinned + [SystemMessage(content=HISTORY_SUMMARY_PREFIX + summary, id=HISTORY_SUMMARY_ID)] + kept
+
+
+def make_capped_add_messages(**limits):
+    """Build a bounded `add_messages` reducer; keyword arguments go to cap_history."""
+    limits.setdefault("token_counter", count_message_tokens)
+
+    def capped_add_messages(left: Sequence[AnyMessage], right: Sequence[AnyMessage]) -> Sequence[AnyMessage]:
+        return cap_history(add_messages(left, right), **limits)
+
+    return capped_add_messages
+
+
+capped_add_messages = make_capped_add_messages(summarize=summarize_evicted if HISTORY_SUMMARY else None)
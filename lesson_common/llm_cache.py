@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration
+
+from .checkpointer import get_redis_client
+
+# Message fields that change between otherwise identical requests (fresh uuids,
+# token usage, provider metadata) and must not be part of the cache key.
+VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def _strip_volatile(node):
+    if isinstance(node, list):
+        return [_strip_volatile(n) for n in node]
+    if not isinstance(node, dict):
+        return node
+    if node.get("lc") == 1 and node.get("type") == "constructor" and isinstance(node.get("kwargs"), dict):
+        kwargs = {k: _strip_volatile(v) for k, v in node["kwargs"].items() if k not in VOLATILE_MESSAGE_FIELDS}
+        return {**node, "kwargs": kwargs}
+    return {k: _strip_volatile(v) for k, v in node.items()}
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    Key on the model + parameters + bound tools (all in `llm_string`) and the
+    serialized messages with per-run ids and metadata removed.
+    """
+    try:
+        normalized = json.dumps(_strip_volatile(json.loads(prompt)), sort_keys=True)
+    except ValueError:
+        normalized = prompt
+    return hashlib.sha256(f"{llm_string}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+def _dump_generations(generations) -> str:
+    return json.dumps([
+        {"message": message_to_dict(g.message), "generation_info": g.generation_info}
+        for g in generations
+    ])
+
+
+def _load_generations(value: str):
+    generations = []
+    for g in json.loads(value):
+        # A cached reply is a new message: without the original id LangChain
+        # assigns the current run id, so add_messages appends it instead of
+        # replacing the earlier reply that has the same id.
+        data = g["message"]["data"]
+        for field in ("id", "response_metadata"):
+            data.pop(field, None)
+        generations.append(
+            ChatGeneration(message=messages_from_dict([g["message"]])[0], generation_info=g["generation_info"])
+        )
+    return generations
+
+
+class CountingLLMCache(BaseCache):
+    """
+    Base for the response caches below: normalizes keys, (de)serializes
+    generations and keeps hit/miss counters. Subclasses store opaque strings.
+    Only chat generations are cached; usable offline with a fake chat model,
+    e.g. GenericFakeChatModel(messages=iter([...]), cache=MemoryLLMCache()).
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @abstractmethod
+    def _get(self, key):
+        ...
+
+    @abstractmethod
+    def _set(self, key, value):
+        ...
+
+    @abstractmethod
+    def _clear(self):
+        ...
+
+    def lookup(self, prompt, llm_string):
+        value = self._get(cache_key(prompt, llm_string))
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if value is None else _load_generations(value)
+
+    def update(self, prompt, llm_string, return_val):
+        if not all(isinstance(g, ChatGeneration) for g in return_val):
+            return
+        self._set(cache_key(prompt, llm_string), _dump_generations(return_val))
+
+    def clear(self, **kwargs):
+        self._clear()
+
+    def stats(self):
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+class MemoryLLMCache(CountingLLMCache):
+    """In-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=1000, ttl=3600):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteLLMCache(CountingLLMCache):
+    """On-disk cache that survives restarts; least recently used rows beyond `maxsize` are deleted."""
+
+    def __init__(self, path=".llm_cache.sqlite3", maxsize=10000, ttl=86400):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def _set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+            self._conn.commit()
+
+    def _clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+class RedisLLMCache(CountingLLMCache):
+    """
+    Shared across processes. Entries expire through Redis TTLs; a sorted set of
+    access times trims the least recently used entries beyond `maxsize`.
+    """
+
+    def __init__(self, redis_client, maxsize=10000, ttl=86400, prefix="llm_cache"):
+        super().__init__()
+        self.redis = redis_client
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.prefix = prefix
+        self._index = f"{prefix}:lru"
+
+    def _get(self, key):
+        value = self.redis.get(f"{self.prefix}:{key}")
+        if value is None:
+            self.redis.zrem(self._index, key)
+            return None
+        self.redis.zadd(self._index, {key: time.time()})
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _set(self, key, value):
+        pipe = self.redis.pipeline()
+        pipe.set(f"{self.prefix}:{key}", value, ex=self.ttl)
+        pipe.zadd(self._index, {key: time.time()})
+        pipe.zcard(self._index)
+        size = pipe.execute()[-1]
+        if size > self.maxsize:
+            evicted = self.redis.zpopmin(self._index, size - self.maxsize)
+            if evicted:
+                self.redis.delete(*[f"{self.prefix}:{k.decode() if isinstance(k, bytes) else k}" for k, _ in evicted])
+
+    def _clear(self):
+        keys = self.redis.zrange(self._index, 0, -1)
+        if keys:
+            self.redis.delete(*[f"{self.prefix}:{k.decode() if isinstance(k, bytes) else k}" for k in keys])
+        self.redis.delete(self._index)
+
+
+def get_llm_cache():
+    """
+    Response cache for the models in models.py, chosen by LLM_CACHE:
+    off (default), memory, sqlite or redis. Returns None when disabled.
+    """
+    backend = os.getenv("LLM_CACHE", "off")
+    ttl = int(os.getenv("LLM_CACHE_TTL", "3600"))
+    maxsize = int(os.getenv("LLM_CACHE_MAXSIZE", "1000"))
+
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return MemoryLLMCache(maxsize=maxsize, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteLLMCache(os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3"), maxsize=maxsize, ttl=ttl)
+    if backend == "redis":
+        return RedisLLMCache(get_redis_client(), maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown LLM_CACHE backend: {backend!r}")
@@ -0,0 +1,134 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Sequence
+
+import tiktoken
+from langchain_core.messages import AnyMessage, SystemMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+# Context windows of the lesson models (models.py). Prompts are trimmed to the window
+# minus room for the completion, or to PROMPT_TOKEN_BUDGET if that is smaller.
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4.1-mini": 1_047_576,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+COMPLETION_RESERVE_TOKENS = 32_768
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))
+
+# Per-message token counts, keyed by a hash of the text that is tokenized (see
+# _message_text). Messages in the supervisor history are re-counted on every
+# model call, so each distinct message is tokenized once; a message edited
+# under the same id, tool calls included, gets a new key.
+TOKEN_CACHE_SIZE = 100_000
+TOKENS_PER_MESSAGE = 3
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    # o200k_base is the gpt-4.1 family tokenizer. Loading it may need a download
+    # on first use; fall back to the approximate counter if that is not possible.
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"[WARN] tiktoken unavailable, using approximate token counts: {e}")
+        return None
+
+
+def _message_text(message: AnyMessage) -> str:
+    content = message.content
+    if not isinstance(content, str):
+        content = " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    parts = [message.type, getattr(message, "name", None) or "", content]
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        parts.append(tool_call["name"])
+        parts.append(json.dumps(tool_call["args"]))
+    return "\n".join(parts)
+
+
+def message_tokens(message: AnyMessage) -> int:
+    """Token count of one message, memoized by a hash of its text."""
+    text = _message_text(message)
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _token_cache_lock:
+        count = _token_cache.get(key)
+        if count is not None:
+            _token_cache.move_to_end(key)
+            return count
+
+    encoding = _encoding()
+    if encoding is None:
+        count = count_tokens_approximately([message])
+    else:
+        count = len(encoding.encode(text, disallowed_special=())) + TOKENS_PER_MESSAGE
+
+    with _token_cache_lock:
+        _token_cache[key] = count
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return count
+
+
+def count_message_tokens(messages: Sequence[AnyMessage]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+def prompt_token_budget(model_name: str) -> int:
+    window = MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+    budget = window - COMPLETION_RESERVE_TOKENS
+    if PROMPT_TOKEN_BUDGET:
+        budget = min(budget, PROMPT_TOKEN_BUDGET)
+    return budget
+
+
+def trim_to_budget(messages: Sequence[AnyMessage], max_tokens: int) -> list:
+    """
+    Keep the newest messages that fit in `max_tokens`, plus a leading system
+    message. Walks back from the end, so the cost is proportional to what is
+    kept rather than to the whole history; counts come from the token cache.
+    """
+    messages = list(messages)
+    first = 1 if messages and isinstance(messages[0], SystemMessage) else 0
+    budget = max_tokens - count_message_tokens(messages[:first])
+
+    start, used = len(messages), 0
+    while start > first:
+        n = message_tokens(messages[start - 1])
+        if used + n > budget:
+            break
+        used += n
+        start -= 1
+
+    window = messages[:first] + messages[start:]
+    # The window already fits, so this only applies the turn-boundary rules.
+    return trim_messages(
+        window,
+        strategy="last",
+        token_counter=count_message_tokens,
+        max_tokens=max_tokens,
+        start_on="human",
+        end_on=("human", "tool"),
+        include_system=True,
+    )
+
+
+def make_trim_history(model_name: str = "gpt-4.1-mini"):
+    """Pre-model hook that trims the history to the prompt budget of `model_name`."""
+    max_tokens = prompt_token_budget(model_name)
+
+    def trim_history(state):
+        return {
+            "llm_input_messages": trim_to_budget(state["messages"], max_tokens),
+        }
+
+    return trim_history
+
+
+trim_history = make_trim_history()
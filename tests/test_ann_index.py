@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "l001-basics", "graph-ai-005"))
+import ann_index  # noqa: E402
+
+VERSION = "v1"
+
+
+class FakeCollection:
+    def __init__(self, count):
+        self._count = count
+
+    def count(self):
+        return self._count
+
+
+class FakeVectorStore:
+    """The part of a Chroma vector store that build_ivf_index reads."""
+
+    def __init__(self, count=600, dim=16, seed=0):
+        self.vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+        self._collection = FakeCollection(count)
+
+    def get(self, include, limit, offset):
+        page = self.vectors[offset:offset + limit]
+        return {"ids": [str(i) for i in range(offset, offset + len(page))], "embeddings": page.tolist()}
+
+
+def test_concurrent_opens_build_the_index_once(tmp_path, monkeypatch):
+    vectorstore = FakeVectorStore()
+    builds, build = [], ann_index.build_ivf_index
+
+    def counting_build(*args, **kwargs):
+        builds.append(threading.get_ident())
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(ann_index, "build_ivf_index", counting_build)
+    opened = []
+    threads = [threading.Thread(target=lambda: opened.append(
+        ann_index.open_vectorstore(vectorstore, str(tmp_path), VERSION, backend="ivf"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len(opened) == 4
+    query = vectorstore.vectors[7]
+    results = [store.index.search(query, 3, nprobe=store.index.meta["nlist"]) for store in opened]
+    assert all(result == results[0] for result in results)
+    assert results[0][0][0] == "7"
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def _build(directory):
+    ann_index.build_ivf_index(FakeVectorStore(), directory, VERSION)
+
+
+def test_unlocked_builds_in_two_processes_do_not_collide(tmp_path):
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_build, args=(str(tmp_path),)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert [process.exitcode for process in processes] == [0, 0]
+    index = ann_index.IVFIndex.open(str(tmp_path), VERSION)
+    assert index is not None and index.count == 600
+    assert index.search(FakeVectorStore().vectors[42], 1, nprobe=index.meta["nlist"])[0][0] == "42"
@@ -0,0 +1,53 @@
+import importlib
+
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError
+from starlette.testclient import TestClient
+
+from lesson_common import checkpointer
+
+
+@pytest.fixture
+def modules(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    # Nothing listens here: any connection made at import or on /healthz fails.
+    monkeypatch.setenv("REDIS_URL", "redis://127.0.0.1:1")
+    monkeypatch.setenv("CHECKPOINT_BACKEND", "redis")
+    asgi = importlib.import_module("l006-context-agent.asgi")
+    return asgi, checkpointer
+
+
+def test_import_opens_no_redis_connection(modules):
+    asgi, checkpointer = modules
+
+    assert checkpointer._redis_client is None
+    assert checkpointer._checkpointer is None
+    # Without the lifespan there is no async saver yet: not ready.
+    assert TestClient(asgi.app).get("/healthz").status_code == 503
+
+
+def test_healthz_pings_the_async_client(modules, monkeypatch):
+    asgi, checkpointer = modules
+    client = TestClient(asgi.app)
+
+    monkeypatch.setattr(checkpointer, "_async_redis_client", fakeredis.aioredis.FakeRedis())
+    assert client.get("/healthz").status_code == 200
+
+    class Down:
+        async def ping(self):
+            raise ConnectionError("down")
+
+    monkeypatch.setattr(checkpointer, "_async_redis_client", Down())
+    assert client.get("/healthz").status_code == 503
+    assert checkpointer._redis_client is None  # the sync pool was never built
+
+
+def test_lifespan_compiles_the_graph_against_the_async_saver(modules, monkeypatch):
+    asgi, _ = modules
+    monkeypatch.setenv("CHECKPOINT_BACKEND", "memory")
+
+    with TestClient(asgi.app) as client:
+        assert client.get("/healthz").status_code == 200
+        saver = asgi.app.state.workflow.checkpointer
+        assert type(saver.inner).__name__ == "InMemorySaver"
@@ -0,0 +1,164 @@
+import importlib
+import threading
+import time
+
+import pytest
+
+data_cache_module = importlib.import_module("l005-redis.data_cache")
+DataCache = data_cache_module.DataCache
+data_key = data_cache_module.data_key
+
+APPLE_Q1 = data_key("Apple Q1 2024 sales")
+
+
+def run_together(cache, key, fetch, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(cache.get_or_fetch(key, fetch))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_requests_share_one_fetch():
+    cache = DataCache(ttl=60)
+    release, calls = threading.Event(), []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"sales": len(calls)}
+
+    threads, results, errors = run_together(cache, APPLE_Q1, fetch, 8)
+    while cache.stats()["misses"] == 0:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [{"sales": 1}] * 8 and not errors
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 7, 0)
+    assert cache.get_or_fetch(APPLE_Q1, fetch) == {"sales": 1}
+    assert cache.stats()["hits"] == 1
+
+
+def test_failed_fetch_is_shared_and_not_cached():
+    cache = DataCache(ttl=60)
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise ValueError("db down")
+
+    threads, results, errors = run_together(cache, APPLE_Q1, fetch, 3)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results and len(errors) == 3
+    assert cache.get_or_fetch(APPLE_Q1, lambda: {"sales": 2}) == {"sales": 2}
+
+
+def test_interrupted_fetch_does_not_cache_none():
+    cache = DataCache(ttl=60)
+
+    def fetch():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        cache.get_or_fetch(APPLE_Q1, fetch)
+
+    assert cache.stats()["entries"] == 0
+    assert cache.get_or_fetch(APPLE_Q1, lambda: {"sales": 3}) == {"sales": 3}
+
+
+def test_interrupted_fetch_raises_in_waiters():
+    cache = DataCache(ttl=60)
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise KeyboardInterrupt
+
+    leader = threading.Thread(target=lambda: pytest.raises(KeyboardInterrupt, cache.get_or_fetch, APPLE_Q1, fetch))
+    leader.start()
+    while cache.stats()["misses"] == 0:
+        time.sleep(0.01)
+    threads, results, errors = run_together(cache, APPLE_Q1, fetch, 2)
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *threads]:
+        thread.join()
+
+    assert not results
+    assert [type(e) for e in errors] == [RuntimeError, RuntimeError]
+
+
+def test_invalidate_drops_matching_entries():
+    cache = DataCache(ttl=60)
+    apple_q2, msft_q1 = data_key("Apple Q2 2024 sales"), data_key("Microsoft Q1 2024 sales")
+    for key in (APPLE_Q1, apple_q2, msft_q1):
+        cache.get_or_fetch(key, lambda: {"sales": 1})
+
+    assert cache.invalidate(company="AAPL") == 2
+    assert cache.get_or_fetch(APPLE_Q1, lambda: {"sales": 2}) == {"sales": 2}
+    assert cache.get_or_fetch(msft_q1, lambda: {"sales": 2}) == {"sales": 1}
+
+
+def test_invalidate_during_fetch_is_not_stored():
+    cache = DataCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        return {"sales": "old"}
+
+    threads, results, _ = run_together(cache, APPLE_Q1, fetch, 1)
+    started.wait(5)
+    cache.invalidate(company="Apple")
+    release.set()
+    threads[0].join()
+
+    assert results == [{"sales": "old"}]
+    assert cache.get_or_fetch(APPLE_Q1, lambda: {"sales": "new"}) == {"sales": "new"}
+
+
+def test_metrics_expose_hit_ratio_and_saved_time():
+    cache = DataCache(ttl=60)
+    cache.get_or_fetch(APPLE_Q1, lambda: {"sales": 1})
+    cache.get_or_fetch(APPLE_Q1, lambda: {"sales": 1})
+    text = cache.render_prometheus()
+
+    assert "# TYPE data_cache_hit_ratio gauge" in text
+    assert "data_cache_hit_ratio 0.5\n" in text
+    assert 'data_cache_requests_total{result="hit"} 1\n' in text
+    assert 'data_cache_requests_total{result="miss"} 1\n' in text
+    assert "data_cache_saved_seconds_total " in text
+
+
+def test_requests_naming_several_periods_or_companies_are_not_cached():
+    assert data_key("Apple Q1 2024 vs Q2 2024 sales") is None
+    assert data_key("Compare Apple vs Microsoft Q1 2024 sales") is None
+    assert data_key("AAPL and Apple Q1 2024 sales") == APPLE_Q1
+
+
+def test_key_covers_every_report_type_named():
+    revenue_and_sales = data_key("Apple Q1 2024 sales and revenue")
+
+    assert revenue_and_sales == data_key("Apple Q1 2024 revenue, sales") == ("apple", "q1 2024", "revenue,sales")
+    assert revenue_and_sales != APPLE_Q1
+
+    cache = DataCache(ttl=60)
+    cache.get_or_fetch(revenue_and_sales, lambda: {"sales": 1})
+    assert cache.invalidate(report_type="revenue") == 1
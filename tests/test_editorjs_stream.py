@@ -0,0 +1,135 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from lesson_common.editorjs_stream import EditorJSStreamParser, ReportBlockStream
+
+BLOCKS = [
+    {"id": "h1", "type": "header", "data": {"text": "Acme {Q3} report", "level": 2}},
+    {"id": "p1", "type": "paragraph", "data": {"text": 'Revenue "grew" 12% \\ {north} [region]'}},
+    {"id": "l1", "type": "list", "data": {"style": "unordered", "items": ["a}", "{b", "c\"]"]}},
+]
+REPORT = json.dumps({"time": 1752971214073, "blocks": BLOCKS, "version": "2.31.0"})
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def feed_all(parser, chunks):
+    """Blocks per chunk, then the blocks close() adds."""
+    emitted = [parser.feed(chunk) for chunk in chunks]
+    return emitted, parser.close()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_blocks_are_emitted_as_they_close(size):
+    parser = EditorJSStreamParser()
+    emitted, closed = feed_all(parser, split(REPORT, size))
+
+    assert [b for blocks in emitted for b in blocks] == BLOCKS
+    assert closed == []
+    assert parser.errors == []
+    # Each block arrives with the chunk holding its closing brace, not at the end.
+    first = next(i for i, blocks in enumerate(emitted) if blocks)
+    assert first < len(emitted) - 1
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    parser = EditorJSStreamParser()
+    blocks = parser.feed(REPORT)
+
+    assert blocks[1]["data"]["text"] == 'Revenue "grew" 12% \\ {north} [region]'
+    assert blocks[2]["data"]["items"] == ["a}", "{b", 'c"]']
+
+
+@pytest.mark.parametrize("size", [1, 5])
+def test_markdown_fence_is_ignored(size):
+    parser = EditorJSStreamParser()
+    emitted, closed = feed_all(parser, split("```json\n" + REPORT + "\n```", size))
+
+    assert [b for blocks in emitted for b in blocks] == BLOCKS
+    assert closed == []
+
+
+def test_malformed_and_untyped_blocks_are_skipped():
+    text = ('{"time": 1, "blocks": ['
+            '{"type": "paragraph", "data": {"text": "kept"}},'
+            '{"type": "paragraph", "data": {"text": "bad" "json"}},'
+            '{"data": {"text": "no type"}},'
+            '{"type": "header", "data": {"text": "also kept", "level": 3}}]}')
+    parser = EditorJSStreamParser()
+    emitted, _ = feed_all(parser, split(text, 4))
+
+    assert [b["data"]["text"] for blocks in emitted for b in blocks] == ["kept", "also kept"]
+    assert len(parser.errors) == 2
+    assert parser.errors[0].startswith("skipped malformed block")
+    assert parser.errors[1].startswith("skipped block without a type")
+
+
+def test_truncated_report_is_reported():
+    parser = EditorJSStreamParser()
+    emitted, closed = feed_all(parser, split(REPORT[:REPORT.index('{"id": "l1"')], 3))
+
+    assert [b for blocks in emitted for b in blocks] == BLOCKS[:2]
+    assert closed == []
+    assert parser.errors == ["report ended before the JSON object was closed"]
+
+
+def test_malformed_report_without_blocks_is_reported():
+    parser = EditorJSStreamParser()
+    emitted, closed = feed_all(parser, ['{"time": 1, "blocks": 3, }'])
+
+    assert emitted == [[]] and closed == []
+    assert parser.errors[0].startswith("malformed report JSON")
+
+
+def chunks_of(text, size, msg_id="run-1"):
+    parts = split(text, size)
+    return [AIMessageChunk(content=part, id=msg_id, chunk_position="last" if i == len(parts) - 1 else None)
+            for i, part in enumerate(parts)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_chunked_stream_then_full_message_has_no_duplicates(size):
+    stream = ReportBlockStream()
+    blocks = [b for chunk in chunks_of(REPORT, size) for b in stream.feed(chunk)]
+    blocks += stream.feed(AIMessage(content=REPORT, id="run-1"))
+    blocks += stream.finish()
+
+    assert blocks == BLOCKS
+    assert stream.started
+
+
+def test_full_message_after_chunks_without_a_last_marker():
+    stream = ReportBlockStream()
+    chunks = [AIMessageChunk(content=part, id="run-1") for part in split(REPORT, 5)]
+    blocks = [b for chunk in chunks for b in stream.feed(chunk)]
+    blocks += stream.feed(AIMessage(content=REPORT, id="run-1"))
+
+    assert blocks == BLOCKS
+    assert stream.finish() == []
+
+
+def test_full_message_alone_is_parsed():
+    stream = ReportBlockStream()
+
+    assert stream.feed(AIMessage(content="```json\n" + REPORT + "\n```", id="run-2")) == BLOCKS
+
+
+def test_chat_reply_with_braces_is_not_a_report():
+    stream = ReportBlockStream()
+    reply = 'Sure, the report will look like {"blocks": [{"type": "paragraph"}]} soon.'
+    blocks = [b for chunk in chunks_of(reply, 4, "chat") for b in stream.feed(chunk)]
+
+    assert blocks == [] and not stream.started
+    assert stream.feed(AIMessage(content=reply, id="chat")) == []
+
+
+def test_only_the_first_report_message_is_used():
+    stream = ReportBlockStream()
+    first = stream.feed(AIMessage(content=REPORT, id="run-1"))
+    second = stream.feed(AIMessage(content=REPORT, id="run-2"))
+
+    assert first == BLOCKS and second == []
@@ -0,0 +1,125 @@
+import asyncio
+import importlib
+import threading
+
+import pytest
+
+datasources = importlib.import_module("l006-context-agent.datasources")
+tools = importlib.import_module("l006-context-agent.tools")
+
+
+class CountingSource(datasources.DataSource):
+    """`rows` items in pages; records how many pages were read and whether the reader closed them."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.read = 0
+        self.closed = False
+
+    def lookup(self, request):
+        return {"sales": 1, "customers": 2, "rows": self.rows}
+
+    def pages(self, report, page_size):
+        try:
+            for start in range(0, report["rows"], page_size):
+                self.read += 1
+                ids = list(range(start, min(start + page_size, report["rows"])))
+                yield {"id": ids, "value": [i * 2 for i in ids]}
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def source(monkeypatch):
+    def use(rows, page_size, max_rows):
+        source = CountingSource(rows)
+        monkeypatch.setattr(tools, "get_data_source", lambda: source)
+        monkeypatch.setattr(tools, "data_source_settings", lambda: {"page_size": page_size, "max_rows": max_rows})
+        return source
+    return use
+
+
+def dataset(result):
+    return tools.artifacts.get(result["dataset"]["handle"], "t1")
+
+
+CONFIG = {"configurable": {"thread_id": "t1"}}
+
+
+def test_async_and_sync_gather_the_same_columns(source):
+    source(rows=25, page_size=10, max_rows=100)
+    sync = tools.gather_data("Acme Q1", CONFIG)
+    async_ = asyncio.run(tools.agather_data("Acme Q1", CONFIG))
+
+    assert sync["dataset"]["rows"] == async_["dataset"]["rows"] == 25
+    assert dataset(async_).columns["value"].tolist() == dataset(sync).columns["value"].tolist()
+    assert "truncated" not in async_["dataset"]
+
+
+def test_async_gather_stops_reading_at_max_rows(source):
+    counting = source(rows=1000, page_size=10, max_rows=25)
+    result = asyncio.run(tools.agather_data("Acme Q1", CONFIG))
+
+    assert result["dataset"]["rows"] == 25
+    assert result["dataset"]["truncated"] is True
+    assert counting.read == 3
+    assert counting.closed
+
+
+def test_data_source_must_implement_lookup_and_pages():
+    class LookupOnly(datasources.DataSource):
+        def lookup(self, request):
+            return None
+
+    with pytest.raises(TypeError):
+        datasources.DataSource()
+    with pytest.raises(TypeError):
+        LookupOnly()
+
+
+class SlowPageSource(datasources.SQLiteDataSource):
+    """SQLite source whose second page query waits for `release`; records whether pages() was closed."""
+
+    def __init__(self, path):
+        super().__init__(path, pool_size=1)
+        self.fetching = threading.Event()
+        self.release = threading.Event()
+        self.closed = False
+
+    def _query(self, sql, params):
+        if sql == datasources.SQLITE_PAGE and params[1] >= 0:
+            self.fetching.set()
+            self.release.wait(5)
+        return super()._query(sql, params)
+
+    def pages(self, report, page_size):
+        try:
+            yield from super().pages(report, page_size)
+        finally:
+            self.closed = True
+
+
+def test_cancelling_mid_page_closes_the_pages_and_frees_the_connection(tmp_path):
+    path = str(tmp_path / "data.sqlite3")
+    datasources.create_sqlite_database(path, ["Acme"], ["Q1 2024"], items_per_report=30)
+    source = SlowPageSource(path)
+    report = source.lookup("Acme Q1 2024")
+
+    async def read():
+        async for _ in source.apages(report, 10):
+            pass
+
+    async def cancel_mid_page():
+        task = asyncio.create_task(read())
+        await asyncio.to_thread(source.fetching.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.05)  # the task is now in its finally, the page still running
+        source.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_mid_page())
+
+    assert source.closed
+    assert source.pool._idle.qsize() == source.pool._created == 1
+    source.close()
@@ -0,0 +1,61 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from lesson_common.history import HISTORY_SUMMARY_ID, cap_history
+
+
+def tool_steps(n, turn=0):
+    """n AIMessage + ToolMessage pairs, as one agent turn produces them."""
+    messages = []
+    for i in range(n):
+        call_id = f"call_{turn}_{i}"
+        messages.append(AIMessage(content="", id=f"ai_{turn}_{i}",
+                                  tool_calls=[{"id": call_id, "name": "gather_data_tool", "args": {}}]))
+        messages.append(ToolMessage(content=f"result {i}", tool_call_id=call_id, id=f"tool_{turn}_{i}"))
+    return messages
+
+
+def test_single_turn_over_the_cap_keeps_its_request():
+    request = HumanMessage(content="Build the Q1 report", id="h1")
+    history = [request] + tool_steps(60)
+
+    capped = cap_history(history, max_messages=40, max_tokens=10**6)
+
+    assert capped == history  # nothing older to evict
+
+
+def test_only_turns_before_the_current_request_are_evicted():
+    earlier = [HumanMessage(content="Hello", id="h0"), AIMessage(content="Hi, how can I help?", id="a0")]
+    request = HumanMessage(content="Build the Q1 report", id="h1")
+    current = [request] + tool_steps(60, turn=1)
+
+    capped = cap_history([SystemMessage(content="You are a supervisor.", id="sys")] + earlier + current,
+                         max_messages=40, max_tokens=10**6)
+
+    assert capped[0].id == "sys"
+    assert capped[1].id == HISTORY_SUMMARY_ID
+    assert "human: Hello" in capped[1].content
+    assert capped[2:] == current
+
+
+def test_token_limit_does_not_evict_the_current_request():
+    request = HumanMessage(content="Build the Q1 report", id="h1")
+    history = [HumanMessage(content="Earlier question " * 50, id="h0"), request] + tool_steps(10, turn=1)
+
+    capped = cap_history(history, max_messages=1000, max_tokens=50, summarize=None)
+
+    assert capped == [request] + tool_steps(10, turn=1)
+
+
+def test_old_turns_are_evicted_down_to_low_water_with_tool_pairs_intact():
+    history = []
+    for turn in range(10):
+        history += [HumanMessage(content=f"question {turn}", id=f"h{turn}")] + tool_steps(2, turn)
+        history.append(AIMessage(content=f"answer {turn}", id=f"a{turn}"))
+
+    capped = cap_history(history, max_messages=40, max_tokens=10**6, low_water=0.5)
+
+    kept = capped[1:]
+    assert len(kept) <= 20
+    assert isinstance(kept[0], HumanMessage)
+    assert kept == history[-len(kept):]
+    assert "question 0" in capped[0].content
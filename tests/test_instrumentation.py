@@ -0,0 +1,109 @@
+import importlib
+import re
+from typing import Annotated, TypedDict
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+
+instrumentation_module = importlib.import_module("l006-context-agent.instrumentation")
+Instrumentation = instrumentation_module.Instrumentation
+InMemorySpanExporter = instrumentation_module.InMemorySpanExporter
+SIZE_BUCKETS = instrumentation_module.SIZE_BUCKETS
+
+SAMPLE = re.compile(r'^(?P<name>[a-z_]+)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+
+
+def scrape(text):
+    """{(name, frozenset of labels): value} from the exposition format, as a Prometheus server parses it."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        m = SAMPLE.match(line)
+        assert m, f"not a sample line: {line!r}"
+        labels = frozenset(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', m["labels"] or ""))
+        samples[(m["name"], labels)] = float(m["value"])
+    return samples
+
+
+class State(TypedDict):
+    messages: Annotated[list[AnyMessage], add_messages]
+
+
+def run_graph(instrumentation, turns=2):
+    model = GenericFakeChatModel(messages=iter([AIMessage(content=f"answer {i}") for i in range(turns)]))
+
+    def answer(state):
+        return {"messages": [model.invoke(state["messages"])]}
+
+    graph = StateGraph(State)
+    graph.add_node("answer", answer)
+    graph.set_entry_point("answer")
+    graph.add_edge("answer", END)
+    workflow = graph.compile(checkpointer=instrumentation.wrap_checkpointer(InMemorySaver()))
+    config = {"configurable": {"thread_id": "t1"}, "callbacks": [instrumentation.callback_handler()]}
+    for i in range(turns):
+        workflow.invoke({"messages": [HumanMessage(content=f"question {i}")]}, config)
+
+
+def test_histogram_bounds_are_exact():
+    instrumentation = Instrumentation()
+    for size in (100, 2_000_000, 4_194_304, 5_000_000):
+        instrumentation.record_checkpoint("t1", "put", 0.001, size)
+    samples = scrape(instrumentation.render_prometheus())
+
+    def bucket(le):
+        return samples[("langgraph_checkpoint_bytes_bucket", frozenset({("op", "put"), ("le", le)}))]
+
+    assert [float(le) for (name, labels) in samples if name == "langgraph_checkpoint_bytes_bucket"
+            for key, le in labels if key == "le" and le != "+Inf"] == [float(b) for b in SIZE_BUCKETS]
+    assert bucket("1048576") == 1
+    assert bucket("4194304") == 3  # 4194304 itself is <= the bound
+    assert bucket("+Inf") == 4
+    assert samples[("langgraph_checkpoint_bytes_sum", frozenset({("op", "put")}))] == 11_194_404
+    assert samples[("langgraph_checkpoint_bytes_count", frozenset({("op", "put")}))] == 4
+
+
+def test_fractional_values_keep_full_precision():
+    instrumentation = Instrumentation()
+    instrumentation.record_node("t1", "answer", 0.1234567)
+    instrumentation.record_llm("t1", "answer", "gpt-4.1", 0.5, 1_234_567, 89)
+    samples = scrape(instrumentation.render_prometheus())
+
+    labels = frozenset({("node", "answer")})
+    assert samples[("langgraph_node_duration_seconds_sum", labels)] == 0.1234567
+    assert samples[("langgraph_node_duration_seconds_bucket", labels | {("le", "0.25")})] == 1
+    tokens = frozenset({("node", "answer"), ("model", "gpt-4.1"), ("kind", "prompt")})
+    assert samples[("langgraph_llm_tokens_total", tokens)] == 1_234_567
+
+
+def test_graph_run_is_scraped_and_traced():
+    exporter = InMemorySpanExporter()
+    instrumentation = Instrumentation(exporter=exporter)
+    run_graph(instrumentation)
+    text = instrumentation.render_prometheus()
+    samples = scrape(text)
+
+    assert "# TYPE langgraph_node_duration_seconds histogram" in text
+    assert samples[("langgraph_node_duration_seconds_count", frozenset({("node", "answer")}))] == 2
+    assert samples[("langgraph_llm_duration_seconds_count",
+                    frozenset({("node", "answer"), ("model", "GenericFakeChatModel")}))] == 2
+    written = samples[("langgraph_checkpoint_bytes_count", frozenset({("op", "put")}))]
+    assert written >= 2
+    assert samples[("langgraph_checkpoint_bytes_sum", frozenset({("op", "put")}))] > 0
+    # Buckets are cumulative and end at the count.
+    buckets = [samples[("langgraph_checkpoint_bytes_bucket", frozenset({("op", "put"), ("le", str(b))}))]
+               for b in SIZE_BUCKETS] + [samples[("langgraph_checkpoint_bytes_bucket",
+                                                  frozenset({("op", "put"), ("le", "+Inf")}))]]
+    assert buckets == sorted(buckets) and buckets[-1] == written
+
+    spans = exporter.get_finished_spans()
+    traces = {span.trace_id for span in spans}
+    assert len(traces) == 2
+    tree = exporter.span_tree(next(iter(traces)))
+    assert len(tree) == 1
+    assert [child["span"]["name"] for child in tree[0]["children"]] == ["answer"]
+    assert tree[0]["children"][0]["children"][0]["span"]["name"].startswith("chat")
@@ -0,0 +1,71 @@
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph.message import add_messages
+
+from lesson_common.llm_cache import CountingLLMCache, MemoryLLMCache, SQLiteLLMCache
+
+
+def fake_model(cache, replies=("Revenue grew 12%.", "A different answer.")):
+    return GenericFakeChatModel(messages=iter([AIMessage(content=reply) for reply in replies]), cache=cache)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryLLMCache()
+    return SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite3"))
+
+
+def test_repeated_prompt_is_served_from_cache(cache):
+    model = fake_model(cache)
+    first = model.invoke([HumanMessage(content="How did revenue change?")])
+    second = model.invoke([HumanMessage(content="How did revenue change?")])
+
+    assert second.content == first.content == "Revenue grew 12%."
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_message_ids_do_not_change_the_key(cache):
+    model = fake_model(cache)
+    model.invoke([HumanMessage(content="How did revenue change?", id="run-1")])
+    second = model.invoke([HumanMessage(content="How did revenue change?", id="run-2")])
+
+    assert second.content == "Revenue grew 12%."
+    assert cache.stats()["hits"] == 1
+
+
+def test_cache_hit_does_not_reuse_the_cached_message_id(cache):
+    model = fake_model(cache)
+    question = HumanMessage(content="How did revenue change?")
+    first = model.invoke([question])
+    second = model.invoke([question])
+
+    assert first.id is not None
+    assert second.id != first.id
+    assert not second.response_metadata
+
+
+def test_cache_hit_is_appended_to_the_history(cache):
+    model = fake_model(cache)
+    history = []
+    for _ in range(2):
+        history = add_messages(history, [HumanMessage(content="How did revenue change?")])
+        history = add_messages(history, [model.invoke(history[-1:])])
+
+    assert [m.type for m in history] == ["human", "ai", "human", "ai"]
+    assert history[-1].content == "Revenue grew 12%."
+
+
+def test_clear_drops_cached_replies(cache):
+    model = fake_model(cache)
+    model.invoke([HumanMessage(content="How did revenue change?")])
+    cache.clear()
+
+    assert model.invoke([HumanMessage(content="How did revenue change?")]).content == "A different answer."
+
+
+def test_base_cache_requires_a_storage_backend():
+    with pytest.raises(TypeError):
+        CountingLLMCache()
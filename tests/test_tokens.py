@@ -0,0 +1,17 @@
+from langchain_core.messages import AIMessage
+
+from lesson_common.tokens import message_tokens
+
+
+def test_edited_tool_calls_under_the_same_id_are_recounted():
+    call = {"id": "call_0", "name": "gather_data_tool", "args": {"query": "Q1"}}
+    before = message_tokens(AIMessage(content="", id="ai_0", tool_calls=[call]))
+
+    call["args"] = {"query": "Apple Q1 2024 sales, revenue and gross margin by region and product line"}
+    after = message_tokens(AIMessage(content="", id="ai_0", tool_calls=[call]))
+
+    assert after > before
+
+
+def test_equal_text_shares_one_count():
+    assert message_tokens(AIMessage(content="done", id="a")) == message_tokens(AIMessage(content="done", id="b"))
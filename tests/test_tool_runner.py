@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+from langchain_core.tools import StructuredTool
+
+# graph-ai-005 is a directory of scripts, imported by module name.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "l001-basics", "graph-ai-005"))
+import tool_runner  # noqa: E402
+
+
+@pytest.fixture
+def release():
+    """Set at teardown, so no hung call outlives its test."""
+    event = threading.Event()
+    yield event
+    event.set()
+    deadline = time.monotonic() + 5
+    while tool_runner.abandoned_calls() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def make_tools(release):
+    def sleepy(query: str) -> str:
+        """Answers after `query` seconds."""
+        time.sleep(float(query))
+        return f"slept {query}"
+
+    def hang(query: str) -> str:
+        """Answers once the test releases it."""
+        release.wait()
+        return "released"
+
+    def fail(query: str) -> str:
+        """Always raises."""
+        raise ValueError(f"bad query {query!r}")
+
+    async def asleepy(query: str) -> str:
+        """Async sleepy."""
+        await asyncio.sleep(float(query))
+        return f"slept {query}"
+
+    tools = [StructuredTool.from_function(func=f) for f in (sleepy, hang, fail)]
+    tools.append(StructuredTool.from_function(coroutine=asleepy, name="asleepy", description="Async sleepy."))
+    return {tool.name: tool for tool in tools}
+
+
+def calls(*pairs):
+    return [{"id": f"call_{i}", "name": name, "args": {"query": query}} for i, (name, query) in enumerate(pairs)]
+
+
+def test_messages_keep_call_order(release):
+    tools = make_tools(release)
+    turn = calls(("sleepy", "0.3"), ("sleepy", "0.1"), ("nope", "x"), ("fail", "q"), ("asleepy", "0.0"))
+    start = time.monotonic()
+    messages = tool_runner.run_tool_calls(turn, tools)
+
+    assert time.monotonic() - start < 0.45  # concurrent, not 0.4s end to end plus overhead
+    assert [m.tool_call_id for m in messages] == [c["id"] for c in turn]
+    assert [m.content for m in messages[:2]] == ["slept 0.3", "slept 0.1"]
+    assert messages[2].status == "error" and messages[2].content == tool_runner.UNKNOWN_TOOL
+    assert messages[3].status == "error" and "ValueError" in messages[3].content
+    assert messages[4].content == "slept 0.0"
+
+
+def test_timed_out_call_gets_an_error_message(release):
+    tools = make_tools(release)
+    start = time.monotonic()
+    messages = tool_runner.run_tool_calls(calls(("hang", "x"), ("sleepy", "0.0")), tools, timeout=0.2)
+
+    assert time.monotonic() - start < 1
+    assert messages[0].status == "error" and "timed out" in messages[0].content
+    assert messages[1].content == "slept 0.0"
+    assert tool_runner.abandoned_calls() == 1
+
+
+def test_hung_calls_do_not_starve_later_turns(release):
+    tools = make_tools(release)
+    hung = calls(*[("hang", "x")] * tool_runner.TOOL_MAX_WORKERS)
+    tool_runner.run_tool_calls(hung, tools, timeout=0.1)
+
+    messages = tool_runner.run_tool_calls(calls(("sleepy", "0.0")), tools, timeout=1)
+    assert messages[0].content == "slept 0.0"
+
+
+def test_new_calls_are_refused_while_too_many_are_abandoned(release, monkeypatch):
+    monkeypatch.setattr(tool_runner, "TOOL_MAX_ABANDONED", 2)
+    tools = make_tools(release)
+    tool_runner.run_tool_calls(calls(("hang", "x"), ("hang", "x")), tools, timeout=0.1)
+
+    refused = tool_runner.run_tool_calls(calls(("sleepy", "0.0")), tools)
+    assert refused[0].status == "error" and "still running" in refused[0].content
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while tool_runner.abandoned_calls() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert tool_runner.run_tool_calls(calls(("sleepy", "0.0")), tools)[0].content == "slept 0.0"
+
+
+def test_async_runner_keeps_order_and_times_out(release):
+    tools = make_tools(release)
+    turn = calls(("asleepy", "0.2"), ("sleepy", "0.0"), ("hang", "x"), ("asleepy", "5"))
+    start = time.monotonic()
+    messages = asyncio.run(tool_runner.arun_tool_calls(turn, tools, timeout=0.5))
+
+    assert time.monotonic() - start < 1.5
+    assert [m.tool_call_id for m in messages] == [c["id"] for c in turn]
+    assert [m.content for m in messages[:2]] == ["slept 0.2", "slept 0.0"]
+    assert [m.status for m in messages[2:]] == ["error", "error"]
+    assert tool_runner.abandoned_calls() == 1  # the sync hang; the async sleep was cancelled